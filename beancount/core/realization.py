@@ -18,10 +18,13 @@ list of desired directives to display and call the realize() function with them.
 __copyright__ = "Copyright (C) 2013-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import bisect
 import collections
 import copy
+import datetime
 import functools
 import io
+import itertools
 import operator
 
 from beancount.core.data import Transaction
@@ -40,6 +43,7 @@ from beancount.core import data
 from beancount.core import account
 from beancount.core import flags
 from beancount.core import convert
+from beancount.utils import memo
 
 
 class RealAccount(dict):
@@ -256,7 +260,21 @@ def realize(entries, min_accounts=None, compute_balance=True):
     """
     # Create lists of the entries by account.
     txn_postings_map = postings_by_account(entries)
+    return realize_postings(txn_postings_map, min_accounts, compute_balance)
 
+
+def realize_postings(txn_postings_map, min_accounts=None, compute_balance=True):
+    """Build a tree of realized accounts from lists of postings by account.
+
+    Args:
+      txn_postings_map: A mapping of account name to list of TxnPosting
+        instances or non-Transaction directives, as per postings_by_account().
+        The lists are attached to the tree and should not be shared.
+      min_accounts: See realize().
+      compute_balance: See realize().
+    Returns:
+      The root RealAccount instance.
+    """
     # Create a RealAccount tree and compute the balance for each.
     real_root = RealAccount('')
     for account_name, txn_postings in txn_postings_map.items():
@@ -316,6 +334,256 @@ def postings_by_account(entries):
     return txn_postings_map
 
 
+class PostingIndex:
+    """An index of the postings and other directives of a ledger, by account.
+
+    The per-account lists are in the order of the entries, and therefore
+    sorted by date, so that the postings of an account over a date range can
+    be found by bisection rather than by scanning all the entries.
+
+    Attributes:
+      entries: The sorted list of directives that was indexed.
+      num_entries: An integer, the length of 'entries' at the time it was
+        indexed.
+      txn_postings_map: A dict of account name to list of TxnPosting instances
+        or non-Transaction directives, as per postings_by_account().
+      dates_map: A dict of account name to the list of the dates of the items of
+        its list in 'txn_postings_map'.
+      balances_map: A dict of account name to a list of the cumulative balances
+        of the account before every BALANCE_INTERVAL items of its list. These
+        are computed lazily, on the first request of a balance of the account.
+    """
+
+    # The number of items of an account between its cumulative balances.
+    BALANCE_INTERVAL = 64
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.num_entries = len(entries)
+        self.txn_postings_map = dict(postings_by_account(entries))
+        self.dates_map = {
+            account_name: [data.get_entry(txn_posting).date
+                           for txn_posting in txn_postings]
+            for account_name, txn_postings in self.txn_postings_map.items()}
+        self.balances_map = {}
+
+    def get_range(self, account_name, begin_date=None, end_date=None):
+        """Find the range of the items of an account between two dates.
+
+        Args:
+          account_name: A string, the name of the account.
+          begin_date: A datetime.date instance, the first date to include, or
+            None to start from the first item.
+          end_date: A datetime.date instance, the date after the last date to
+            include, or None to end at the last item.
+        Returns:
+          A pair of the begin and end indexes of the items in the list of the
+          account.
+        """
+        dates = self.dates_map.get(account_name, [])
+        begin = (bisect.bisect_left(dates, begin_date)
+                 if begin_date is not None
+                 else 0)
+        end = (bisect.bisect_left(dates, end_date)
+               if end_date is not None
+               else len(dates))
+        return begin, max(begin, end)
+
+    def postings(self, account_name, begin_date=None, end_date=None):
+        """Get the postings and directives of an account between two dates.
+
+        Args:
+          account_name: A string, the name of the account.
+          begin_date: See get_range().
+          end_date: See get_range().
+        Returns:
+          A new list of TxnPosting instances or non-Transaction directives.
+        """
+        begin, end = self.get_range(account_name, begin_date, end_date)
+        return self.txn_postings_map.get(account_name, [])[begin:end]
+
+    def get_balances(self, account_name):
+        """Get the cumulative balances of an account, computing them if needed.
+
+        Args:
+          account_name: A string, the name of the account.
+        Returns:
+          A list of Inventory instances, the balance of the account before
+          item 0, BALANCE_INTERVAL, 2 * BALANCE_INTERVAL, etc. These should not
+          be modified.
+        """
+        balances = self.balances_map.get(account_name, None)
+        if balances is None:
+            balances = [inventory.Inventory()]
+            txn_postings = self.txn_postings_map.get(account_name, [])
+            for begin in range(0, len(txn_postings), self.BALANCE_INTERVAL):
+                balance = copy.copy(balances[-1])
+                for txn_posting in txn_postings[begin:begin + self.BALANCE_INTERVAL]:
+                    if isinstance(txn_posting, TxnPosting):
+                        balance.add_position(txn_posting.posting)
+                balances.append(balance)
+            self.balances_map[account_name] = balances
+        return balances
+
+    def balance(self, account_name, begin_date=None, end_date=None):
+        """Compute the balance of the postings of an account between two dates.
+
+        This is computed as the difference of the cumulative balances of the
+        account at the two dates, replaying at most BALANCE_INTERVAL items
+        from the nearest cumulative balances, rather than adding up all the
+        postings in between.
+
+        Args:
+          account_name: A string, the name of the account.
+          begin_date: See get_range().
+          end_date: See get_range().
+        Returns:
+          A new Inventory instance.
+        """
+        begin, end = self.get_range(account_name, begin_date, end_date)
+        if end - begin <= self.BALANCE_INTERVAL:
+            return compute_postings_balance(
+                self.txn_postings_map.get(account_name, [])[begin:end])
+        balance = self._cumulative_balance(account_name, end)
+        if begin > 0:
+            balance.add_inventory(-self._cumulative_balance(account_name, begin))
+        return balance
+
+    def balance_before(self, account_name, entry):
+        """Compute the balance of an account before an entry is applied.
+
+        This is the balance of the items of the account which precede the
+        entry in the list of entries, as per interpolate.compute_entry_context(),
+        computed from the nearest cumulative balance.
+
+        Args:
+          account_name: A string, the name of the account.
+          entry: A directive instance, which should be in the indexed entries
+            (not just structurally equal to one of them).
+        Returns:
+          A new Inventory instance, or None if the account has no item for the
+          entry.
+        """
+        begin, end = self.get_range(account_name, entry.date,
+                                    entry.date + datetime.timedelta(days=1))
+        txn_postings = self.txn_postings_map.get(account_name, [])
+        for index in range(begin, end):
+            if data.get_entry(txn_postings[index]) is entry:
+                return self._cumulative_balance(account_name, index)
+        return None
+
+    def _cumulative_balance(self, account_name, index):
+        """Compute the balance of the items of an account before an index.
+
+        Args:
+          account_name: A string, the name of the account.
+          index: An integer, an index in the list of items of the account.
+        Returns:
+          A new Inventory instance.
+        """
+        cindex = index // self.BALANCE_INTERVAL
+        balance = copy.copy(self.get_balances(account_name)[cindex])
+        begin = cindex * self.BALANCE_INTERVAL
+        for txn_posting in self.txn_postings_map[account_name][begin:index]:
+            if isinstance(txn_posting, TxnPosting):
+                balance.add_position(txn_posting.posting)
+        return balance
+
+    def by_account(self, begin_date=None, end_date=None):
+        """Get the postings and directives of all the accounts between two dates.
+
+        Args:
+          begin_date: See get_range().
+          end_date: See get_range().
+        Returns:
+          A dict of account name to a new list of TxnPosting instances or
+          non-Transaction directives, like postings_by_account() on the entries
+          between the dates. Accounts without any items between the dates are
+          not included.
+        """
+        txn_postings_map = {}
+        for account_name, txn_postings in self.txn_postings_map.items():
+            begin, end = self.get_range(account_name, begin_date, end_date)
+            if begin < end:
+                txn_postings_map[account_name] = txn_postings[begin:end]
+        return txn_postings_map
+
+
+def realize_window(posting_index, begin_date=None, end_date=None, min_accounts=None,
+                   before_entries=None, after_entries=None):
+    """Realize the postings and directives of a ledger between two dates.
+
+    This is equivalent to calling realize() on the entries between the dates,
+    but the lists of each account are sliced from the index and their balances
+    are computed from its cumulative balances, as balance(end) - balance(begin).
+    Other entries can be realized along with them, for instance, the
+    summarizing entries of the past and the conversions at the end of a
+    clamped period.
+
+    Args:
+      posting_index: An instance of PostingIndex.
+      begin_date: A datetime.date instance, the first date to include, or None.
+      end_date: A datetime.date instance, the date after the last date to
+        include, or None.
+      min_accounts: See realize().
+      before_entries: An optional list of directives to realize before the
+        entries between the dates.
+      after_entries: An optional list of directives to realize after the
+        entries between the dates.
+    Returns:
+      The root RealAccount instance.
+    """
+    window_map = posting_index.by_account(begin_date, end_date)
+    before_map = postings_by_account(before_entries or [])
+    after_map = postings_by_account(after_entries or [])
+
+    txn_postings_map = {}
+    for account_name in itertools.chain(before_map, window_map, after_map):
+        if account_name not in txn_postings_map:
+            txn_postings_map[account_name] = (before_map.get(account_name, []) +
+                                              window_map.get(account_name, []) +
+                                              after_map.get(account_name, []))
+    real_root = realize_postings(txn_postings_map, min_accounts, compute_balance=False)
+
+    for account_name in txn_postings_map:
+        real_account = get(real_root, account_name)
+        balance = (posting_index.balance(account_name, begin_date, end_date)
+                   if account_name in window_map
+                   else inventory.Inventory())
+        for txn_postings in (before_map.get(account_name, None),
+                             after_map.get(account_name, None)):
+            if txn_postings:
+                balance.add_inventory(compute_postings_balance(txn_postings))
+        real_account.balance = balance
+    return real_root
+
+
+# A cache of posting indexes for the most recently indexed lists of entries.
+_POSTING_INDEXES = memo.ledger_cache(4)
+
+
+def get_posting_index(entries):
+    """Get the posting index of a list of entries, computing it if needed.
+
+    The index is cached for the lifetime of the list object, so that the
+    reports and views of the same ledger share a single one. The list of
+    entries must not be modified afterwards.
+
+    Args:
+      entries: A sorted list of directives.
+    Returns:
+      An instance of PostingIndex.
+    """
+    key = id(entries)
+    posting_index = _POSTING_INDEXES.get(key)
+    if (posting_index is None or
+            posting_index.entries is not entries or
+            posting_index.num_entries != len(entries)):
+        posting_index = PostingIndex(entries)
+        _POSTING_INDEXES.put(key, posting_index)
+    return posting_index
+
+
 def filter(real_account, predicate):
     """Filter a RealAccount tree of nodes by the predicate.
 
@@ -364,7 +632,7 @@ def get_postings(real_account):
     return accumulator
 
 
-def iterate_with_balance(txn_postings):
+def iterate_with_balance(txn_postings, balance=None):
     """Iterate over the entries, accumulating the running balance.
 
     For each entry, this yields tuples of the form:
@@ -401,12 +669,16 @@ def iterate_with_balance(txn_postings):
     Args:
       txn_postings: A list of postings or directive instances.
         Postings affect the balance; other entries do not.
+      balance: An optional Inventory, the balance before the first posting,
+        e.g., to iterate over a slice of a longer list. It is not modified.
     Yields:
       Tuples of (entry, postings, change, balance) as described above.
     """
 
     # The running balance.
-    running_balance = inventory.Inventory()
+    running_balance = (copy.copy(balance)
+                       if balance is not None
+                       else inventory.Inventory())
 
     # Previous date.
     prev_date = None
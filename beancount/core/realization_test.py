@@ -323,6 +323,140 @@ class TestRealization(unittest.TestCase):
         self.assertEqual(expected_balance, ra0_movie.balance)
 
 
+class TestPostingIndex(unittest.TestCase):
+
+    @loader.load_doc()
+    def test_posting_index(self, entries, _, __):
+        """
+        2012-01-01 open Expenses:Restaurant
+        2012-01-01 open Assets:Cash
+
+        2012-03-01 * "Food"
+          Expenses:Restaurant     100 CAD
+          Assets:Cash
+
+        2012-04-01 * "Food again"
+          Expenses:Restaurant     80 CAD
+          Assets:Cash
+
+        2012-04-15 balance Assets:Cash   -180 CAD
+
+        2012-05-01 * "Food again"
+          Expenses:Restaurant     60 CAD
+          Assets:Cash
+        """
+        posting_index = realization.PostingIndex(entries)
+        self.assertEqual(realization.postings_by_account(entries),
+                         posting_index.by_account())
+
+        begin_date, end_date = datetime.date(2012, 4, 1), datetime.date(2012, 5, 1)
+        filtered_entries = [entry for entry in entries
+                            if begin_date <= entry.date < end_date]
+        self.assertEqual(realization.postings_by_account(filtered_entries),
+                         posting_index.by_account(begin_date, end_date))
+        self.assertEqual(['Assets:Cash', 'Expenses:Restaurant'],
+                         sorted(posting_index.by_account(begin_date, end_date)))
+        self.assertEqual({}, posting_index.by_account(end_date, begin_date))
+
+        self.assertEqual([data.TxnPosting, data.Balance],
+                         list(map(type, posting_index.postings('Assets:Cash',
+                                                               begin_date, end_date))))
+        self.assertEqual(5, len(posting_index.postings('Assets:Cash')))
+        self.assertEqual([], posting_index.postings('Assets:Other'))
+
+        # The lists returned are copies.
+        posting_index.postings('Assets:Cash').clear()
+        posting_index.by_account()['Assets:Cash'].clear()
+        self.assertEqual(5, len(posting_index.postings('Assets:Cash')))
+
+    @loader.load_doc()
+    def test_realize_postings(self, entries, _, __):
+        """
+        2012-01-01 open Expenses:Restaurant
+        2012-01-01 open Assets:Cash
+
+        2012-03-01 * "Food"
+          Expenses:Restaurant     100 CAD
+          Assets:Cash
+        """
+        posting_index = realization.get_posting_index(entries)
+        self.assertEqual(
+            realization.realize(entries, account_types.DEFAULT_ACCOUNT_TYPES),
+            realization.realize_postings(posting_index.by_account(),
+                                         account_types.DEFAULT_ACCOUNT_TYPES))
+
+    def test_balance(self):
+        entries, _, __ = loader.load_string("""
+        2012-01-01 open Assets:Cash
+        2012-01-01 open Income:Misc
+        """ + "".join("""
+        2012-{:02d}-{:02d} *
+          Assets:Cash       1.{:02d} CAD
+          Income:Misc
+        """.format(month, day, day) for month in range(1, 13) for day in range(1, 29)))
+        posting_index = realization.PostingIndex(entries)
+        posting_index.BALANCE_INTERVAL = 10
+        for begin_date, end_date in [(None, None),
+                                     (None, datetime.date(2012, 2, 15)),
+                                     (datetime.date(2012, 2, 15), None),
+                                     (datetime.date(2012, 1, 2), datetime.date(2012, 1, 3)),
+                                     (datetime.date(2012, 3, 7), datetime.date(2012, 11, 5)),
+                                     (datetime.date(2013, 1, 1), datetime.date(2012, 1, 1))]:
+            filtered_entries = [entry for entry in entries
+                                if ((begin_date is None or begin_date <= entry.date) and
+                                    (end_date is None or entry.date < end_date))]
+            real_root = realization.realize(filtered_entries)
+            self.assertEqual(real_root,
+                             realization.realize_window(posting_index, begin_date, end_date))
+            for account_name in 'Assets:Cash', 'Income:Misc', 'Assets:Other':
+                real_account = realization.get(real_root, account_name)
+                self.assertEqual(real_account.balance if real_account is not None
+                                 else inventory.Inventory(),
+                                 posting_index.balance(account_name, begin_date, end_date))
+
+    @loader.load_doc()
+    def test_realize_window_before_after(self, entries, _, __):
+        """
+        2012-01-01 open Assets:Cash
+        2012-01-01 open Income:Misc
+
+        2012-03-01 *
+          Assets:Cash     100 CAD
+          Income:Misc
+
+        2012-04-01 *
+          Assets:Cash     80 CAD
+          Income:Misc
+
+        2012-05-01 *
+          Assets:Cash     60 CAD
+          Income:Misc
+        """
+        begin_date, end_date = datetime.date(2012, 3, 15), datetime.date(2012, 4, 15)
+        before_entries, after_entries = entries[:3], entries[-1:]
+        self.assertEqual(
+            realization.realize(before_entries + entries[3:4] + after_entries),
+            realization.realize_window(realization.PostingIndex(entries),
+                                       begin_date, end_date, None,
+                                       before_entries, after_entries))
+
+    def test_get_posting_index(self):
+        entries, _, __ = loader.load_string("""
+        2012-01-01 open Assets:Cash
+        """)
+        posting_index = realization.get_posting_index(entries)
+        self.assertIs(posting_index, realization.get_posting_index(entries))
+        self.assertIsNot(posting_index, realization.get_posting_index(list(entries)))
+
+        # Appending to the list invalidates its index.
+        entries.extend(loader.load_string("""
+        2012-01-01 open Assets:Other
+        """)[0])
+        posting_index = realization.get_posting_index(entries)
+        self.assertEqual(['Assets:Cash', 'Assets:Other'],
+                         sorted(posting_index.txn_postings_map))
+
+
 class TestRealFilter(unittest.TestCase):
 
     def test_filter_to_empty(self):
@@ -575,6 +709,14 @@ class TestRealOther(test_utils.TestCase):
         with self.assertRaises(AssertionError):
             list(realization.iterate_with_balance(postings))
 
+        # Test it out from an initial balance, which is not modified.
+        balance = inventory.from_string('11.11 CAD')
+        rtuple = realization.iterate_with_balance(real_account.txn_postings[2:-2], balance)
+        self.assertEqual([
+            (data.Transaction , 2 , '(40.03 CAD)' , '(51.14 CAD)') ,
+            ], simplify_rtuple(rtuple))
+        self.assertEqual(inventory.from_string('11.11 CAD'), balance)
+
     def test_compute_balance(self):
         real_root = create_real([('Assets:US:Bank:Checking', '100 USD'),
                                  ('Assets:US:Bank:Savings', '200 USD'),
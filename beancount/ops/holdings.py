@@ -8,6 +8,7 @@ import collections
 from beancount.core.number import ZERO
 from beancount.core import account
 from beancount.core import amount
+from beancount.core import inventory
 from beancount.core import position
 from beancount.core import realization
 from beancount.core import account_types
@@ -16,6 +17,7 @@ from beancount.core import flags
 from beancount.core import getters
 from beancount.core import prices
 from beancount.ops import summarize
+from beancount.utils import memo
 from beancount.utils import misc_utils
 
 
@@ -95,43 +97,145 @@ def get_final_holdings(entries, included_account_types=None, price_map=None, dat
             if account_type not in included_account_types:
                 continue
 
-        for pos in real_account.balance.get_positions():
-            if pos.cost is not None:
-                # Get price information if we have a price_map.
-                market_value = None
-                if price_map is not None:
-                    base_quote = (pos.units.currency, pos.cost.currency)
-                    price_date, price_number = prices.get_price(price_map,
-                                                                base_quote, date)
-                    if price_number is not None:
-                        market_value = pos.units.number * price_number
-                else:
-                    price_date, price_number = None, None
-
-                holding = Holding(real_account.account,
-                                  pos.units.number,
-                                  pos.units.currency,
-                                  pos.cost.number,
-                                  pos.cost.currency,
-                                  pos.units.number * pos.cost.number,
-                                  market_value,
-                                  price_number,
-                                  price_date)
-            else:
-                holding = Holding(real_account.account,
-                                  pos.units.number,
-                                  pos.units.currency,
-                                  None,
-                                  pos.units.currency,
-                                  pos.units.number,
-                                  pos.units.number,
-                                  None,
-                                  None)
-            holdings.append(holding)
+        holdings.extend(get_balance_holdings(real_account.account, real_account.balance,
+                                             price_map, date))
 
     return holdings
 
 
+def get_balance_holdings(account_name, balance, price_map=None, date=None):
+    """Flatten the positions of the balance of an account to holdings.
+
+    Args:
+      account_name: A string, the name of the account.
+      balance: An Inventory instance, the balance of the account.
+      price_map: See get_final_holdings().
+      date: See get_final_holdings().
+    Returns:
+      A list of Holding instances, one for each position of the balance.
+    """
+    holdings = []
+    for pos in balance.get_positions():
+        if pos.cost is not None:
+            # Get price information if we have a price_map.
+            market_value = None
+            if price_map is not None:
+                base_quote = (pos.units.currency, pos.cost.currency)
+                price_date, price_number = prices.get_price(price_map,
+                                                            base_quote, date)
+                if price_number is not None:
+                    market_value = pos.units.number * price_number
+            else:
+                price_date, price_number = None, None
+
+            holding = Holding(account_name,
+                              pos.units.number,
+                              pos.units.currency,
+                              pos.cost.number,
+                              pos.cost.currency,
+                              pos.units.number * pos.cost.number,
+                              market_value,
+                              price_number,
+                              price_date)
+        else:
+            holding = Holding(account_name,
+                              pos.units.number,
+                              pos.units.currency,
+                              None,
+                              pos.units.currency,
+                              pos.units.number,
+                              pos.units.number,
+                              None,
+                              None)
+        holdings.append(holding)
+    return holdings
+
+
+def get_holdings_series(entries, dates, included_account_types=None, price_map=None):
+    """Get the holdings at the end of each of a list of dates.
+
+    This produces the same holdings as calling get_final_holdings() on the
+    entries up to and including each of the dates, priced as of that date, but
+    sweeps the entries only once, updating the balances of the accounts as it
+    goes, rather than realizing the entries again for each date.
+
+    Args:
+      entries: A sorted list of directives.
+      dates: A sorted list of datetime.date instances.
+      included_account_types: See get_final_holdings().
+      price_map: See get_final_holdings().
+    Returns:
+      A list of (date, list of Holding instances) pairs, one for each date.
+    """
+    balances = collections.defaultdict(inventory.Inventory)
+    included_accounts = {}
+    series = []
+    index, num_entries = 0, len(entries)
+    for date in dates:
+        # Add the postings of the entries up to and including the date.
+        while index < num_entries and entries[index].date <= date:
+            entry = entries[index]
+            index += 1
+            # Skip the entries inserted by unrealized gains/losses, as in
+            # get_final_holdings().
+            if (not isinstance(entry, data.Transaction) or
+                    entry.flag == flags.FLAG_UNREALIZED):
+                continue
+            for posting in entry.postings:
+                included = included_accounts.get(posting.account, None)
+                if included is None:
+                    included = included_accounts[posting.account] = (
+                        not included_account_types or
+                        (account_types.get_account_type(posting.account)
+                         in included_account_types))
+                if included:
+                    balances[posting.account].add_position(posting)
+
+        holdings = []
+        for account_name in sorted(balances):
+            holdings.extend(get_balance_holdings(account_name, balances[account_name],
+                                                 price_map, date))
+        series.append((date, holdings))
+    return series
+
+
+# A cache of the most recently computed snapshots of holdings.
+_SNAPSHOTS = memo.ledger_cache(16)
+
+
+def get_holdings_snapshot(entries, included_account_types=None, price_map=None,
+                          date=None):
+    """Get the final holdings of a list of entries, computing them if needed.
+
+    This is a memoized version of get_final_holdings(). The holdings are cached
+    for the lifetime of the list of entries and of the price map objects, so
+    that the reports of the same ledger share a single snapshot. Neither should
+    be modified afterwards.
+
+    Args:
+      entries: A list of directives.
+      included_account_types: See get_final_holdings().
+      price_map: See get_final_holdings().
+      date: See get_final_holdings().
+    Returns:
+      A tuple of Holding instances, as per get_final_holdings().
+    """
+    key = (id(entries),
+           tuple(included_account_types) if included_account_types else None,
+           id(price_map),
+           date)
+    cached = _SNAPSHOTS.get(key)
+    if (cached is None or
+            cached[0] is not entries or
+            cached[1] is not price_map or
+            cached[2] != len(entries)):
+        holdings = tuple(get_final_holdings(entries, included_account_types,
+                                            price_map, date))
+        cached = (entries, price_map, len(entries), holdings)
+        _SNAPSHOTS.put(key, cached)
+    return cached[3]
+
+
 # Note: This should use the same routines as in beancount.prices.find_prices.
 def get_commodities_at_date(entries, options_map, date=None):
     """Return a list of commodities present at a particular date.
@@ -313,7 +417,7 @@ def aggregate_holdings_list(holdings):
                    total_book_value, total_market_value, average_price, price_date)
 
 
-def convert_to_currency(price_map, target_currency, holdings_list):
+def convert_to_currency(price_map, target_currency, holdings_list, date=None):
     """Convert the given list of holdings's fields to a common currency.
 
     If the rate is not available to convert, leave the fields empty.
@@ -322,6 +426,8 @@ def convert_to_currency(price_map, target_currency, holdings_list):
       price_map: A price-map, as built by prices.build_price_map().
       target_currency: The target common currency to convert amounts to.
       holdings_list: A list of holdings.Holding instances.
+      date: A datetime.date instance, the date of the rates to convert with. If
+        left unspecified, we use the latest rates.
     Returns:
       A modified list of holdings, with the 'extra' field set to the value in
       'currency', or None, if it was not possible to convert.
@@ -354,7 +460,7 @@ def convert_to_currency(price_map, target_currency, holdings_list):
 
             # Get the conversion rate and replace the required numerical
             # fields..
-            _, rate = prices.get_latest_price(price_map, base_quote)
+            _, rate = prices.get_price(price_map, base_quote, date)
             if rate is not None:
                 new_holding = misc_utils.map_namedtuple_attributes(
                     convert_fields,
@@ -11,6 +11,7 @@ from beancount.core.amount import A
 from beancount.core import position
 from beancount.core import data
 from beancount.ops import holdings
+from beancount.ops import summarize
 from beancount.core import prices
 from beancount import loader
 
@@ -151,6 +152,98 @@ class TestHoldings(unittest.TestCase):
         ]
         self.assertEqual(expected_values, holdings_list)
 
+    @loader.load_doc()
+    def test_get_holdings_snapshot(self, entries, _, __):
+        """
+        2013-01-01 open Assets:Account1
+        2013-01-01 open Assets:Cash
+        2013-01-01 open Equity:Unknown
+
+        2013-04-01 *
+          Assets:Account1             15 HOOL {518.73 USD}
+          Equity:Unknown
+
+        2013-06-01 price HOOL  578.02 USD
+        """
+        price_map = prices.build_price_map(entries)
+        snapshot = holdings.get_holdings_snapshot(entries, ('Assets',), price_map)
+        self.assertIsInstance(snapshot, tuple)
+        self.assertEqual(holdings.get_final_holdings(entries, ('Assets',), price_map),
+                         list(snapshot))
+        self.assertIs(snapshot,
+                      holdings.get_holdings_snapshot(entries, ['Assets'], price_map))
+
+        # The snapshots of other arguments are computed separately.
+        for args in [(entries, None, price_map),
+                     (entries, ('Assets',), None),
+                     (entries, ('Assets',), prices.build_price_map(entries)),
+                     (entries[:-1], ('Assets',), price_map)]:
+            other_snapshot = holdings.get_holdings_snapshot(*args)
+            self.assertIsNot(snapshot, other_snapshot)
+            self.assertEqual(holdings.get_final_holdings(*args), list(other_snapshot))
+        other_snapshot = holdings.get_holdings_snapshot(
+            entries, ('Assets',), price_map, datetime.date(2013, 5, 1))
+        self.assertIsNone(other_snapshot[0].price_number)
+
+    @loader.load_doc()
+    def test_get_holdings_series(self, entries, _, __):
+        """
+        plugin "beancount.plugins.unrealized" "Unrealized"
+
+        2013-01-01 open Assets:Account1
+        2013-01-01 open Assets:Cash
+        2013-01-01 open Liabilities:Loan
+        2013-01-01 open Equity:Unknown
+
+        2013-04-01 *
+          Equity:Unknown
+          Assets:Cash                50000 USD
+
+        2013-04-01 *
+          Assets:Account1             15 HOOL {518.73 USD}
+          Assets:Cash
+
+        2013-05-15 price HOOL  530.00 USD
+
+        2013-06-02 *
+          Assets:Account1             -5 HOOL {518.73 USD} @ 540.00 USD
+          Assets:Cash                 2700 USD
+          Equity:Unknown
+
+        2013-06-03 price HOOL  578.02 USD
+
+        2013-06-10 *
+          Assets:Cash                 5111 USD
+          Liabilities:Loan
+        """
+        price_map = prices.build_price_map(entries)
+        dates = [datetime.date(2013, 3, 1),
+                 datetime.date(2013, 4, 1),
+                 datetime.date(2013, 6, 2),
+                 datetime.date(2013, 6, 30),
+                 datetime.date(2014, 1, 1)]
+        for included_account_types, price_map_ in [(None, None),
+                                                   (('Assets', 'Liabilities'), None),
+                                                   (('Assets',), price_map)]:
+            series = holdings.get_holdings_series(entries, dates,
+                                                  included_account_types, price_map_)
+            self.assertEqual(dates, [date for date, _ in series])
+            for date, holdings_list in series:
+                truncated_entries = summarize.truncate(entries,
+                                                       date + datetime.timedelta(days=1))
+                self.assertEqual(
+                    holdings.get_final_holdings(truncated_entries, included_account_types,
+                                                price_map_, date),
+                    holdings_list)
+
+        series = holdings.get_holdings_series(entries, dates, ('Assets',), price_map)
+        self.assertEqual([], series[0][1])
+        self.assertEqual(
+            [('Assets:Account1', D('10'), D('530.00')),
+             ('Assets:Cash', D('44919.05'), None)],
+            [(holding.account, holding.number, holding.price_number)
+             for holding in series[2][1]])
+
     @loader.load_doc()
     def test_get_final_holdings__zero_position(self, entries, _, __):
         """
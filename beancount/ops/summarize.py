@@ -9,6 +9,7 @@ total amount of that account.
 __copyright__ = "Copyright (C) 2013-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import bisect
 import datetime
 import collections
 
@@ -26,6 +27,7 @@ from beancount.core import convert
 from beancount.core import prices
 from beancount.ops import balance
 from beancount.utils import bisect_key
+from beancount.utils import memo
 from beancount.parser import options
 
 
@@ -35,7 +37,8 @@ def open(entries,
          conversion_currency,
          account_earnings,
          account_opening,
-         account_conversions):
+         account_conversions,
+         checkpoints=None):
     """Summarize entries before a date and transfer income/expenses to equity.
 
     This method essentially prepares a list of directives to contain only
@@ -75,6 +78,10 @@ def open(entries,
         opening balances account.
       account_conversions: A string, the name of the equity account to
         book currency conversions against.
+      checkpoints: An optional instance of BalanceCheckpoints computed from
+        'entries'. If provided, the balances at the date are computed from the
+        nearest checkpoint instead of from the beginning of the entries. The
+        result is the same.
     Returns:
       A new list of entries is returned, and the index that points to the first
       original transaction after the beginning date of the period. This index
@@ -82,6 +89,12 @@ def open(entries,
       sheet fed with only the summarized entries.
 
     """
+    if checkpoints is not None:
+        assert checkpoints.entries is entries, "Checkpoints of other entries"
+        return open_from_checkpoints(checkpoints, date, account_types,
+                                     conversion_currency, account_earnings,
+                                     account_opening, account_conversions)
+
     # Insert conversion entries.
     entries = conversions(entries, account_conversions, conversion_currency, date)
 
@@ -177,13 +190,14 @@ def clear(entries,
     return new_entries, index
 
 
-def open_opt(entries, date, options_map):
+def open_opt(entries, date, options_map, checkpoints=None):
     """Convenience function to open() using an options map.
     """
     account_types = options.get_account_types(options_map)
     previous_accounts = options.get_previous_accounts(options_map)
     conversion_currency = options_map['conversion_currency']
-    return open(entries, date, account_types, conversion_currency, *previous_accounts)
+    return open(entries, date, account_types, conversion_currency, *previous_accounts,
+                checkpoints=checkpoints)
 
 def close_opt(entries, date, options_map):
     """Convenience function to close() using an options map.
@@ -206,7 +220,8 @@ def clamp(entries,
           conversion_currency,
           account_earnings,
           account_opening,
-          account_conversions):
+          account_conversions,
+          checkpoints=None):
     """Filter entries to include only those during a specified time period.
 
     Firstly, this method will transfer all balances for the income and expense
@@ -239,12 +254,20 @@ def clamp(entries,
         opening balances account.
       account_conversions: A string, the name of the equity account to
         book currency conversions against.
+      checkpoints: An optional instance of BalanceCheckpoints computed from
+        'entries'. See open().
     Returns:
       A new list of entries is returned, and the index that points to the first
       original transaction after the beginning date of the period. This index
       can be used to generate the opening balances report, which is a balance
       sheet fed with only the summarized entries.
     """
+    if checkpoints is not None:
+        assert checkpoints.entries is entries, "Checkpoints of other entries"
+        return clamp_from_checkpoints(checkpoints, begin_date, end_date, account_types,
+                                      conversion_currency, account_earnings,
+                                      account_opening, account_conversions)
+
     # Transfer income and expenses before the period to equity.
     income_statement_account_pred = (
         lambda account: is_income_statement_account(account, account_types))
@@ -265,7 +288,7 @@ def clamp(entries,
     return entries, index
 
 
-def clamp_opt(entries, begin_date, end_date, options_map):
+def clamp_opt(entries, begin_date, end_date, options_map, checkpoints=None):
     """Clamp by getting all the parameters from an options map.
 
     See clamp() for details.
@@ -275,6 +298,7 @@ def clamp_opt(entries, begin_date, end_date, options_map):
       begin_date: See clamp().
       end_date: See clamp().
       options_map: A parser's option_map.
+      checkpoints: See clamp().
     Returns:
       Same as clamp().
     """
@@ -284,7 +308,8 @@ def clamp_opt(entries, begin_date, end_date, options_map):
     return clamp(entries, begin_date, end_date,
                  account_types,
                  conversion_currency,
-                 *previous_accounts)
+                 *previous_accounts,
+                 checkpoints=checkpoints)
 
 
 def cap(entries,
@@ -311,17 +336,36 @@ def cap(entries,
       A modified list of entries, with the income and expense accounts
       transferred.
     """
+    # Don't bother doing anything if there are no entries.
+    if not entries:
+        return entries
+
+    # Compute the final balances of the accounts and their total in a single
+    # pass. This produces the same output as transfer_balances() followed by
+    # conversions(), which would each sum up all the entries.
+    state = _Accumulator()
+    for index, entry in enumerate(entries):
+        state.update(index, entry)
 
     # Transfer the balances of income and expense accounts as earnings / net
     # income.
-    income_statement_account_pred = (
-        lambda account: is_income_statement_account(account, account_types))
-    entries = transfer_balances(entries, None,
-                                income_statement_account_pred,
-                                account_earnings)
+    income_balances = {account: account_balance
+                       for account, account_balance in state.balances.items()
+                       if is_income_statement_account(account, account_types)}
+    transfer_entries = create_entries_from_balances(
+        income_balances, entries[-1].date, account_earnings, False,
+        data.new_metadata('<transfer_balances>', 0), flags.FLAG_TRANSFER,
+        "Transfer balance for '{account}' (Transfer balance)")
+    entries = entries + transfer_entries
 
     # Insert final conversion entries.
-    entries = conversions(entries, account_conversions, conversion_currency, None)
+    for entry in transfer_entries:
+        for posting in entry.postings:
+            state.total.add_position(posting)
+    conversion_entry = create_conversion_entry(state.total, entries[-1].date,
+                                               account_conversions, conversion_currency)
+    if conversion_entry is not None:
+        entries.append(conversion_entry)
 
     return entries
 
@@ -473,11 +517,6 @@ def conversions(entries, conversion_account, conversion_currency, date=None):
     # Compute the balance at the given date.
     conversion_balance = interpolate.compute_entries_balance(entries, date=date)
 
-    # Early exit if there is nothing to do.
-    conversion_cost_balance = conversion_balance.reduce(convert.get_cost)
-    if conversion_cost_balance.is_empty():
-        return entries
-
     # Calculate the index and the date for the new entry. We want to store it as
     # the last transaction of the day before.
     if date is not None:
@@ -485,11 +524,41 @@ def conversions(entries, conversion_account, conversion_currency, date=None):
         last_date = date - datetime.timedelta(days=1)
     else:
         index = len(entries)
-        last_date = entries[-1].date
+        last_date = entries[-1].date if entries else None
+
+    conversion_entry = create_conversion_entry(conversion_balance, last_date,
+                                               conversion_account, conversion_currency)
+    # Early exit if there is nothing to do.
+    if conversion_entry is None:
+        return entries
+
+    # Make a copy of the list of entries and insert the new transaction into it.
+    new_entries = list(entries)
+    new_entries.insert(index, conversion_entry)
+
+    return new_entries
+
+
+def create_conversion_entry(conversion_balance, date,
+                            conversion_account, conversion_currency):
+    """Create a conversion entry to bring the cost balance of an inventory to zero.
+
+    Args:
+      conversion_balance: An Inventory instance, the total balance of all postings.
+      date: A datetime.date instance, the date of the new entry.
+      conversion_account: A string, the account to book against.
+      conversion_currency: A string, the transfer currency to use for zero prices
+        on the conversion entry.
+    Returns:
+      A new Transaction entry, or None, if the balance at cost is already empty.
+    """
+    conversion_cost_balance = conversion_balance.reduce(convert.get_cost)
+    if conversion_cost_balance.is_empty():
+        return None
 
     meta = data.new_metadata('<conversions>', -1)
     narration = 'Conversion for {}'.format(conversion_balance)
-    conversion_entry = Transaction(meta, last_date, flags.FLAG_CONVERSIONS,
+    conversion_entry = Transaction(meta, date, flags.FLAG_CONVERSIONS,
                                    None, narration, data.EMPTY_SET, data.EMPTY_SET, [])
     for position in conversion_cost_balance.get_positions():
         # Important note: Set the cost to zero here to maintain the balance
@@ -501,12 +570,7 @@ def conversions(entries, conversion_account, conversion_currency, date=None):
         conversion_entry.postings.append(
             data.Posting(conversion_account, neg_pos.units, neg_pos.cost,
                          price, None, None))
-
-    # Make a copy of the list of entries and insert the new transaction into it.
-    new_entries = list(entries)
-    new_entries.insert(index, conversion_entry)
-
-    return new_entries
+    return conversion_entry
 
 
 def truncate(entries, date):
@@ -646,3 +710,314 @@ def get_open_entries(entries, date):
             open_entries.pop(entry.account, None)
 
     return [entry for (index, entry) in sorted(open_entries.values())]
+
+
+class _Accumulator:
+    """The state accumulated over a prefix of a list of entries.
+
+    Attributes:
+      balances: A dict of account string to Inventory instance, the balance of
+        each account, as per balance_by_account().
+      total: An Inventory instance, the balance of all the postings, as per
+        interpolate.compute_entries_balance().
+      open_entries: A dict of account string to (index, Open entry) pairs, as
+        per get_open_entries().
+      price_entries: A dict of (base, quote) pairs to the last Price entry, as
+        per prices.get_last_price_entries().
+    """
+
+    def __init__(self):
+        self.balances = collections.defaultdict(inventory.Inventory)
+        self.total = inventory.Inventory()
+        self.open_entries = {}
+        self.price_entries = {}
+
+    def copy(self):
+        """Make a copy of this state which can be updated independently.
+
+        Returns:
+          A new instance of _Accumulator.
+        """
+        state = _Accumulator()
+        for account, account_balance in self.balances.items():
+            state.balances[account] = account_balance.__copy__()
+        state.total = self.total.__copy__()
+        state.open_entries = self.open_entries.copy()
+        state.price_entries = self.price_entries.copy()
+        return state
+
+    def update(self, index, entry):
+        """Accumulate a single entry.
+
+        Args:
+          index: An integer, the index of the entry in its list.
+          entry: A directive.
+        """
+        if isinstance(entry, Transaction):
+            for posting in entry.postings:
+                self.balances[posting.account].add_position(posting)
+                self.total.add_position(posting)
+
+        elif isinstance(entry, Open):
+            ex_open = self.open_entries.get(entry.account, None)
+            if ex_open is None or entry.date < ex_open[1].date:
+                self.open_entries[entry.account] = (index, entry)
+
+        elif isinstance(entry, Close):
+            self.open_entries.pop(entry.account, None)
+
+        elif isinstance(entry, data.Price):
+            self.price_entries[(entry.currency, entry.amount.currency)] = entry
+
+
+class BalanceCheckpoints:
+    """Cumulative balances of a list of entries at each month boundary.
+
+    This is used to compute the balances of all the accounts at an arbitrary
+    date by replaying only the entries from the nearest previous checkpoint,
+    instead of all the entries from the beginning of the list.
+
+    Attributes:
+      entries: The sorted list of directives the checkpoints were computed from.
+      num_entries: An integer, the length of 'entries' at the time the
+        checkpoints were computed.
+      dates: A sorted list of datetime.date instances, the checkpoint dates.
+      indexes: A list of integers, the index of the first entry on or after
+        each of the checkpoint dates.
+      states: A list of _Accumulator instances, the state accumulated over all
+        the entries strictly before each of the checkpoint dates.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.num_entries = len(entries)
+        self.dates = []
+        self.indexes = []
+        self.states = []
+
+        state = _Accumulator()
+        next_date = None
+        for index, entry in enumerate(entries):
+            if next_date is None or entry.date >= next_date:
+                # Save the state before the first entry of each new month.
+                month_date = entry.date.replace(day=1)
+                if next_date is not None:
+                    self.dates.append(month_date)
+                    self.indexes.append(index)
+                    self.states.append(state.copy())
+                next_date = next_month(month_date)
+            state.update(index, entry)
+
+    def get_state(self, date):
+        """Compute the state accumulated over all the entries strictly before a date.
+
+        Args:
+          date: A datetime.date instance.
+        Returns:
+          A pair of a new _Accumulator instance, which may be modified, and the
+          index of the first entry on or after the date.
+        """
+        cindex = bisect.bisect_right(self.dates, date) - 1
+        if cindex < 0:
+            state, index = _Accumulator(), 0
+        else:
+            state, index = self.states[cindex].copy(), self.indexes[cindex]
+
+        entries = self.entries
+        num_entries = len(entries)
+        while index < num_entries:
+            entry = entries[index]
+            if entry.date >= date:
+                break
+            state.update(index, entry)
+            index += 1
+        return state, index
+
+    def balance_by_account(self, date):
+        """Sum up the balance per account for all entries strictly before 'date'.
+
+        Args:
+          date: A datetime.date instance.
+        Returns:
+          Same as balance_by_account().
+        """
+        state, index = self.get_state(date)
+        return state.balances, index
+
+
+def next_month(date):
+    """Return the first day of the month following a date.
+
+    Args:
+      date: A datetime.date instance.
+    Returns:
+      A datetime.date instance.
+    """
+    if date.month == 12:
+        return datetime.date(date.year + 1, 1, 1)
+    return datetime.date(date.year, date.month + 1, 1)
+
+
+# A cache of balance checkpoints for the lists of entries most recently
+# summarized.
+_CHECKPOINTS = memo.ledger_cache(4)
+
+
+def get_checkpoints(entries):
+    """Get the balance checkpoints of a list of entries, computing them if needed.
+
+    Checkpoints are cached for the lifetime of the list object, so that
+    summarizing the same ledger again only replays the entries following the
+    nearest checkpoint. The list of entries must not be modified afterwards.
+
+    Args:
+      entries: A sorted list of directives.
+    Returns:
+      An instance of BalanceCheckpoints.
+    """
+    key = id(entries)
+    checkpoints = _CHECKPOINTS.get(key)
+    if (checkpoints is None or
+            checkpoints.entries is not entries or
+            checkpoints.num_entries != len(entries)):
+        checkpoints = BalanceCheckpoints(entries)
+        _CHECKPOINTS.put(key, checkpoints)
+    return checkpoints
+
+
+def open_from_checkpoints(checkpoints,
+                          date,
+                          account_types,
+                          conversion_currency,
+                          account_earnings,
+                          account_opening,
+                          account_conversions):
+    """Summarize entries before a date, starting from the nearest checkpoint.
+
+    This produces the same output as open() on the entries of the checkpoints
+    without replaying all the entries before the date. Rather than inserting
+    the conversion and transfer entries in the list of entries only to
+    summarize them away immediately after, their postings are applied directly
+    to the balances.
+
+    Args:
+      checkpoints: An instance of BalanceCheckpoints.
+      date: See open().
+      account_types: See open().
+      conversion_currency: See open().
+      account_earnings: See open().
+      account_opening: See open().
+      account_conversions: See open().
+    Returns:
+      Same as open().
+    """
+    state, index = checkpoints.get_state(date)
+    summarize_date = date - datetime.timedelta(days=1)
+
+    # Apply the conversion entry.
+    conversion_entry = create_conversion_entry(state.total, summarize_date,
+                                               account_conversions,
+                                               conversion_currency)
+    if conversion_entry is not None:
+        for posting in conversion_entry.postings:
+            state.balances[posting.account].add_position(posting)
+
+    before_entries, after_entries = _summarize_state(
+        state, checkpoints.entries[index:], date,
+        account_types, account_earnings, account_opening)
+    return (before_entries + after_entries), len(before_entries)
+
+
+def clamp_from_checkpoints(checkpoints,
+                           begin_date, end_date,
+                           account_types,
+                           conversion_currency,
+                           account_earnings,
+                           account_opening,
+                           account_conversions):
+    """Clamp entries to a period, starting from the nearest checkpoint.
+
+    This produces the same output as clamp() on the entries of the checkpoints
+    without replaying all the entries before the beginning of the period. See
+    open_from_checkpoints().
+
+    Args:
+      checkpoints: An instance of BalanceCheckpoints.
+      begin_date: See clamp().
+      end_date: See clamp().
+      account_types: See clamp().
+      conversion_currency: See clamp().
+      account_earnings: See clamp().
+      account_opening: See clamp().
+      account_conversions: See clamp().
+    Returns:
+      Same as clamp().
+    """
+    state, index = checkpoints.get_state(begin_date)
+    end_index = max(index, bisect_key.bisect_left_with_key(checkpoints.entries, end_date,
+                                                           key=lambda entry: entry.date))
+    before_entries, after_entries = _summarize_state(
+        state, checkpoints.entries[index:end_index], begin_date,
+        account_types, account_earnings, account_opening)
+
+    # Truncate the entries after the period. Note that this may also truncate
+    # summarizing entries, if the period is empty.
+    entries = truncate(before_entries + after_entries, end_date)
+
+    # Insert conversion entries.
+    entries = conversions(entries, account_conversions, conversion_currency, end_date)
+    return entries, len(before_entries)
+
+
+def _summarize_state(state, after_entries, date,
+                     account_types, account_earnings, account_opening):
+    """Transfer income and expenses and summarize the balances of a state.
+
+    Rather than inserting the transfer entries in the list of entries only to
+    summarize them away immediately after, their postings are applied directly
+    to the balances.
+
+    Args:
+      state: An instance of _Accumulator, the state accumulated over all the
+        entries before 'date'. It is modified.
+      after_entries: A list of the entries on or after 'date' to preserve.
+      date: A datetime.date instance, the cutoff date.
+      account_types: See open().
+      account_earnings: See open().
+      account_opening: See open().
+    Returns:
+      A pair of the list of summarizing entries, and the list of entries after
+      the date, without the balance assertions on the transferred accounts.
+    """
+    balances = state.balances
+    summarize_date = date - datetime.timedelta(days=1)
+
+    # Apply the transfers of income and expenses to equity.
+    transfer_balances = {account: account_balance
+                         for account, account_balance in balances.items()
+                         if is_income_statement_account(account, account_types)}
+    transfer_entries = create_entries_from_balances(
+        transfer_balances, summarize_date, account_earnings, False,
+        data.new_metadata('<transfer_balances>', 0), flags.FLAG_TRANSFER,
+        "Transfer balance for '{account}' (Transfer balance)")
+    for entry in transfer_entries:
+        for posting in entry.postings:
+            balances[posting.account].add_position(posting)
+
+    # Summarize the balances.
+    summarizing_entries = create_entries_from_balances(
+        balances, summarize_date, account_opening, True,
+        data.new_metadata('<summarize>', 0), flags.FLAG_SUMMARIZE,
+        "Opening balance for '{account}' (Summarization)")
+    price_entries = sorted(state.price_entries.values(), key=data.entry_sortkey)
+    open_entries = [entry for (_, entry) in sorted(state.open_entries.values())]
+    before_entries = sorted(open_entries + price_entries + summarizing_entries,
+                            key=data.entry_sortkey)
+
+    # Remove balance assertions on the transferred accounts.
+    after_entries = [entry
+                     for entry in after_entries
+                     if not (isinstance(entry, balance.Balance) and
+                             entry.account in transfer_balances)]
+
+    return before_entries, after_entries
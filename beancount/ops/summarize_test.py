@@ -10,6 +10,7 @@ import datetime
 import collections
 import re
 import unittest
+from os import path
 
 from beancount.core import inventory
 from beancount.core import data
@@ -21,6 +22,7 @@ from beancount.parser import printer
 from beancount.parser import options
 from beancount.parser import cmptest
 from beancount.utils import misc_utils
+from beancount.utils import test_utils
 from beancount import loader
 
 
@@ -358,6 +360,108 @@ class TestOpenCloseWithOptions(TestOpenClose):
         return summarize.clear_opt(entries, date, self.options_map)
 
 
+class TestOpenCloseWithCheckpoints(TestOpenClose):
+    "Same test as the previous, but opening from balance checkpoints."
+
+    def do_open(self, entries, date, *args):
+        return summarize.open(entries, date, *args,
+                              checkpoints=summarize.BalanceCheckpoints(entries))
+
+
+class TestBalanceCheckpoints(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        example_filename = path.join(test_utils.find_repository_root(__file__),
+                                     'examples', 'example.beancount')
+        cls.entries, _, cls.options_map = loader.load_file(example_filename)
+
+    def test_checkpoints(self):
+        checkpoints = summarize.BalanceCheckpoints(self.entries)
+        self.assertTrue(checkpoints.dates)
+        self.assertTrue(all(date.day == 1 for date in checkpoints.dates))
+        self.assertEqual(sorted(checkpoints.dates), checkpoints.dates)
+        for date, index in zip(checkpoints.dates, checkpoints.indexes):
+            self.assertLess(self.entries[index - 1].date, date)
+            self.assertLessEqual(date, self.entries[index].date)
+
+    def test_balance_by_account(self):
+        checkpoints = summarize.BalanceCheckpoints(self.entries)
+        first_date = self.entries[0].date
+        for date in [first_date,
+                     datetime.date(first_date.year, 1, 1),
+                     datetime.date(2014, 3, 1),
+                     datetime.date(2015, 7, 17),
+                     datetime.date(2030, 1, 1)]:
+            self.assertEqual(summarize.balance_by_account(self.entries, date),
+                             checkpoints.balance_by_account(date))
+
+    def test_open(self):
+        checkpoints = summarize.BalanceCheckpoints(self.entries)
+        args = (options.get_account_types(self.options_map),
+                self.options_map['conversion_currency'],
+                *options.get_previous_accounts(self.options_map))
+        for date in [datetime.date(2013, 1, 1),
+                     datetime.date(2014, 5, 1),
+                     datetime.date(2015, 7, 17),
+                     datetime.date(2016, 1, 1)]:
+            self.assertEqual(
+                summarize.open(self.entries, date, *args),
+                summarize.open(self.entries, date, *args, checkpoints=checkpoints))
+
+    def test_clamp(self):
+        checkpoints = summarize.BalanceCheckpoints(self.entries)
+        args = (options.get_account_types(self.options_map),
+                self.options_map['conversion_currency'],
+                *options.get_previous_accounts(self.options_map))
+        for begin_date, end_date in [(datetime.date(2013, 1, 1), datetime.date(2014, 1, 1)),
+                                     (datetime.date(2014, 5, 1), datetime.date(2014, 6, 1)),
+                                     (datetime.date(2015, 7, 17), datetime.date(2015, 7, 18)),
+                                     (datetime.date(2016, 1, 1), datetime.date(2030, 1, 1)),
+                                     (datetime.date(2016, 1, 1), datetime.date(2015, 1, 1))]:
+            self.assertEqual(
+                summarize.clamp(self.entries, begin_date, end_date, *args),
+                summarize.clamp(self.entries, begin_date, end_date, *args,
+                                checkpoints=checkpoints))
+
+    def test_cap(self):
+        account_types = options.get_account_types(self.options_map)
+        conversion_currency = self.options_map['conversion_currency']
+        account_earnings, account_conversions = options.get_current_accounts(
+            self.options_map)
+        for entries in [self.entries,
+                        summarize.clamp_opt(self.entries,
+                                            datetime.date(2014, 1, 1),
+                                            datetime.date(2015, 1, 1),
+                                            self.options_map)[0]]:
+            expected_entries = summarize.transfer_balances(
+                entries, None,
+                lambda account: summarize.is_income_statement_account(account,
+                                                                      account_types),
+                account_earnings)
+            expected_entries = summarize.conversions(
+                expected_entries, account_conversions, conversion_currency, None)
+            self.assertEqual(expected_entries,
+                             summarize.cap(entries, account_types, conversion_currency,
+                                           account_earnings, account_conversions))
+
+    def test_empty(self):
+        entries = []
+        checkpoints = summarize.BalanceCheckpoints(entries)
+        self.assertEqual(([], 0), summarize.open_opt(
+            entries, datetime.date(2014, 1, 1), options.OPTIONS_DEFAULTS,
+            checkpoints=checkpoints))
+        self.assertEqual(([], 0), summarize.clamp_opt(
+            entries, datetime.date(2014, 1, 1), datetime.date(2015, 1, 1),
+            options.OPTIONS_DEFAULTS, checkpoints=checkpoints))
+
+    def test_get_checkpoints(self):
+        entries = list(self.entries)
+        checkpoints = summarize.get_checkpoints(entries)
+        self.assertIs(checkpoints, summarize.get_checkpoints(entries))
+        self.assertIsNot(checkpoints, summarize.get_checkpoints(list(entries)))
+
+
 class TestClamp(cmptest.TestCase):
 
     @loader.load_doc()
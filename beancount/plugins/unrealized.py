@@ -77,9 +77,6 @@ def add_unrealized_gains(entries, options_map, subaccount=None):
     holdings_list = holdings.aggregate_holdings_by(
         holdings_list, lambda h: (h.account, h.currency, h.cost_currency))
 
-    # Get the latest prices from the entries.
-    price_map = prices.build_price_map(entries)
-
     # Create transactions to account for each position.
     new_entries = []
     latest_date = entries[-1].date
@@ -0,0 +1,134 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'top_statementleftORleftANDleftNOTleftPLUSMINUSleftASTERISKSLASHleftEQNEGTGTELTLTETILDEINANALYZE AND AS ASC ASTERISK AT BALANCES BY CLEAR CLOSE COMMA DATE DECIMAL DESC DISTINCT EQ ERRORS EXPLAIN FALSE FLATTEN FROM GROUP GT GTE HAVING ID IN INTEGER JOURNAL LIMIT LPAREN LT LTE MINUS NE NOT NULL ON OPEN OR ORDER PIVOT PLUS PRINT RELOAD RPAREN RUN SELECT SEMI SLASH STRING TILDE TRUE WHERE\n        account : STRING\n        \n        select_statement : SELECT distinct target_spec from_subselect where                            group_by order_by pivot_by limit flatten\n        \n        distinct : empty\n                 | DISTINCT\n        \n        target_spec : ASTERISK\n                    | target_list\n        \n        target_list : target\n                    | target_list COMMA target\n        \n        target : expression AS ID\n               | expression\n        \n        from : empty\n             | FROM opt_expression opt_open opt_close opt_clear\n        \n        from_subselect : from\n                       | FROM LPAREN select_statement RPAREN\n        \n        opt_open : empty\n                 | OPEN ON DATE\n        \n        opt_close : empty\n                  | CLOSE\n                  | CLOSE ON DATE\n        \n        opt_clear : empty\n                  | CLEAR\n        \n        where : empty\n              | WHERE expression\n        \n        expr_index_list : expr_index\n                        | expr_index_list COMMA expr_index\n        \n        expr_index : expression\n                   | INTEGER\n        \n        group_by : empty\n                 | GROUP BY expr_index_list having\n        \n        having : empty\n               | HAVING expression\n        \n        order_by : empty\n                 | ORDER BY expr_index_list ordering\n        \n        ordering : empty\n                 | ASC\n                 | DESC\n        \n        pivot_by : empty\n                 | PIVOT BY column_list\n        \n        limit : empty\n              | LIMIT INTEGER\n        \n        flatten : empty\n                | FLATTEN\n        expression : expression AND expressionexpression : expression OR expressionexpression : NOT expressionexpression : LPAREN expression RPARENexpression : expression EQ expressionexpression : expression NE expressionexpression : expression GT expressionexpression : expression GTE expressionexpression : expression LT expressionexpression : expression LTE expressionexpression : expression TILDE expressionexpression : expression IN expressionexpression : columnexpression : constantexpression : expression ASTERISK expressionexpression : expression SLASH expressionexpression : expression PLUS expressionexpression : expression MINUS expressionexpression : ID LPAREN expression_list_opt RPAREN\n        opt_expression : empty\n                       | expression\n        \n        expression_list_opt : empty\n                            | expression\n                            | expression_list COMMA expression\n        \n        expression_list : expression\n                        | expression_list COMMA expression\n        \n        column : ID\n        \n        column_list : column\n                    | column_list COMMA column\n        \n        constant : NULL\n                 | boolean\n                 | INTEGER\n                 | DECIMAL\n                 | STRING\n                 | DATE\n        \n        boolean : TRUE\n                | FALSE\n        \n        empty :\n        top_statement : statement delimitertop_statement : EXPLAIN statement delimitertop_statement : EXPLAIN ANALYZE statement delimiter\n        statement : select_statement\n                  | balances_statement\n                  | journal_statement\n                  | print_statement\n                  | run_statement\n                  | errors_statement\n                  | reload_statement\n        \n        delimiter : SEMI\n                  | empty\n        \n        balances_statement : BALANCES summary_func from where\n        \n        journal_statement : JOURNAL summary_func from\n                          | JOURNAL account summary_func from\n        \n        summary_func : empty\n                     | AT ID\n        \n        print_statement : PRINT from\n        \n        run_statement : RUN ID\n                      | RUN STRING\n                      | RUN ASTERISK\n                      | RUN empty\n        \n        errors_statement : ERRORS\n        \n        reload_statement : RELOAD\n        '
+    
+_lr_action_items = {'EXPLAIN':([0,],[3,]),'SELECT':([0,3,22,97,],[11,11,11,11,]),'BALANCES':([0,3,22,],[12,12,12,]),'JOURNAL':([0,3,22,],[13,13,13,]),'PRINT':([0,3,22,],[14,14,14,]),'RUN':([0,3,22,],[15,15,15,]),'ERRORS':([0,3,22,],[16,16,16,]),'RELOAD':([0,3,22,],[17,17,17,]),'$end':([1,2,4,5,6,7,8,9,10,12,13,14,15,16,17,18,19,20,21,26,27,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,87,89,90,92,93,94,96,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,119,120,121,122,124,125,128,130,131,132,134,135,136,139,141,142,143,146,147,148,149,150,151,154,155,157,159,160,161,162,163,164,165,166,167,168,169,170,171,173,],[0,-80,-84,-85,-86,-87,-88,-89,-90,-80,-80,-80,-80,-103,-104,-81,-91,-92,-80,-80,-96,-80,-80,-1,-98,-11,-80,-99,-100,-101,-102,-82,-80,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-97,-94,-80,-80,-62,-63,-83,-80,-13,-80,-45,-93,-22,-95,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,-80,-32,-14,-19,-80,-37,-80,-24,-26,-27,-80,-39,-80,-29,-30,-2,-41,-42,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'SEMI':([2,4,5,6,7,8,9,10,12,13,14,15,16,17,21,26,27,29,30,31,32,33,34,35,36,37,38,40,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,67,68,69,87,89,90,92,93,94,96,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,119,120,121,122,124,125,128,130,131,132,134,135,136,139,141,142,143,146,147,148,149,150,151,154,155,157,159,160,161,162,163,164,165,166,167,168,169,170,171,173,],[19,-84,-85,-86,-87,-88,-89,-90,-80,-80,-80,-80,-103,-104,19,-80,-96,-80,-80,-1,-98,-11,-80,-99,-100,-101,-102,19,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-97,-94,-80,-80,-62,-63,-80,-13,-80,-45,-93,-22,-95,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,-80,-32,-14,-19,-80,-37,-80,-24,-26,-27,-80,-39,-80,-29,-30,-2,-41,-42,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'ANALYZE':([3,],[22,]),'DISTINCT':([11,],[25,]),'ASTERISK':([11,15,23,24,25,45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[-80,37,42,-3,-4,82,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,82,82,82,82,82,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,82,82,82,-46,82,-61,82,82,-74,82,]),'NOT':([11,23,24,25,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[-80,47,-3,-4,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,]),'LPAREN':([11,23,24,25,34,46,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[-80,48,-3,-4,48,86,48,48,97,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,]),'ID':([11,15,23,24,25,28,34,47,48,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,153,156,158,172,],[-80,35,46,-3,-4,60,46,46,46,46,46,99,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,165,46,46,165,]),'NULL':([11,23,24,25,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[-80,51,-3,-4,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,]),'INTEGER':([11,23,24,25,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,152,156,158,],[-80,53,-3,-4,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,149,149,162,149,53,]),'DECIMAL':([11,23,24,25,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[-80,54,-3,-4,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,]),'STRING':([11,13,15,23,24,25,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[-80,31,36,55,-3,-4,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,]),'DATE':([11,23,24,25,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,123,129,133,138,145,156,158,],[-80,56,-3,-4,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,134,56,141,56,56,56,56,]),'TRUE':([11,23,24,25,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[-80,57,-3,-4,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,57,]),'FALSE':([11,23,24,25,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[-80,58,-3,-4,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,58,]),'AT':([12,13,30,31,],[28,28,28,-1,]),'FROM':([12,13,14,26,27,29,30,31,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,60,62,87,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,128,],[-80,-80,34,34,-96,34,-80,-1,69,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-97,34,-45,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,]),'WHERE':([12,26,27,33,34,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,59,60,63,64,65,67,68,69,87,93,94,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,120,121,122,128,130,131,132,134,139,141,],[-80,-80,-96,-11,-80,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,91,-97,-80,-62,-63,91,-13,-80,-45,-80,-15,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-80,-17,-18,-61,-12,-20,-21,-16,-14,-19,]),'GROUP':([33,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,63,64,65,67,68,69,87,90,93,94,96,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,119,120,121,122,128,130,131,132,134,139,141,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,126,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-61,-12,-20,-21,-16,-14,-19,]),'ORDER':([33,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,63,64,65,67,68,69,87,90,93,94,96,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,119,120,121,122,124,125,128,130,131,132,134,139,141,146,147,148,149,155,157,170,171,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,137,-28,-61,-12,-20,-21,-16,-14,-19,-80,-24,-26,-27,-29,-30,-25,-31,]),'PIVOT':([33,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,63,64,65,67,68,69,87,90,93,94,96,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,119,120,121,122,124,125,128,130,131,132,134,135,136,139,141,146,147,148,149,154,155,157,166,167,168,169,170,171,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,144,-32,-14,-19,-80,-24,-26,-27,-80,-29,-30,-33,-34,-35,-36,-25,-31,]),'LIMIT':([33,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,63,64,65,67,68,69,87,90,93,94,96,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,119,120,121,122,124,125,128,130,131,132,134,135,136,139,141,142,143,146,147,148,149,154,155,157,163,164,165,166,167,168,169,170,171,173,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,-80,-32,-14,-19,152,-37,-80,-24,-26,-27,-80,-29,-30,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'FLATTEN':([33,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,63,64,65,67,68,69,87,90,93,94,96,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,119,120,121,122,124,125,128,130,131,132,134,135,136,139,141,142,143,146,147,148,149,150,151,154,155,157,162,163,164,165,166,167,168,169,170,171,173,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,-80,-32,-14,-19,-80,-37,-80,-24,-26,-27,161,-39,-80,-29,-30,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'RPAREN':([33,41,42,43,44,45,46,49,50,51,52,53,54,55,56,57,58,63,64,65,67,68,69,86,87,88,90,93,94,96,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,114,115,116,118,119,120,121,122,124,125,127,128,130,131,132,134,135,136,139,140,141,142,143,146,147,148,149,150,151,154,155,157,159,160,161,162,163,164,165,166,167,168,169,170,171,173,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-80,-45,118,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,128,-64,-65,-46,-23,-80,-17,-18,-80,-28,139,-61,-12,-20,-21,-16,-80,-32,-14,-66,-19,-80,-37,-80,-24,-26,-27,-80,-39,-80,-29,-30,-2,-41,-42,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'OPEN':([34,46,49,50,51,52,53,54,55,56,57,58,63,64,65,69,87,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,128,],[-80,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,95,-62,-63,-80,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,]),'CLOSE':([34,46,49,50,51,52,53,54,55,56,57,58,63,64,65,69,87,93,94,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,128,134,],[-80,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-45,122,-15,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,-16,]),'CLEAR':([34,46,49,50,51,52,53,54,55,56,57,58,63,64,65,69,87,93,94,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,120,121,122,128,134,141,],[-80,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-45,-80,-15,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,132,-17,-18,-61,-16,-19,]),'COMMA':([43,44,45,46,49,50,51,52,53,54,55,56,57,58,87,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,117,118,128,140,146,147,148,149,154,163,164,165,170,173,],[70,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-67,129,-46,-61,-68,156,-24,-26,-27,156,172,-70,-69,-25,-71,]),'AS':([45,46,49,50,51,52,53,54,55,56,57,58,87,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,128,],[71,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,]),'AND':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[72,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,72,-45,72,-43,72,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,72,-46,72,-61,72,72,-74,72,]),'OR':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[73,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,73,-45,73,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,73,-46,73,-61,73,73,-74,73,]),'EQ':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[74,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,74,74,74,74,74,-47,-48,-49,-50,-51,-52,-53,-54,74,74,74,74,74,-46,74,-61,74,74,-74,74,]),'NE':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[75,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,75,75,75,75,75,-47,-48,-49,-50,-51,-52,-53,-54,75,75,75,75,75,-46,75,-61,75,75,-74,75,]),'GT':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[76,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,76,76,76,76,76,-47,-48,-49,-50,-51,-52,-53,-54,76,76,76,76,76,-46,76,-61,76,76,-74,76,]),'GTE':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[77,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,77,77,77,77,77,-47,-48,-49,-50,-51,-52,-53,-54,77,77,77,77,77,-46,77,-61,77,77,-74,77,]),'LT':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[78,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,78,78,78,78,78,-47,-48,-49,-50,-51,-52,-53,-54,78,78,78,78,78,-46,78,-61,78,78,-74,78,]),'LTE':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[79,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,79,79,79,79,79,-47,-48,-49,-50,-51,-52,-53,-54,79,79,79,79,79,-46,79,-61,79,79,-74,79,]),'TILDE':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[80,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,80,80,80,80,80,-47,-48,-49,-50,-51,-52,-53,-54,80,80,80,80,80,-46,80,-61,80,80,-74,80,]),'IN':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[81,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,81,81,81,81,81,-47,-48,-49,-50,-51,-52,-53,-54,81,81,81,81,81,-46,81,-61,81,81,-74,81,]),'SLASH':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[83,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,83,83,83,83,83,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,83,83,83,-46,83,-61,83,83,-74,83,]),'PLUS':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[84,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,84,84,84,84,84,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,84,-46,84,-61,84,84,-74,84,]),'MINUS':([45,46,49,50,51,52,53,54,55,56,57,58,65,87,88,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,118,119,128,140,148,149,171,],[85,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,85,85,85,85,85,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,85,-46,85,-61,85,85,-74,85,]),'HAVING':([46,49,50,51,52,53,54,55,56,57,58,87,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,128,146,147,148,149,170,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,158,-24,-26,-27,-25,]),'ASC':([46,49,50,51,52,53,54,55,56,57,58,87,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,128,147,148,149,154,170,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,-24,-26,-27,168,-25,]),'DESC':([46,49,50,51,52,53,54,55,56,57,58,87,100,101,102,103,104,105,106,107,108,109,110,111,112,113,118,128,147,148,149,154,170,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,-24,-26,-27,169,-25,]),'ON':([95,122,],[123,133,]),'BY':([126,137,144,],[138,145,153,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'top_statement':([0,],[1,]),'statement':([0,3,22,],[2,21,40,]),'select_statement':([0,3,22,97,],[4,4,4,127,]),'balances_statement':([0,3,22,],[5,5,5,]),'journal_statement':([0,3,22,],[6,6,6,]),'print_statement':([0,3,22,],[7,7,7,]),'run_statement':([0,3,22,],[8,8,8,]),'errors_statement':([0,3,22,],[9,9,9,]),'reload_statement':([0,3,22,],[10,10,10,]),'delimiter':([2,21,40,],[18,39,66,]),'empty':([2,11,12,13,14,15,21,26,29,30,34,40,41,59,62,63,67,69,86,93,96,120,124,135,142,146,150,154,],[20,24,27,27,33,38,20,33,33,27,64,20,33,90,33,94,90,64,115,121,125,131,136,143,151,157,160,167,]),'distinct':([11,],[23,]),'summary_func':([12,13,30,],[26,29,62,]),'account':([13,],[30,]),'from':([14,26,29,41,62,],[32,59,61,68,92,]),'target_spec':([23,],[41,]),'target_list':([23,],[43,]),'target':([23,70,],[44,98,]),'expression':([23,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[45,65,87,88,65,45,100,101,102,103,104,105,106,107,108,109,110,111,112,113,116,119,88,140,148,148,148,171,]),'column':([23,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,153,156,158,172,],[49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,164,49,49,173,]),'constant':([23,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,]),'boolean':([23,34,47,48,69,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,91,97,129,138,145,156,158,],[52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,]),'opt_expression':([34,69,],[63,63,]),'from_subselect':([41,],[67,]),'where':([59,67,],[89,96,]),'opt_open':([63,],[93,]),'expression_list_opt':([86,],[114,]),'expression_list':([86,],[117,]),'opt_close':([93,],[120,]),'group_by':([96,],[124,]),'opt_clear':([120,],[130,]),'order_by':([124,],[135,]),'pivot_by':([135,],[142,]),'expr_index_list':([138,145,],[146,154,]),'expr_index':([138,145,156,],[147,147,170,]),'limit':([142,],[150,]),'having':([146,],[155,]),'flatten':([150,],[159,]),'column_list':([153,],[163,]),'ordering':([154,],[166,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> top_statement","S'",1,None,None,None),
+  ('account -> STRING','account',1,'p_account','query_parser.py',348),
+  ('select_statement -> SELECT distinct target_spec from_subselect where group_by order_by pivot_by limit flatten','select_statement',10,'p_select_statement','query_parser.py',354),
+  ('distinct -> empty','distinct',1,'p_distinct','query_parser.py',361),
+  ('distinct -> DISTINCT','distinct',1,'p_distinct','query_parser.py',362),
+  ('target_spec -> ASTERISK','target_spec',1,'p_target_spec','query_parser.py',368),
+  ('target_spec -> target_list','target_spec',1,'p_target_spec','query_parser.py',369),
+  ('target_list -> target','target_list',1,'p_target_list','query_parser.py',375),
+  ('target_list -> target_list COMMA target','target_list',3,'p_target_list','query_parser.py',376),
+  ('target -> expression AS ID','target',3,'p_target','query_parser.py',382),
+  ('target -> expression','target',1,'p_target','query_parser.py',383),
+  ('from -> empty','from',1,'p_from','query_parser.py',389),
+  ('from -> FROM opt_expression opt_open opt_close opt_clear','from',5,'p_from','query_parser.py',390),
+  ('from_subselect -> from','from_subselect',1,'p_from_subselect','query_parser.py',401),
+  ('from_subselect -> FROM LPAREN select_statement RPAREN','from_subselect',4,'p_from_subselect','query_parser.py',402),
+  ('opt_open -> empty','opt_open',1,'p_opt_open','query_parser.py',411),
+  ('opt_open -> OPEN ON DATE','opt_open',3,'p_opt_open','query_parser.py',412),
+  ('opt_close -> empty','opt_close',1,'p_opt_close','query_parser.py',418),
+  ('opt_close -> CLOSE','opt_close',1,'p_opt_close','query_parser.py',419),
+  ('opt_close -> CLOSE ON DATE','opt_close',3,'p_opt_close','query_parser.py',420),
+  ('opt_clear -> empty','opt_clear',1,'p_opt_clear','query_parser.py',428),
+  ('opt_clear -> CLEAR','opt_clear',1,'p_opt_clear','query_parser.py',429),
+  ('where -> empty','where',1,'p_where','query_parser.py',435),
+  ('where -> WHERE expression','where',2,'p_where','query_parser.py',436),
+  ('expr_index_list -> expr_index','expr_index_list',1,'p_expr_index_list','query_parser.py',444),
+  ('expr_index_list -> expr_index_list COMMA expr_index','expr_index_list',3,'p_expr_index_list','query_parser.py',445),
+  ('expr_index -> expression','expr_index',1,'p_expr_index','query_parser.py',451),
+  ('expr_index -> INTEGER','expr_index',1,'p_expr_index','query_parser.py',452),
+  ('group_by -> empty','group_by',1,'p_group_by','query_parser.py',458),
+  ('group_by -> GROUP BY expr_index_list having','group_by',4,'p_group_by','query_parser.py',459),
+  ('having -> empty','having',1,'p_having','query_parser.py',465),
+  ('having -> HAVING expression','having',2,'p_having','query_parser.py',466),
+  ('order_by -> empty','order_by',1,'p_order_by','query_parser.py',472),
+  ('order_by -> ORDER BY expr_index_list ordering','order_by',4,'p_order_by','query_parser.py',473),
+  ('ordering -> empty','ordering',1,'p_ordering','query_parser.py',479),
+  ('ordering -> ASC','ordering',1,'p_ordering','query_parser.py',480),
+  ('ordering -> DESC','ordering',1,'p_ordering','query_parser.py',481),
+  ('pivot_by -> empty','pivot_by',1,'p_pivot_by','query_parser.py',487),
+  ('pivot_by -> PIVOT BY column_list','pivot_by',3,'p_pivot_by','query_parser.py',488),
+  ('limit -> empty','limit',1,'p_limit','query_parser.py',494),
+  ('limit -> LIMIT INTEGER','limit',2,'p_limit','query_parser.py',495),
+  ('flatten -> empty','flatten',1,'p_flatten','query_parser.py',501),
+  ('flatten -> FLATTEN','flatten',1,'p_flatten','query_parser.py',502),
+  ('expression -> expression AND expression','expression',3,'p_expression_and','query_parser.py',517),
+  ('expression -> expression OR expression','expression',3,'p_expression_or','query_parser.py',521),
+  ('expression -> NOT expression','expression',2,'p_expression_not','query_parser.py',525),
+  ('expression -> LPAREN expression RPAREN','expression',3,'p_expression_paren','query_parser.py',529),
+  ('expression -> expression EQ expression','expression',3,'p_expression_eq','query_parser.py',533),
+  ('expression -> expression NE expression','expression',3,'p_expression_ne','query_parser.py',537),
+  ('expression -> expression GT expression','expression',3,'p_expression_gt','query_parser.py',541),
+  ('expression -> expression GTE expression','expression',3,'p_expression_gte','query_parser.py',545),
+  ('expression -> expression LT expression','expression',3,'p_expression_lt','query_parser.py',549),
+  ('expression -> expression LTE expression','expression',3,'p_expression_lte','query_parser.py',553),
+  ('expression -> expression TILDE expression','expression',3,'p_expression_match','query_parser.py',557),
+  ('expression -> expression IN expression','expression',3,'p_expression_contains','query_parser.py',561),
+  ('expression -> column','expression',1,'p_expression_column','query_parser.py',565),
+  ('expression -> constant','expression',1,'p_expression_constant','query_parser.py',569),
+  ('expression -> expression ASTERISK expression','expression',3,'p_expression_mul','query_parser.py',573),
+  ('expression -> expression SLASH expression','expression',3,'p_expression_div','query_parser.py',577),
+  ('expression -> expression PLUS expression','expression',3,'p_expression_add','query_parser.py',581),
+  ('expression -> expression MINUS expression','expression',3,'p_expression_sub','query_parser.py',585),
+  ('expression -> ID LPAREN expression_list_opt RPAREN','expression',4,'p_expression_function','query_parser.py',589),
+  ('opt_expression -> empty','opt_expression',1,'p_opt_expression','query_parser.py',594),
+  ('opt_expression -> expression','opt_expression',1,'p_opt_expression','query_parser.py',595),
+  ('expression_list_opt -> empty','expression_list_opt',1,'p_expression_list_opt','query_parser.py',601),
+  ('expression_list_opt -> expression','expression_list_opt',1,'p_expression_list_opt','query_parser.py',602),
+  ('expression_list_opt -> expression_list COMMA expression','expression_list_opt',3,'p_expression_list_opt','query_parser.py',603),
+  ('expression_list -> expression','expression_list',1,'p_expression_list','query_parser.py',609),
+  ('expression_list -> expression_list COMMA expression','expression_list',3,'p_expression_list','query_parser.py',610),
+  ('column -> ID','column',1,'p_column','query_parser.py',616),
+  ('column_list -> column','column_list',1,'p_column_list','query_parser.py',622),
+  ('column_list -> column_list COMMA column','column_list',3,'p_column_list','query_parser.py',623),
+  ('constant -> NULL','constant',1,'p_constant','query_parser.py',629),
+  ('constant -> boolean','constant',1,'p_constant','query_parser.py',630),
+  ('constant -> INTEGER','constant',1,'p_constant','query_parser.py',631),
+  ('constant -> DECIMAL','constant',1,'p_constant','query_parser.py',632),
+  ('constant -> STRING','constant',1,'p_constant','query_parser.py',633),
+  ('constant -> DATE','constant',1,'p_constant','query_parser.py',634),
+  ('boolean -> TRUE','boolean',1,'p_boolean','query_parser.py',640),
+  ('boolean -> FALSE','boolean',1,'p_boolean','query_parser.py',641),
+  ('empty -> <empty>','empty',0,'p_empty','query_parser.py',647),
+  ('top_statement -> statement delimiter','top_statement',2,'p_regular_statement','query_parser.py',672),
+  ('top_statement -> EXPLAIN statement delimiter','top_statement',3,'p_explain_statement','query_parser.py',676),
+  ('top_statement -> EXPLAIN ANALYZE statement delimiter','top_statement',4,'p_explain_analyze_statement','query_parser.py',680),
+  ('statement -> select_statement','statement',1,'p_statement','query_parser.py',685),
+  ('statement -> balances_statement','statement',1,'p_statement','query_parser.py',686),
+  ('statement -> journal_statement','statement',1,'p_statement','query_parser.py',687),
+  ('statement -> print_statement','statement',1,'p_statement','query_parser.py',688),
+  ('statement -> run_statement','statement',1,'p_statement','query_parser.py',689),
+  ('statement -> errors_statement','statement',1,'p_statement','query_parser.py',690),
+  ('statement -> reload_statement','statement',1,'p_statement','query_parser.py',691),
+  ('delimiter -> SEMI','delimiter',1,'p_delimiter','query_parser.py',697),
+  ('delimiter -> empty','delimiter',1,'p_delimiter','query_parser.py',698),
+  ('balances_statement -> BALANCES summary_func from where','balances_statement',4,'p_balances_statement','query_parser.py',703),
+  ('journal_statement -> JOURNAL summary_func from','journal_statement',3,'p_journal_statement','query_parser.py',709),
+  ('journal_statement -> JOURNAL account summary_func from','journal_statement',4,'p_journal_statement','query_parser.py',710),
+  ('summary_func -> empty','summary_func',1,'p_summary_func','query_parser.py',716),
+  ('summary_func -> AT ID','summary_func',2,'p_summary_func','query_parser.py',717),
+  ('print_statement -> PRINT from','print_statement',2,'p_print_statement','query_parser.py',723),
+  ('run_statement -> RUN ID','run_statement',2,'p_run_statement','query_parser.py',729),
+  ('run_statement -> RUN STRING','run_statement',2,'p_run_statement','query_parser.py',730),
+  ('run_statement -> RUN ASTERISK','run_statement',2,'p_run_statement','query_parser.py',731),
+  ('run_statement -> RUN empty','run_statement',2,'p_run_statement','query_parser.py',732),
+  ('errors_statement -> ERRORS','errors_statement',1,'p_errors_statement','query_parser.py',738),
+  ('reload_statement -> RELOAD','reload_statement',1,'p_reload_statement','query_parser.py',744),
+]
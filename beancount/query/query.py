@@ -10,7 +10,7 @@ from beancount.query import query_execute
 from beancount.query import numberify as numberify_lib
 
 
-def run_query(entries, options_map, query, *format_args, numberify=False):
+def run_query(entries, options_map, query, *format_args, numberify=False, cache=None):
     """Compile and execute a query, return the result types and rows.
 
     Args:
@@ -21,6 +21,8 @@ def run_query(entries, options_map, query, *format_args, numberify=False):
       format_args: A tuple of arguments to be formatted in the query. This is
         just provided as a convenience.
       numberify: If true, numberify the results before returning them.
+      cache: An optional instance of QueryCache, used to reuse the results of
+        identical queries run against the same entries of the same ledger.
     Returns:
       A pair of result types and result rows.
     Raises:
@@ -35,8 +37,7 @@ def run_query(entries, options_map, query, *format_args, numberify=False):
     formatted_query = query.format(*format_args)
 
     # Parse the statement.
-    parser = query_parser.Parser()
-    statement = parser.parse(formatted_query)
+    statement = query_parser.parse(formatted_query)
 
     # Compile the SELECT statement.
     c_query = query_compile.compile(statement,
@@ -45,7 +46,10 @@ def run_query(entries, options_map, query, *format_args, numberify=False):
                                     env_entries)
 
     # Execute it to obtain the result rows.
-    rtypes, rrows = query_execute.execute_query(c_query, entries, options_map)
+    if cache is not None:
+        rtypes, rrows = cache.execute_query(c_query, entries, options_map)
+    else:
+        rtypes, rrows = query_execute.execute_query(c_query, entries, options_map)
 
     # Numberify the results, if requested.
     if numberify:
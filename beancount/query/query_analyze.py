@@ -0,0 +1,184 @@
+"""Analysis of the execution of queries.
+
+This runs a compiled query while recording the timings and row counts of each
+of the stages of its execution, and the time spent evaluating each of the
+functions and columns it involves. This is what EXPLAIN ANALYZE reports.
+"""
+__copyright__ = "Copyright (C) 2014-2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import collections
+import time
+
+from beancount.query import query_compile
+from beancount.query import query_execute
+
+
+# The number of most costly functions to render by default.
+DEFAULT_NUM_FUNCTIONS = 10
+
+
+# The accumulated cost of evaluating a function or column.
+#
+# Attributes:
+#   name: A string, the name of the function or column evaluator.
+#   calls: An integer, the number of evaluations.
+#   self_time: A float, the time spent in the function itself, excluding the
+#     time spent evaluating its instrumented operands, in seconds.
+#   total_time: A float, the time spent in the function including its
+#     operands, in seconds.
+FunctionCost = collections.namedtuple('FunctionCost', 'name calls self_time total_time')
+
+
+class FunctionProfile:
+    """Accumulated evaluation costs of the functions and columns of a query.
+
+    Attributes:
+      costs: A dict of evaluator name to a list of [calls, self time, total time].
+      operands_time: A float, the time spent evaluating the operands of the
+        function currently being evaluated.
+    """
+
+    def __init__(self):
+        self.costs = collections.defaultdict(lambda: [0, 0., 0.])
+        self.operands_time = 0.
+
+    def get_costs(self):
+        """Return the costs, most costly first.
+
+        Returns:
+          A list of FunctionCost instances, sorted by decreasing self time.
+        """
+        return sorted((FunctionCost(name, *cost) for name, cost in self.costs.items()),
+                      key=lambda cost: cost.self_time, reverse=True)
+
+
+class TimedNode(query_compile.EvalNode):
+    """An evaluator which accounts for the time spent in another one."""
+
+    __slots__ = ('node', 'name', 'profile')
+
+    def __init__(self, node, profile):
+        super().__init__(node.dtype)
+        self.node = node
+        self.name = type(node).__name__
+        self.profile = profile
+
+    def __call__(self, context):
+        profile = self.profile
+        parent_operands_time = profile.operands_time
+        profile.operands_time = 0.
+        time_begin = time.perf_counter()
+        try:
+            return self.node(context)
+        finally:
+            total_time = time.perf_counter() - time_begin
+            cost = profile.costs[self.name]
+            cost[0] += 1
+            cost[1] += total_time - profile.operands_time
+            cost[2] += total_time
+            profile.operands_time = parent_operands_time + total_time
+
+
+def _instrument_node(node, profile):
+    """Instrument the functions and columns of an expression tree.
+
+    Aggregators are preserved as they are, because their evaluation is split
+    across multiple methods; their operands are instrumented.
+
+    Args:
+      node: An EvalNode instance. Its children are replaced in-place.
+      profile: The FunctionProfile instance to account to.
+    Returns:
+      The node to use in place of 'node'.
+    """
+    for attr in node.__slots__:
+        child = getattr(node, attr)
+        if isinstance(child, query_compile.EvalNode):
+            setattr(node, attr, _instrument_node(child, profile))
+        elif isinstance(child, list):
+            child[:] = [_instrument_node(element, profile)
+                        if isinstance(element, query_compile.EvalNode)
+                        else element
+                        for element in child]
+    if (isinstance(node, (query_compile.EvalFunction, query_compile.EvalColumn)) and
+            not isinstance(node, query_compile.EvalAggregator)):
+        return TimedNode(node, profile)
+    return node
+
+
+def instrument_query(c_query, profile):
+    """Instrument the functions and columns of a compiled query.
+
+    Args:
+      c_query: An instance of EvalQuery. Its expression trees are modified
+        in-place and it should not be executed without instrumentation anymore.
+      profile: The FunctionProfile instance to account to.
+    Returns:
+      A new instance of EvalQuery to execute.
+    """
+    c_targets = [c_target._replace(c_expr=_instrument_node(c_target.c_expr, profile))
+                 for c_target in c_query.c_targets]
+    c_from = c_query.c_from
+    if c_from is not None and c_from.c_expr is not None:
+        c_from = c_from._replace(c_expr=_instrument_node(c_from.c_expr, profile))
+    c_where = (_instrument_node(c_query.c_where, profile)
+               if c_query.c_where is not None
+               else None)
+    return c_query._replace(c_targets=c_targets, c_from=c_from, c_where=c_where)
+
+
+def analyze_query(c_query, entries, options_map):
+    """Execute a query while recording the costs of its execution.
+
+    Args:
+      c_query: An instance of EvalQuery. See instrument_query().
+      entries: A list of directives.
+      options_map: A parser's option_map.
+    Returns:
+      A tuple of the result types and result rows, as per
+      query_execute.execute_query(), an ExecutionStats instance and a
+      FunctionProfile instance.
+    """
+    profile = FunctionProfile()
+    stats = query_execute.ExecutionStats()
+    c_query = instrument_query(c_query, profile)
+    result_types, result_rows = query_execute.execute_query(
+        c_query, entries, options_map, stats=stats)
+    return result_types, result_rows, stats, profile
+
+
+def _format_rows(rows):
+    return '' if rows is None else str(rows)
+
+
+def render_analysis(stats, profile, file, num_functions=DEFAULT_NUM_FUNCTIONS):
+    """Render the stages and the most costly functions of a query execution.
+
+    Args:
+      stats: An ExecutionStats instance.
+      profile: A FunctionProfile instance, or None.
+      file: A file object to write the report to.
+      num_functions: An integer, the number of most costly functions to render.
+    """
+    # pylint: disable=invalid-name
+    pr = lambda *args: print(*args, file=file)
+    pr("Stages:")
+    pr("  {:<10} {:>10} {:>10} {:>10}".format('stage', 'time (ms)', 'rows in', 'rows out'))
+    for stage in stats.stages:
+        pr("  {:<10} {:>10.1f} {:>10} {:>10}".format(stage.name,
+                                                     stage.time * 1000,
+                                                     _format_rows(stage.rows_in),
+                                                     _format_rows(stage.rows_out)))
+    pr("  {:<10} {:>10.1f}".format('total', sum(stage.time for stage in stats.stages) * 1000))
+    pr()
+
+    if profile is not None and profile.costs:
+        pr("Functions:")
+        pr("  {:<32} {:>10} {:>10} {:>10}".format('function', 'calls',
+                                                  'self (ms)', 'total (ms)'))
+        for cost in profile.get_costs()[:num_functions]:
+            pr("  {:<32} {:>10} {:>10.1f} {:>10.1f}".format(cost.name, cost.calls,
+                                                            cost.self_time * 1000,
+                                                            cost.total_time * 1000))
+        pr()
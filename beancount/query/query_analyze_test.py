@@ -0,0 +1,106 @@
+__copyright__ = "Copyright (C) 2014-2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import io
+import unittest
+
+from beancount.query import query_parser
+from beancount.query import query_compile
+from beancount.query import query_env
+from beancount.query import query_execute
+from beancount.query import query_analyze
+from beancount import loader
+
+
+def compile_query(query_string):
+    """Parse and compile a query string.
+
+    Args:
+      query_string: A string, the BQL query.
+    Returns:
+      An EvalQuery instance.
+    """
+    statement = query_parser.Parser().parse(query_string)
+    return query_compile.compile(statement,
+                                 query_env.TargetsEnvironment(),
+                                 query_env.FilterPostingsEnvironment(),
+                                 query_env.FilterEntriesEnvironment())
+
+
+class TestAnalyzeQuery(unittest.TestCase):
+
+    @loader.load_doc()
+    def setUp(self, entries, _, options_map):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+        2014-01-01 open Expenses:Movie
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+
+        2014-03-01 * "Movie"
+          Expenses:Movie        12.00 USD
+          Assets:Checking
+
+        2015-02-01 * "Dinner"
+          Expenses:Restaurant   40.00 USD
+          Assets:Checking
+        """
+        self.entries = entries
+        self.options_map = options_map
+
+    def analyze(self, query_string):
+        c_query = compile_query(query_string)
+        expected = query_execute.execute_query(c_query, self.entries, self.options_map)
+        rtypes, rrows, stats, profile = query_analyze.analyze_query(
+            compile_query(query_string), self.entries, self.options_map)
+        self.assertEqual(expected, (rtypes, rrows))
+        return stats, profile
+
+    def test_aggregated(self):
+        stats, profile = self.analyze("""
+          SELECT year(date) AS year, sum(number) FROM year >= 2014
+          WHERE account ~ 'Expenses' GROUP BY year ORDER BY year
+        """)
+        stages = {stage.name: stage for stage in stats.stages}
+        self.assertEqual(['context', 'from', 'where', 'aggregate', 'finalize', 'order'],
+                         [stage.name for stage in stats.stages])
+        self.assertEqual((6, 3), (stages['where'].rows_in, stages['where'].rows_out))
+        self.assertEqual((3, 2), (stages['aggregate'].rows_in,
+                                  stages['aggregate'].rows_out))
+        self.assertTrue(all(stage.time >= 0 for stage in stats.stages))
+
+        costs = {cost.name: cost for cost in profile.get_costs()}
+        self.assertEqual(6, costs['AccountColumn'].calls)
+        self.assertEqual(3, costs['NumberColumn'].calls)
+        self.assertLessEqual(costs['Year'].self_time, costs['Year'].total_time)
+
+    def test_non_aggregated(self):
+        stats, _ = self.analyze("""
+          SELECT DISTINCT account FROM OPEN ON 2015-01-01 LIMIT 1
+        """)
+        self.assertEqual([('context', 6, None),
+                          ('open', 6, 6),
+                          ('targets', 6, 6),
+                          ('distinct', 6, 4),
+                          ('limit', 4, 1)],
+                         [(stage.name, stage.rows_in, stage.rows_out)
+                          for stage in stats.stages])
+
+    def test_render_analysis(self):
+        stats, profile = self.analyze("""
+          SELECT account, sum(position) WHERE account ~ 'Assets' GROUP BY account
+        """)
+        oss = io.StringIO()
+        query_analyze.render_analysis(stats, profile, oss)
+        output = oss.getvalue()
+        self.assertRegex(output, r'where +[0-9.]+ +6 +3')
+        self.assertRegex(output, r'aggregate +[0-9.]+ +3 +1')
+        self.assertRegex(output, r'total +[0-9.]+')
+        self.assertRegex(output, r'AccountColumn +9 +[0-9.]+ +[0-9.]+')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,280 @@
+"""A cache of query results.
+
+Results are keyed on a normalized rendering of the compiled query, on the
+hash of the input files of the ledger they were computed from and, unless the
+query is run against the very entries loaded from them, on a hash of the
+contents of the list of entries, so that running the same statement against an
+unchanged ledger becomes a simple lookup. The cache lives in memory and can
+optionally be backed by a file on disk, so that it persists across invocations.
+"""
+__copyright__ = "Copyright (C) 2014-2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import collections
+import hashlib
+import shelve
+import threading
+
+from beancount.core import compare
+from beancount.query import query_compile
+from beancount.query import query_execute
+from beancount.utils import memo
+
+
+# The default number of results to keep in memory.
+DEFAULT_MAXSIZE = 64
+
+# A cache of the keys of the lists of entries most recently queried.
+_ENTRIES_KEYS = memo.ledger_cache(4)
+
+
+def _render_node(node, oss):
+    """Render a canonical string for a compiled expression tree.
+
+    Args:
+      node: An EvalNode instance, or a plain value.
+      oss: A list of strings to accumulate the rendering to.
+    """
+    if isinstance(node, query_compile.EvalNode):
+        oss.append(type(node).__name__)
+        oss.append('(')
+        for cls in type(node).__mro__:
+            for attr in getattr(cls, '__slots__', ()):
+                # The data type is implied by the node type, and operators
+                # may be anonymous functions which don't render stably.
+                if attr in ('dtype', 'operator'):
+                    continue
+                oss.append(attr)
+                oss.append('=')
+                _render_node(getattr(node, attr, None), oss)
+                oss.append(',')
+        oss.append(')')
+    elif isinstance(node, (list, tuple)):
+        oss.append('[')
+        for element in node:
+            _render_node(element, oss)
+            oss.append(',')
+        oss.append(']')
+    else:
+        oss.append(repr(node))
+
+
+def query_key(c_query):
+    """Compute a normalized key for a compiled query.
+
+    Two statements which compile to the same query, e.g., that differ only in
+    whitespace or keyword case, produce the same key.
+
+    Args:
+      c_query: An instance of EvalQuery.
+    Returns:
+      A string, a hex digest of the normalized query.
+    """
+    oss = []
+    for c_target in c_query.c_targets:
+        _render_node(c_target.c_expr, oss)
+        oss.append(' AS {!r};'.format(c_target.name))
+    c_from = c_query.c_from
+    if c_from is not None:
+        oss.append('FROM ')
+        _render_node(c_from.c_expr, oss)
+        oss.append(' {!r} {!r} {!r};'.format(c_from.open, c_from.close, c_from.clear))
+    oss.append('WHERE ')
+    _render_node(c_query.c_where, oss)
+    oss.append(';{!r};{!r};{!r};{!r};{!r};{!r}'.format(
+        c_query.group_indexes, c_query.order_indexes, c_query.ordering,
+        c_query.limit, c_query.distinct, c_query.flatten))
+    md5 = hashlib.md5()
+    md5.update(''.join(oss).encode('utf-8'))
+    return md5.hexdigest()
+
+
+def ledger_key(options_map):
+    """Return a key identifying the input files of a ledger.
+
+    Args:
+      options_map: A parser's option_map.
+    Returns:
+      A string, the input hash, or None if the ledger was not loaded from
+      files and its contents can therefore not be identified.
+    """
+    if not options_map.get('include'):
+        return None
+    return options_map.get('input_hash', None)
+
+
+def entries_key(entries):
+    """Compute a key for the contents of a list of entries.
+
+    This distinguishes, e.g., a filtered list of entries from the full list of
+    entries of the same ledger. The key is cached for the lifetime of the list
+    object, which must not be modified afterwards.
+
+    Args:
+      entries: A list of directives.
+    Returns:
+      A string, a hex digest of the stable hashes of the entries.
+    """
+    cached = _ENTRIES_KEYS.get(id(entries))
+    if cached is not None:
+        cached_entries, num_entries, key = cached
+        if cached_entries is entries and num_entries == len(entries):
+            return key
+    md5 = hashlib.md5()
+    for entry in entries:
+        md5.update(compare.hash_entry(entry).encode('ascii'))
+    key = md5.hexdigest()
+    _ENTRIES_KEYS.put(id(entries), (entries, len(entries), key))
+    return key
+
+
+def _encode_result(result):
+    """Convert a query result to a form which can be pickled.
+
+    Args:
+      result: A pair of result types and result rows.
+    Returns:
+      A pair of result types and a list of plain tuples.
+    """
+    rtypes, rrows = result
+    return (rtypes, [tuple(row) for row in rrows])
+
+
+def _decode_result(encoded):
+    """Convert the output of _encode_result() back into a query result.
+
+    Args:
+      encoded: A pair of result types and a list of plain tuples.
+    Returns:
+      A pair of result types and result rows.
+    """
+    rtypes, tuples = encoded
+    # pylint: disable=invalid-name
+    ResultRow = collections.namedtuple('ResultRow', [name for name, _ in rtypes])
+    return (rtypes, [ResultRow._make(row) for row in tuples])
+
+
+class QueryCache:
+    """A cache of query results, in memory and optionally on disk.
+
+    Attributes:
+      memory: An LRUCache of query results.
+      shelf: A shelve instance, or None, if the cache is memory-only.
+      ledger: A pair of the list of entries and the options map loaded from the
+        input files, or None. See set_ledger().
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, filename=None):
+        """Create a new cache.
+
+        Args:
+          maxsize: An integer, the number of results to keep in memory.
+          filename: An optional string, the name of a database file to
+            persist results to.
+        """
+        self.memory = memo.LRUCache(maxsize)
+        self.shelf = shelve.open(filename, 'c') if filename else None
+        self.shelf_lock = threading.Lock()  # Note: 'shelve' is not thread-safe.
+        self.ledger = None
+
+    def close(self):
+        "Close the on-disk cache, if there is one."
+        if self.shelf is not None:
+            with self.shelf_lock:
+                self.shelf.close()
+            self.shelf = None
+
+    def set_ledger(self, entries, options_map):
+        """Declare the entries and options loaded from the input files.
+
+        The input hash of the options identifies the contents of these entries,
+        so that the queries run against them are keyed without hashing them.
+
+        Args:
+          entries: A list of directives, which must not be modified.
+          options_map: A parser's option_map.
+        """
+        self.ledger = (entries, options_map)
+
+    def get_key(self, c_query, entries, options_map):
+        """Compute the key of the results of a query.
+
+        Args:
+          c_query: An instance of EvalQuery.
+          entries: A list of directives.
+          options_map: A parser's option_map.
+        Returns:
+          A string, or None if the results cannot be cached.
+        """
+        lkey = ledger_key(options_map)
+        if lkey is None:
+            return None
+        if (self.ledger is not None and
+                self.ledger[0] is entries and self.ledger[1] is options_map):
+            ekey = 'loaded'
+        else:
+            ekey = entries_key(entries)
+        return '{}:{}:{}'.format(lkey, ekey, query_key(c_query))
+
+    def lookup(self, c_query, entries, options_map):
+        """Fetch the cached results of a query.
+
+        Args:
+          c_query: An instance of EvalQuery.
+          entries: A list of directives.
+          options_map: A parser's option_map.
+        Returns:
+          A pair of result types and result rows, or None if not cached.
+        """
+        key = self.get_key(c_query, entries, options_map)
+        if key is None:
+            return None
+        result = self.memory.get(key)
+        if result is None and self.shelf is not None:
+            with self.shelf_lock:
+                encoded = self.shelf.get(key, None)
+            if encoded is not None:
+                result = _decode_result(encoded)
+                self.memory.put(key, result)
+        if result is None:
+            return None
+        rtypes, rrows = result
+        return (list(rtypes), list(rrows))
+
+    def store(self, c_query, entries, options_map, result):
+        """Insert the results of a query in the cache.
+
+        Args:
+          c_query: An instance of EvalQuery.
+          entries: A list of directives.
+          options_map: A parser's option_map.
+          result: A pair of result types and result rows.
+        """
+        key = self.get_key(c_query, entries, options_map)
+        if key is None:
+            return
+        rtypes, rrows = result
+        self.memory.put(key, (list(rtypes), list(rrows)))
+        if self.shelf is not None:
+            with self.shelf_lock:
+                self.shelf[key] = _encode_result(result)
+
+    def execute_query(self, c_query, entries, options_map, num_workers=None):
+        """Execute a query, or fetch its results from the cache.
+
+        Args:
+          c_query: An instance of EvalQuery.
+          entries: A list of directives.
+          options_map: A parser's option_map.
+          num_workers: An optional integer, the number of worker processes to
+            use for aggregation. See query_execute.execute_query().
+        Returns:
+          A pair of result types and result rows, as per
+          query_execute.execute_query().
+        """
+        result = self.lookup(c_query, entries, options_map)
+        if result is None:
+            result = query_execute.execute_query(c_query, entries, options_map,
+                                                 num_workers)
+            self.store(c_query, entries, options_map, result)
+        return result
@@ -0,0 +1,174 @@
+__copyright__ = "Copyright (C) 2014-2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import tempfile
+import unittest
+from os import path
+from unittest import mock
+
+from beancount.query import query_parser
+from beancount.query import query_compile
+from beancount.query import query_env
+from beancount.query import query_execute
+from beancount.query import query_cache
+from beancount.utils import test_utils
+from beancount import loader
+
+
+def compile_query(query_string):
+    """Parse and compile a query string.
+
+    Args:
+      query_string: A string, the BQL query.
+    Returns:
+      An EvalQuery instance.
+    """
+    statement = query_parser.Parser().parse(query_string)
+    return query_compile.compile(statement,
+                                 query_env.TargetsEnvironment(),
+                                 query_env.FilterPostingsEnvironment(),
+                                 query_env.FilterEntriesEnvironment())
+
+
+class TestQueryKey(unittest.TestCase):
+
+    def test_normalized(self):
+        self.assertEqual(
+            query_cache.query_key(compile_query(
+                "SELECT account, sum(position) GROUP BY account")),
+            query_cache.query_key(compile_query(
+                "select  ACCOUNT,  SUM(position)\n group by account;")))
+
+    def test_distinct(self):
+        keys = set(query_cache.query_key(compile_query(query))
+                   for query in [
+                       "SELECT account",
+                       "SELECT DISTINCT account",
+                       "SELECT account WHERE number > 1",
+                       "SELECT account WHERE number > 2",
+                       "SELECT account WHERE number * 2 > 2",
+                       "SELECT account FROM OPEN ON 2014-01-01",
+                       "SELECT account LIMIT 10",
+                   ])
+        self.assertEqual(7, len(keys))
+
+
+class TestQueryCache(unittest.TestCase):
+
+    @test_utils.docfile
+    def test_execute_query(self, filename):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+        """
+        entries, _, options_map = loader.load_file(filename)
+        c_query = compile_query("SELECT account, sum(position) GROUP BY account")
+        cache = query_cache.QueryCache()
+        with mock.patch.object(query_execute, 'execute_query',
+                               wraps=query_execute.execute_query) as execute:
+            rtypes1, rrows1 = cache.execute_query(c_query, entries, options_map)
+            rtypes2, rrows2 = cache.execute_query(
+                compile_query("select account, sum(position) group by account"),
+                entries, options_map)
+            self.assertEqual(1, execute.call_count)
+        self.assertEqual(rtypes1, rtypes2)
+        self.assertEqual(rrows1, rrows2)
+        self.assertEqual(2, len(rrows2))
+
+        # A modified ledger misses the cache.
+        options_map = dict(options_map, input_hash='0' * 32)
+        self.assertIsNone(cache.lookup(c_query, entries, options_map))
+
+    @test_utils.docfile
+    def test_other_entries(self, filename):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+        """
+        entries, _, options_map = loader.load_file(filename)
+        c_query = compile_query("SELECT account, sum(position) GROUP BY account")
+        cache = query_cache.QueryCache()
+        _, rrows = cache.execute_query(c_query, entries, options_map)
+        self.assertEqual(2, len(rrows))
+
+        # Filtered entries of the same ledger don't reuse the results.
+        filtered_entries = entries[:2]
+        _, rrows = cache.execute_query(c_query, filtered_entries, options_map)
+        self.assertEqual([], rrows)
+
+        # An equal list of entries does.
+        self.assertIsNotNone(cache.lookup(c_query, list(entries), options_map))
+
+    @test_utils.docfile
+    def test_loaded_entries(self, filename):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+        """
+        entries, _, options_map = loader.load_file(filename)
+        c_query = compile_query("SELECT account, sum(position) GROUP BY account")
+        cache = query_cache.QueryCache()
+        cache.set_ledger(entries, options_map)
+        with mock.patch.object(query_cache, 'entries_key',
+                               wraps=query_cache.entries_key) as entries_key:
+            cache.execute_query(c_query, entries, options_map)
+
+            # The entries loaded again from the same files are not hashed.
+            entries, _, options_map = loader.load_file(filename)
+            cache.set_ledger(entries, options_map)
+            self.assertIsNotNone(cache.lookup(c_query, entries, options_map))
+            self.assertFalse(entries_key.called)
+
+            # Other lists of entries are.
+            self.assertIsNone(cache.lookup(c_query, entries[:2], options_map))
+            self.assertTrue(entries_key.called)
+
+    def test_no_input_files(self):
+        entries, _, options_map = loader.load_string("""
+          2014-01-01 open Assets:Checking
+        """)
+        c_query = compile_query("SELECT account")
+        cache = query_cache.QueryCache()
+        cache.execute_query(c_query, entries, options_map)
+        self.assertIsNone(cache.lookup(c_query, entries, options_map))
+
+    @test_utils.docfile
+    def test_on_disk(self, filename):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+        """
+        entries, _, options_map = loader.load_file(filename)
+        c_query = compile_query("SELECT date, account, position")
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_filename = path.join(tmp, 'query.cache')
+            cache = query_cache.QueryCache(filename=cache_filename)
+            rtypes, rrows = cache.execute_query(c_query, entries, options_map)
+            cache.close()
+
+            cache = query_cache.QueryCache(filename=cache_filename)
+            result = cache.lookup(c_query, entries, options_map)
+            cache.close()
+        self.assertIsNotNone(result)
+        self.assertEqual((rtypes, rrows), result)
+        self.assertEqual(rrows[0].account, result[1][0].account)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -319,6 +319,21 @@ class EvalAggregator(EvalFunction):
         """
         # Do nothing by default.
 
+    def merge(self, store, other_store):
+        """Merge the partial aggregate data of another store into this one.
+
+        This is used to combine the results of aggregations run independently
+        over consecutive partitions of the postings. 'other_store' always
+        aggregates postings which come after those of 'store'. Aggregators that
+        support merging must override this method.
+
+        Args:
+          store: An object indexable by handles appropriated during allocate(),
+            updated in-place.
+          other_store: A store of the same layout, for the later partition.
+        """
+        raise NotImplementedError
+
     def __call__(self, context):
         """Return the value on evaluation.
 
@@ -477,15 +492,31 @@ def is_aggregate(node):
     return bool(aggregates)
 
 
+def is_mergeable(node):
+    """Return true if the aggregator node supports merging partial stores.
+
+    Args:
+      node: An instance of EvalAggregator.
+    Returns:
+      A boolean.
+    """
+    return type(node).merge is not EvalAggregator.merge
+
+
 def is_hashable_type(node):
-    """Return true if the node is of a hashable type.
+    """Return true if the values of the node can be used as grouping keys.
+
+    Values of types which aren't hashable themselves, i.e., inventories and
+    sets, are converted to canonical hashable keys for grouping (see
+    query_execute.freeze_value()).
 
     Args:
       node: An instance of EvalNode.
     Returns:
       A boolean.
     """
-    return not issubclass(node.dtype, inventory.Inventory)
+    return (issubclass(node.dtype, (inventory.Inventory, set)) or
+            node.dtype.__hash__ is not None)
 
 
 def find_unique_name(name, allocated_set):
@@ -922,7 +953,7 @@ def transform_journal(journal):
     Returns:
       An instance of an uncompiled Select object.
     """
-    cooked_select = query_parser.Parser().parse("""
+    cooked_select = query_parser.parse("""
 
         SELECT
            date,
@@ -959,7 +990,7 @@ def transform_balances(balances):
     ## the first or last sort-order value gets used, because it would simplify
     ## the input statement.
 
-    cooked_select = query_parser.Parser().parse("""
+    cooked_select = query_parser.parse("""
 
       SELECT account, SUM({}(position))
       GROUP BY account, ACCOUNT_SORTKEY(account)
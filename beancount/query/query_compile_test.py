@@ -380,9 +380,15 @@ class TestCompileSelect(CompileSelectBase):
             """)
 
     def test_compile_group_by_inventory(self):
+        query = self.compile("""
+          SELECT sum(number), balance GROUP BY balance;
+        """)
+        self.assertEqual([1], query.group_indexes)
+
+    def test_compile_group_by_non_hashable(self):
         with self.assertRaises(qc.CompilationError):
             self.compile("""
-              SELECT sum(number), balance GROUP BY balance;
+              SELECT sum(number), meta GROUP BY meta;
             """)
 
 
@@ -942,6 +942,9 @@ class Count(query_compile.EvalAggregator):
     def update(self, store, unused_ontext):
         store[self.handle] += 1
 
+    def merge(self, store, other_store):
+        store[self.handle] += other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
@@ -963,6 +966,9 @@ class Sum(query_compile.EvalAggregator):
         if value is not None:
             store[self.handle] += value
 
+    def merge(self, store, other_store):
+        store[self.handle] += other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
@@ -977,6 +983,9 @@ class SumBase(query_compile.EvalAggregator):
     def initialize(self, store):
         store[self.handle] = inventory.Inventory()
 
+    def merge(self, store, other_store):
+        store[self.handle].add_inventory(other_store[self.handle])
+
     def __call__(self, context):
         return context.store[self.handle]
 
@@ -1023,6 +1032,10 @@ class First(query_compile.EvalAggregator):
             value = self.eval_args(context)[0]
             store[self.handle] = value
 
+    def merge(self, store, other_store):
+        if store[self.handle] is None:
+            store[self.handle] = other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
@@ -1043,6 +1056,9 @@ class Last(query_compile.EvalAggregator):
         value = self.eval_args(context)[0]
         store[self.handle] = value
 
+    def merge(self, store, other_store):
+        store[self.handle] = other_store[self.handle]
+
     def __call__(self, context):
         return context.store[self.handle]
 
@@ -1064,6 +1080,11 @@ class Min(query_compile.EvalAggregator):
         if value < store[self.handle]:
             store[self.handle] = value
 
+    def merge(self, store, other_store):
+        value = other_store[self.handle]
+        if value < store[self.handle]:
+            store[self.handle] = value
+
     def __call__(self, context):
         return context.store[self.handle]
 
@@ -1085,6 +1106,11 @@ class Max(query_compile.EvalAggregator):
         if value > store[self.handle]:
             store[self.handle] = value
 
+    def merge(self, store, other_store):
+        value = other_store[self.handle]
+        if value > store[self.handle]:
+            store[self.handle] = value
+
     def __call__(self, context):
         return context.store[self.handle]
 
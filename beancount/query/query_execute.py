@@ -6,8 +6,13 @@ __license__ = "GNU GPLv2"
 import copy
 import collections
 import datetime
+import heapq
 import itertools
+import multiprocessing
 import operator
+import pickle
+import tempfile
+import time
 
 from beancount.query import query_compile
 from beancount.query import query_env
@@ -21,10 +26,20 @@ from beancount.parser import printer
 from beancount.parser import options
 from beancount.ops import summarize
 from beancount.core import prices
+from beancount.utils import memo
 from beancount.utils import misc_utils
 
 
-def filter_entries(c_from, entries, options_map, context):
+# The maximum number of summarized lists of entries to keep in memory.
+SUMMARIES_MAXSIZE = 16
+
+# A cache of the entries summarized by the OPEN, CLOSE and CLEAR clauses, so
+# that repeated clauses over the same entries summarize them only once. Each
+# summarized list is itself the stable input of the following clause.
+_SUMMARIES = memo.ledger_cache(SUMMARIES_MAXSIZE)
+
+
+def filter_entries(c_from, entries, options_map, context, stats=None):
     """Filter the entries by the given compiled FROM clause.
 
     Args:
@@ -32,8 +47,10 @@ def filter_entries(c_from, entries, options_map, context):
       entries: A list of directives.
       options_map: A parser's option_map.
       context: A prototype of RowContext to use for evaluation.
+      stats: An optional ExecutionStats instance to record the stages to.
     Returns:
-      A list of filtered entries.
+      A list of filtered entries. The summarized entries are shared between
+      queries and must not be modified, nor must the input entries.
     """
     assert c_from is None or isinstance(c_from, query_compile.EvalFrom)
     assert isinstance(entries, list)
@@ -43,23 +60,38 @@ def filter_entries(c_from, entries, options_map, context):
     if c_from is None:
         return entries
 
+    time_stage = time.perf_counter()
+
     # Process the OPEN clause.
     if c_from.open is not None:
         assert isinstance(c_from.open, datetime.date)
         open_date = c_from.open
-        entries, index = summarize.open_opt(entries, open_date, options_map)
+        # Start from the nearest balance checkpoint of the ledger, which are
+        # computed once and reused by all subsequent queries.
+        num_entries = len(entries)
+        entries, index = memo.call_memoized(
+            _SUMMARIES, (entries, options_map), ('open', open_date),
+            lambda: summarize.open_opt(entries, open_date, options_map,
+                                       summarize.get_checkpoints(entries)))
+        time_stage = record_stage(stats, 'open', time_stage, num_entries, len(entries))
 
     # Process the CLOSE clause.
     if c_from.close is not None:
-        if isinstance(c_from.close, datetime.date):
-            close_date = c_from.close
-            entries, index = summarize.close_opt(entries, close_date, options_map)
-        elif c_from.close is True:
-            entries, index = summarize.close_opt(entries, None, options_map)
+        num_entries = len(entries)
+        # CLOSE without a date closes after the last entry.
+        close_date = None if c_from.close is True else c_from.close
+        entries, index = memo.call_memoized(
+            _SUMMARIES, (entries, options_map), ('close', close_date),
+            lambda: summarize.close_opt(entries, close_date, options_map))
+        time_stage = record_stage(stats, 'close', time_stage, num_entries, len(entries))
 
     # Process the CLEAR clause.
     if c_from.clear is not None:
-        entries, index = summarize.clear_opt(entries, None, options_map)
+        num_entries = len(entries)
+        entries, index = memo.call_memoized(
+            _SUMMARIES, (entries, options_map), 'clear',
+            lambda: summarize.clear_opt(entries, None, options_map))
+        time_stage = record_stage(stats, 'clear', time_stage, num_entries, len(entries))
 
     # Filter the entries with the FROM clause's expression.
     c_expr = c_from.c_expr
@@ -71,11 +103,87 @@ def filter_entries(c_from, entries, options_map, context):
             context.entry = entry
             if c_expr(context):
                 new_entries.append(entry)
+        time_stage = record_stage(stats, 'from', time_stage, len(entries), len(new_entries))
         entries = new_entries
 
     return entries
 
 
+# The timings and row counts of a stage of the execution of a query.
+#
+# Attributes:
+#   name: A string, the name of the stage.
+#   time: A float, the time spent in the stage, in seconds.
+#   rows_in: An integer, the number of rows or entries input to the stage, or None.
+#   rows_out: An integer, the number of rows or entries output by the stage, or None.
+Stage = collections.namedtuple('Stage', 'name time rows_in rows_out')
+
+
+class ExecutionStats:
+    """A recorder of the timings and row counts of the stages of a query.
+
+    Attributes:
+      stages: A list of Stage instances, in the order they were executed.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    def record(self, name, time_spent, rows_in, rows_out):
+        """Record the execution of a stage.
+
+        Args:
+          (See Stage.)
+        """
+        self.stages.append(Stage(name, time_spent, rows_in, rows_out))
+
+
+def record_stage(stats, name, time_begin, rows_in, rows_out):
+    """Record a stage which began at the given time, if stats are requested.
+
+    Args:
+      stats: An ExecutionStats instance, or None.
+      name: A string, the name of the stage.
+      time_begin: A float, the time at which the stage began, as per
+        time.perf_counter().
+      rows_in: The number of input rows, or None.
+      rows_out: The number of output rows, or None.
+    Returns:
+      A float, the current time, at which the following stage begins.
+    """
+    time_end = time.perf_counter()
+    if stats is not None:
+        stats.record(name, time_end - time_begin, rows_in, rows_out)
+    return time_end
+
+
+class CountingWhere:
+    """A wrapper for a compiled WHERE clause which accounts for its evaluations.
+
+    Attributes:
+      c_where: The compiled WHERE expression.
+      time: A float, the total time spent evaluating it, in seconds.
+      rows_in: An integer, the number of postings it was evaluated on.
+      rows_out: An integer, the number of postings it matched.
+    """
+    __slots__ = ('c_where', 'time', 'rows_in', 'rows_out')
+
+    def __init__(self, c_where):
+        self.c_where = c_where
+        self.time = 0.
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def __call__(self, context):
+        time_begin = time.perf_counter()
+        result = self.c_where(context)
+        self.time += time.perf_counter() - time_begin
+        self.rows_in += 1
+        if result:
+            self.rows_out += 1
+        return result
+
+
 def execute_print(c_print, entries, options_map, file):
     """Print entries from a print statement specification.
 
@@ -208,41 +316,198 @@ def create_row_context(entries, options_map):
     return context
 
 
-def execute_query(query, entries, options_map):
-    """Given a compiled select statement, execute the query.
+def freeze_value(value):
+    """Convert a value to a canonical hashable key.
+
+    Inventory and set values are not hashable. Inventories are converted to the
+    frozen set of their positions and sets to frozen sets, so that equal values
+    convert to equal keys. Other values, including Amount and Position
+    instances, are hashable and are returned as they are.
+
+    Args:
+      value: A value of any of the supported data types.
+    Returns:
+      A hashable value.
+    """
+    if isinstance(value, inventory.Inventory):
+        return frozenset(value.get_positions())
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def get_freeze_indexes(c_exprs):
+    """Find the expressions whose values need to be frozen to be hashed.
+
+    Args:
+      c_exprs: A list of compiled expressions.
+    Returns:
+      A list of the indexes of the expressions of unhashable data types.
+    """
+    return [index
+            for index, c_expr in enumerate(c_exprs)
+            if issubclass(c_expr.dtype, (inventory.Inventory, set))]
+
+
+def freeze_row(values, freeze_indexes):
+    """Compute a hashable key for a row of values.
+
+    Args:
+      values: A sequence of values.
+      freeze_indexes: A list of the indexes of the values to freeze, as per
+        get_freeze_indexes().
+    Returns:
+      A hashable tuple.
+    """
+    key = list(values)
+    for index in freeze_indexes:
+        key[index] = freeze_value(key[index])
+    return tuple(key)
+
+
+def uniquify_rows(result_types, result_rows):
+    """Remove the duplicate rows of a result set, keeping the first ones.
+
+    Args:
+      result_types: A list of (name, data-type) item pairs.
+      result_rows: An iterable of ResultRow tuples.
+    Returns:
+      An iterator of the unique ResultRow tuples, in their original order.
+    """
+    freeze_indexes = [index
+                      for index, (_, dtype) in enumerate(result_types)
+                      if issubclass(dtype, (inventory.Inventory, set))]
+    if not freeze_indexes:
+        return misc_utils.uniquify(result_rows)
+    return misc_utils.uniquify(result_rows,
+                               lambda row: freeze_row(row, freeze_indexes))
+
+
+def is_streamable(query):
+    """Return true if the rows of a query can be produced as they are computed.
+
+    Aggregated queries need to see all the postings before they can output
+    their first row and cannot be streamed. Ordered queries can: their rows are
+    sorted in bounded memory, spilling to disk as needed; see sort_rows().
+
+    Args:
+      query: An instance of a query_compile.Query
+    Returns:
+      A boolean.
+    """
+    return query.group_indexes is None
+
+
+# The default maximum number of rows to sort in memory when streaming the rows
+# of an ordered query. Beyond this, sorted runs of rows are spilled to disk.
+SORT_MAX_ROWS = 100000
+
+
+def _read_run(file):
+    """Read back a sorted run of rows written by sort_rows().
+
+    The file is closed once it has been consumed.
+
+    Args:
+      file: A temporary file object.
+    Yields:
+      Pairs of a sortkey and a row tuple.
+    """
+    file.seek(0)
+    try:
+        while True:
+            try:
+                yield pickle.load(file)
+            except EOFError:
+                break
+    finally:
+        file.close()
+
+
+def sort_rows(schwartz_rows, reverse=False, max_rows=SORT_MAX_ROWS):
+    """Sort rows by their sortkey, in bounded memory.
+
+    Up to 'max_rows' rows are accumulated in memory and sorted. If there are
+    more, each sorted run is serialized to a temporary file and the runs are
+    merged lazily on output. Like list.sort(), the sort is stable.
+
+    Args:
+      schwartz_rows: An iterable of pairs of a sortkey and a row. Both need to
+        be picklable if the rows are spilled; in particular, rows should be
+        plain tuples.
+      reverse: A boolean, true to sort in descending order.
+      max_rows: An integer, the maximum number of rows to hold in memory, or
+        None to sort all the rows in memory.
+    Yields:
+      The pairs of sortkey and row, in sorted order.
+    """
+    sortkey = operator.itemgetter(0)
+    runs = []
+    buffer = []
+    for schwartz_row in schwartz_rows:
+        buffer.append(schwartz_row)
+        if max_rows is not None and len(buffer) >= max_rows:
+            buffer.sort(key=sortkey, reverse=reverse)
+            file = tempfile.TemporaryFile()
+            for sorted_row in buffer:
+                pickle.dump(sorted_row, file, pickle.HIGHEST_PROTOCOL)
+            runs.append(file)
+            buffer = []
+    buffer.sort(key=sortkey, reverse=reverse)
+    if not runs:
+        yield from buffer
+        return
+    # Note: Ties are resolved in the order of the runs, which keeps this stable.
+    yield from heapq.merge(*[_read_run(file) for file in runs], buffer,
+                           key=sortkey, reverse=reverse)
+
+
+def execute_query_iter(query, entries, options_map, max_sort_rows=SORT_MAX_ROWS,
+                       stats=None):
+    """Given a compiled select statement, execute the query lazily.
+
+    For streamable queries (see is_streamable()), the rows are produced as the
+    postings are evaluated, so that consuming them requires constant memory
+    (with the exception of DISTINCT queries, which have to remember the rows
+    they have already produced). The rows of ordered queries are sorted with
+    an external merge sort, holding at most 'max_sort_rows' rows in memory.
+    Other queries are executed in full and their rows are returned as an
+    iterator.
 
     Args:
       query: An instance of a query_compile.Query
       entries: A list of directives.
       options_map: A parser's option_map.
+      max_sort_rows: An integer, the maximum number of rows to sort in memory,
+        or None for no limit. See sort_rows().
+      stats: An optional ExecutionStats instance to record the timings and row
+        counts of each of the stages of the execution to. Each stage is then
+        run to completion before the following one.
     Returns:
       A pair of:
         result_types: A list of (name, data-type) item pairs.
-        result_rows: A list of ResultRow tuples of length and types described by
-          'result_types'.
+        result_rows: An iterator of ResultRow tuples of length and types
+          described by 'result_types'.
     """
+    if not is_streamable(query):
+        result_types, result_rows = execute_query(query, entries, options_map,
+                                                  stats=stats)
+        return result_types, iter(result_rows)
+
     # Figure out the result types that describe what we return.
     result_types = [(target.name, target.c_expr.dtype)
                     for target in query.c_targets
                     if target.name is not None]
 
-    # Create a class for each final result.
     # pylint: disable=invalid-name
     ResultRow = collections.namedtuple('ResultRow',
                                        [target.name
                                         for target in query.c_targets
                                         if target.name is not None])
 
-    # Pre-compute lists of the expressions to evaluate.
-    group_indexes = (set(query.group_indexes)
-                     if query.group_indexes is not None
-                     else query.group_indexes)
-
-    # Indexes of the columns for result rows and order rows.
     result_indexes = [index
                       for index, c_target in enumerate(query.c_targets)
                       if c_target.name]
-    order_indexes = query.order_indexes
 
     # Figure out if we need to compute balance.
     uses_balance = any(uses_balance_column(c_expr)
@@ -250,136 +515,527 @@ def execute_query(query, entries, options_map):
                                [c_target.c_expr for c_target in query.c_targets],
                                [query.c_where] if query.c_where else []))
 
+    time_stage = time.perf_counter()
     context = create_row_context(entries, options_map)
+    record_stage(stats, 'context', time_stage, len(entries), None)
 
     # Filter the entries using the FROM clause.
-    filt_entries = (filter_entries(query.c_from, entries, options_map, context)
+    filt_entries = (filter_entries(query.c_from, entries, options_map, context, stats)
                     if query.c_from is not None else
                     entries)
 
-    # Dispatch between the non-aggregated queries and aggregated queries.
     c_where = query.c_where
-    schwartz_rows = []
-
-    # Precompute a list of expressions to be evaluated.
+    if stats is not None and c_where is not None:
+        c_where = CountingWhere(c_where)
     c_target_exprs = [c_target.c_expr for c_target in query.c_targets]
 
-    if query.group_indexes is None:
-        # This is a non-aggregated query.
+    order_indexes = query.order_indexes
 
-        # Iterate over all the postings once and produce schwartzian rows.
+    def generate_rows():
         for entry in misc_utils.filter_type(filt_entries, data.Transaction):
             context.entry = entry
             for posting in entry.postings:
                 context.posting = posting
                 if c_where is None or c_where(context):
-                    # Compute the balance.
                     if uses_balance:
                         context.balance.add_position(posting)
+                    if order_indexes is None:
+                        yield ResultRow._make(c_target_exprs[index](context)
+                                              for index in result_indexes)
+                    else:
+                        values = [c_expr(context) for c_expr in c_target_exprs]
+                        yield (row_sortkey(order_indexes, values, c_target_exprs),
+                               tuple(values[index] for index in result_indexes))
+
+    # Iterate over all the postings once and produce the rows. The rows of
+    # ordered queries are paired with their sortkey and sorted as plain tuples,
+    # which can be serialized.
+    result_rows = generate_rows()
+    if stats is not None:
+        time_stage = time.perf_counter()
+        result_rows = list(result_rows)
+        _record_scan(stats, 'targets', time_stage, c_where,
+                     len(result_rows), len(result_rows))
+
+    return finish_rows(query, result_types, ResultRow, result_rows, max_sort_rows, stats)
+
+
+def finish_rows(query, result_types, result_class, result_rows, max_sort_rows, stats):
+    """Order, uniquify, limit and flatten the rows of a query, as requested.
 
-                    # Evaluate all the values.
-                    values = [c_expr(context) for c_expr in c_target_exprs]
+    Args:
+      query: An instance of a query_compile.Query
+      result_types: A list of (name, data-type) item pairs.
+      result_class: The class of the result rows, a namedtuple.
+      result_rows: An iterable of the result rows. If the query is ordered,
+        these are pairs of a sortkey and a row tuple instead.
+      max_sort_rows: An integer, the maximum number of rows to sort in memory,
+        or None for no limit. See sort_rows().
+      stats: An optional ExecutionStats instance to record the stages to. If
+        provided, 'result_rows' must be a list.
+    Returns:
+      A pair of:
+        result_types: A list of (name, data-type) item pairs.
+        result_rows: An iterator of 'result_class' tuples of length and types
+          described by 'result_types', or a list if 'stats' is provided.
+    """
+    # Order results if requested.
+    if query.order_indexes is not None:
+        reverse = query.ordering == 'DESC'
+        result_rows = _apply_stage(
+            stats, 'order', result_rows,
+            lambda rows: (result_class._make(row)
+                          for _, row in sort_rows(rows, reverse, max_sort_rows)))
 
-                    # Compute result and sort-key objects.
-                    result = ResultRow._make(values[index]
-                                             for index in result_indexes)
-                    sortkey = row_sortkey(order_indexes, values, c_target_exprs)
-                    schwartz_rows.append((sortkey, result))
-    else:
-        # This is an aggregated query.
+    # Apply distinct.
+    if query.distinct:
+        result_rows = _apply_stage(stats, 'distinct', result_rows,
+                                   lambda rows: uniquify_rows(result_types, rows))
 
-        # Precompute lists of non-aggregate and aggregate expressions to
-        # evaluate. For aggregate targets, we hunt down the aggregate
-        # sub-expressions to evaluate, to avoid recursion during iteration.
-        c_nonaggregate_exprs = []
-        c_aggregate_exprs = []
-        for index, c_expr in enumerate(c_target_exprs):
-            if index in group_indexes:
-                c_nonaggregate_exprs.append(c_expr)
-            else:
-                _, aggregate_exprs = query_compile.get_columns_and_aggregates(c_expr)
-                c_aggregate_exprs.extend(aggregate_exprs)
-        # Note: it is possible that there are no aggregates to compute here. You could
-        # have all columns be non-aggregates and group-by the entire list of columns.
+    # Apply limit.
+    if query.limit is not None:
+        result_rows = _apply_stage(stats, 'limit', result_rows,
+                                   lambda rows: itertools.islice(rows, query.limit))
 
-        # Pre-allocate handles in aggregation nodes.
-        allocator = Allocator()
-        for c_expr in c_aggregate_exprs:
-            c_expr.allocate(allocator)
+    # Flatten inventories if requested.
+    if query.flatten:
+        input_types = result_types
+        result_types, _ = iter_flatten_results(input_types, [])
+        result_rows = _apply_stage(stats, 'flatten', result_rows,
+                                   lambda rows: iter_flatten_results(input_types, rows)[1])
 
-        # Iterate over all the postings to evaluate the aggregates.
-        agg_store = {}
-        for entry in misc_utils.filter_type(filt_entries, data.Transaction):
-            context.entry = entry
-            for posting in entry.postings:
-                context.posting = posting
-                if c_where is None or c_where(context):
-                    # Compute the balance.
-                    if uses_balance:
-                        context.balance.add_position(posting)
+    return (result_types, result_rows)
 
-                    # Compute the non-aggregate expressions.
-                    row_key = tuple(c_expr(context)
-                                    for c_expr in c_nonaggregate_exprs)
-
-                    # Get an appropriate store for the unique key of this row.
-                    try:
-                        store = agg_store[row_key]
-                    except KeyError:
-                        # This is a row; create a new store.
-                        store = allocator.create_store()
-                        for c_expr in c_aggregate_exprs:
-                            c_expr.initialize(store)
-                        agg_store[row_key] = store
-
-                    # Update the aggregate expressions.
+
+def _apply_stage(stats, name, result_rows, function):
+    """Apply a stage of the execution of a query to its rows.
+
+    Args:
+      stats: An ExecutionStats instance, or None.
+      name: A string, the name of the stage.
+      result_rows: An iterable of rows; a list if 'stats' is provided.
+      function: A function of an iterable of rows to an iterable of rows.
+    Returns:
+      An iterable of rows. If 'stats' is provided, the stage is run to
+      completion and recorded, and a list is returned.
+    """
+    if stats is None:
+        return function(result_rows)
+    time_begin = time.perf_counter()
+    output_rows = list(function(result_rows))
+    record_stage(stats, name, time_begin, len(result_rows), len(output_rows))
+    return output_rows
+
+
+def aggregate_postings(entries, context, c_where,
+                       c_nonaggregate_exprs, c_aggregate_exprs, allocator, uses_balance,
+                       max_groups=None, values_handle=None):
+    # pylint: disable=too-many-arguments
+    """Evaluate the aggregates of a query over the postings of some transactions.
+
+    The values of the non-aggregate expressions of an unhashable data type,
+    e.g. inventories, are frozen in the row keys; see freeze_value(). The
+    original values first seen for each key are kept in the stores.
+
+    Args:
+      entries: A list of Transaction directives.
+      context: A RowContext instance to evaluate the expressions with.
+      c_where: A compiled WHERE expression, or None.
+      c_nonaggregate_exprs: A list of the compiled group-by expressions.
+      c_aggregate_exprs: A list of the compiled aggregate expressions, whose
+        handles have already been allocated.
+      allocator: The Allocator instance used to allocate the handles.
+      uses_balance: A boolean, true if the running balance must be computed.
+      max_groups: An optional integer, the maximum number of groups to hold in
+        memory. Beyond this, the partial stores are spilled to temporary files
+        and merged back on output. This requires all the aggregates to be
+        mergeable, and is ignored otherwise.
+      values_handle: The handle of the slot of the stores in which to keep the
+        original values of the non-aggregate expressions, if any of them are
+        frozen in the row keys.
+    Returns:
+      A dict of row-key tuples to their aggregate stores, in the order in which
+      the keys were first encountered. If stores have been spilled, a
+      SpilledStores instance, whose items() are in no particular order.
+    """
+    freeze_indexes = get_freeze_indexes(c_nonaggregate_exprs)
+    if max_groups is not None and not all(query_compile.is_mergeable(c_expr)
+                                          for c_expr in c_aggregate_exprs):
+        max_groups = None
+    spilled_stores = None
+
+    agg_store = {}
+    for entry in entries:
+        context.entry = entry
+        for posting in entry.postings:
+            context.posting = posting
+            if c_where is None or c_where(context):
+                # Compute the balance.
+                if uses_balance:
+                    context.balance.add_position(posting)
+
+                # Compute the non-aggregate expressions.
+                row_values = tuple(c_expr(context)
+                                   for c_expr in c_nonaggregate_exprs)
+                row_key = (freeze_row(row_values, freeze_indexes)
+                           if freeze_indexes else
+                           row_values)
+
+                # Get an appropriate store for the unique key of this row.
+                try:
+                    store = agg_store[row_key]
+                except KeyError:
+                    # Spill the stores to disk if there are too many of them.
+                    if max_groups is not None and len(agg_store) >= max_groups:
+                        if spilled_stores is None:
+                            spilled_stores = SpilledStores(c_aggregate_exprs)
+                        spilled_stores.spill(agg_store)
+                        agg_store = {}
+
+                    # This is a row; create a new store.
+                    store = allocator.create_store()
                     for c_expr in c_aggregate_exprs:
-                        c_expr.update(store, context)
+                        c_expr.initialize(store)
+                    if freeze_indexes:
+                        store[values_handle] = row_values
+                    agg_store[row_key] = store
+
+                # Update the aggregate expressions.
+                for c_expr in c_aggregate_exprs:
+                    c_expr.update(store, context)
+
+    if spilled_stores is not None:
+        spilled_stores.spill(agg_store)
+        return spilled_stores
+    return agg_store
+
 
-        # Iterate over all the aggregations to produce the schwartzian rows.
-        for key, store in agg_store.items():
-            key_iter = iter(key)
-            values = []
+# The default maximum number of groups to aggregate in memory before spilling
+# partial aggregates to disk. None disables spilling.
+MAX_GROUPS = 1000000
 
-            # Finalize the store.
-            for c_expr in c_aggregate_exprs:
-                c_expr.finalize(store)
-            context.store = store
+# The number of files the spilled stores are partitioned into, by key.
+SPILL_PARTITIONS = 16
 
-            for index, c_expr in enumerate(c_target_exprs):
-                if index in group_indexes:
-                    value = next(key_iter)
+
+class SpilledStores:
+    """Partial aggregate stores, spilled to temporary files.
+
+    The stores are hash-partitioned by key across a number of files. On output,
+    the partitions are read back one at a time and the partial stores of the
+    same key are merged in the order they were spilled, which is the order of
+    the postings they aggregate. Only a single partition of the stores needs
+    to be held in memory at once.
+
+    Attributes:
+      c_aggregate_exprs: A list of the mergeable aggregate expressions.
+      files: A list of temporary file objects, one per partition.
+    """
+
+    def __init__(self, c_aggregate_exprs, num_partitions=SPILL_PARTITIONS):
+        self.c_aggregate_exprs = c_aggregate_exprs
+        self.files = [tempfile.TemporaryFile() for _ in range(num_partitions)]
+
+    def spill(self, agg_store):
+        """Write out a dict of partial stores.
+
+        Args:
+          agg_store: A dict of row-key tuples to their aggregate stores.
+        """
+        num_partitions = len(self.files)
+        for row_key, store in agg_store.items():
+            pickle.dump((row_key, store), self.files[hash(row_key) % num_partitions],
+                        pickle.HIGHEST_PROTOCOL)
+
+    def items(self):
+        """Read back and merge the stores, one partition at a time.
+
+        The temporary files are closed as they are consumed; this can only be
+        iterated once.
+
+        Yields:
+          Pairs of a row-key tuple and its merged aggregate store.
+        """
+        for file in self.files:
+            file.seek(0)
+            agg_store = {}
+            while True:
+                try:
+                    row_key, store = pickle.load(file)
+                except EOFError:
+                    break
+                try:
+                    merged_store = agg_store[row_key]
+                except KeyError:
+                    agg_store[row_key] = store
                 else:
-                    value = c_expr(context)
-                values.append(value)
+                    for c_expr in self.c_aggregate_exprs:
+                        c_expr.merge(merged_store, store)
+            file.close()
+            yield from agg_store.items()
+
+
+# The minimum number of transactions for which aggregation is run in parallel.
+# Below this, the cost of starting the worker processes dominates.
+PARALLEL_MIN_ENTRIES = 10000
+
+
+# The arguments of aggregate_postings() for the partitions processed by the
+# worker processes of a parallel aggregation. This is set before forking the
+# workers, which inherit it; this avoids having to pickle the compiled query,
+# which may hold unpicklable functions, and the list of entries.
+_partition_args = None
+
+
+def _aggregate_partition(index_range):
+    """Aggregate a single partition of the transactions, in a worker process.
+
+    Args:
+      index_range: A pair of integers, the begin and end indexes of the
+        transactions of this partition.
+    Returns:
+      A dict of row-key tuples to their aggregate stores.
+    """
+    begin, end = index_range
+    entries, *args = _partition_args
+    return aggregate_postings(entries[begin:end], *args)
+
+
+def parallel_aggregate_postings(num_workers, entries, context, c_where,
+                                c_nonaggregate_exprs, c_aggregate_exprs,
+                                allocator, uses_balance, values_handle=None):
+    # pylint: disable=too-many-arguments
+    """Evaluate the aggregates of a query over partitions in parallel.
+
+    The transactions are split in contiguous partitions, i.e., date ranges,
+    each of which is aggregated in a separate worker process. The partial
+    stores are then merged in order. All the aggregates must be mergeable. If
+    worker processes cannot be forked on this platform, this falls back to a
+    serial aggregation.
+
+    Args:
+      num_workers: An integer, the number of worker processes to use.
+      (See aggregate_postings() for the other arguments.)
+    Returns:
+      A dict of row-key tuples to their aggregate stores, in the order in which
+      the keys were first encountered.
+    """
+    global _partition_args  # pylint: disable=global-statement
+    args = (entries, context, c_where,
+            c_nonaggregate_exprs, c_aggregate_exprs, allocator, uses_balance,
+            None, values_handle)
+    try:
+        mp_context = multiprocessing.get_context('fork')
+    except ValueError:
+        return aggregate_postings(*args)
+
+    partition_size = -(-len(entries) // num_workers)
+    index_ranges = [(begin, min(begin + partition_size, len(entries)))
+                    for begin in range(0, len(entries), partition_size)]
+    _partition_args = args
+    try:
+        with mp_context.Pool(len(index_ranges)) as pool:
+            partial_stores = pool.map(_aggregate_partition, index_ranges)
+    finally:
+        _partition_args = None
+
+    # Merge the partial stores, in the order of the partitions.
+    agg_store = {}
+    for partial_store in partial_stores:
+        for row_key, store in partial_store.items():
+            try:
+                merged_store = agg_store[row_key]
+            except KeyError:
+                agg_store[row_key] = store
+            else:
+                for c_expr in c_aggregate_exprs:
+                    c_expr.merge(merged_store, store)
+    return agg_store
+
+
+def execute_query(query, entries, options_map, num_workers=None, stats=None):
+    """Given a compiled select statement, execute the query.
+
+    Args:
+      query: An instance of a query_compile.Query
+      entries: A list of directives.
+      options_map: A parser's option_map.
+      num_workers: An optional integer, the number of worker processes to use
+        to evaluate aggregated queries. Aggregation runs in parallel only for
+        large enough inputs, if all the aggregates are mergeable and if the
+        query does not use the running balance.
+      stats: An optional ExecutionStats instance to record the timings and row
+        counts of each of the stages of the execution to. Aggregation is always
+        run serially when recording stats.
+    Returns:
+      A pair of:
+        result_types: A list of (name, data-type) item pairs.
+        result_rows: A list of ResultRow tuples of length and types described by
+          'result_types'.
+    """
+    if query.group_indexes is None:
+        # This is a non-aggregated query. Its rows are the same as those
+        # produced lazily, sorted in memory.
+        result_types, result_rows = execute_query_iter(query, entries, options_map,
+                                                       None, stats)
+        return result_types, list(result_rows)
+
+    # Figure out the result types that describe what we return.
+    result_types = [(target.name, target.c_expr.dtype)
+                    for target in query.c_targets
+                    if target.name is not None]
+
+    # Create a class for each final result.
+    # pylint: disable=invalid-name
+    ResultRow = collections.namedtuple('ResultRow',
+                                       [target.name
+                                        for target in query.c_targets
+                                        if target.name is not None])
+
+    # Pre-compute lists of the expressions to evaluate.
+    group_indexes = set(query.group_indexes)
 
-            # Compute result and sort-key objects.
-            result = ResultRow._make(values[index]
-                                     for index in result_indexes)
+    # Indexes of the columns for result rows and order rows.
+    result_indexes = [index
+                      for index, c_target in enumerate(query.c_targets)
+                      if c_target.name]
+    order_indexes = query.order_indexes
+
+    # Figure out if we need to compute balance.
+    uses_balance = any(uses_balance_column(c_expr)
+                       for c_expr in itertools.chain(
+                               [c_target.c_expr for c_target in query.c_targets],
+                               [query.c_where] if query.c_where else []))
+
+    time_stage = time.perf_counter()
+    context = create_row_context(entries, options_map)
+    time_stage = record_stage(stats, 'context', time_stage, len(entries), None)
+
+    # Filter the entries using the FROM clause.
+    filt_entries = (filter_entries(query.c_from, entries, options_map, context, stats)
+                    if query.c_from is not None else
+                    entries)
+    time_stage = time.perf_counter()
+
+    c_where = query.c_where
+    if stats is not None and c_where is not None:
+        c_where = CountingWhere(c_where)
+    result_rows = []
+
+    # Precompute a list of expressions to be evaluated.
+    c_target_exprs = [c_target.c_expr for c_target in query.c_targets]
+
+    # Precompute lists of non-aggregate and aggregate expressions to
+    # evaluate. For aggregate targets, we hunt down the aggregate
+    # sub-expressions to evaluate, to avoid recursion during iteration.
+    c_nonaggregate_exprs = []
+    c_aggregate_exprs = []
+    for index, c_expr in enumerate(c_target_exprs):
+        if index in group_indexes:
+            c_nonaggregate_exprs.append(c_expr)
+        else:
+            _, aggregate_exprs = query_compile.get_columns_and_aggregates(c_expr)
+            c_aggregate_exprs.extend(aggregate_exprs)
+    # Note: it is possible that there are no aggregates to compute here. You could
+    # have all columns be non-aggregates and group-by the entire list of columns.
+
+    # Pre-allocate handles in aggregation nodes.
+    allocator = Allocator()
+    for c_expr in c_aggregate_exprs:
+        c_expr.allocate(allocator)
+
+    # Allocate a slot for the original values of the group-by expressions, if
+    # they are frozen in the row keys.
+    values_handle = (allocator.allocate()
+                     if get_freeze_indexes(c_nonaggregate_exprs) else
+                     None)
+
+    # Iterate over all the postings to evaluate the aggregates. The running
+    # balance depends on all the postings that precede it and cannot be
+    # computed over independent partitions.
+    txn_entries = list(misc_utils.filter_type(filt_entries, data.Transaction))
+    if (num_workers is not None and num_workers > 1 and
+        stats is None and
+        not uses_balance and
+        len(txn_entries) >= PARALLEL_MIN_ENTRIES and
+        all(query_compile.is_mergeable(c_expr) for c_expr in c_aggregate_exprs)):
+        agg_store = parallel_aggregate_postings(
+            num_workers, txn_entries, context, c_where,
+            c_nonaggregate_exprs, c_aggregate_exprs, allocator, uses_balance,
+            values_handle)
+    else:
+        agg_store = aggregate_postings(
+            txn_entries, context, c_where,
+            c_nonaggregate_exprs, c_aggregate_exprs, allocator, uses_balance,
+            MAX_GROUPS, values_handle)
+
+    if stats is not None:
+        num_postings = (c_where.rows_out
+                        if c_where is not None else
+                        sum(len(entry.postings) for entry in txn_entries))
+        time_stage = _record_scan(stats, 'aggregate', time_stage, c_where,
+                                  num_postings,
+                                  len(agg_store) if isinstance(agg_store, dict) else None)
+
+    # Iterate over all the aggregations to produce the rows.
+    for key, store in agg_store.items():
+        key_iter = iter(key if values_handle is None else store[values_handle])
+        values = []
+
+        # Finalize the store.
+        for c_expr in c_aggregate_exprs:
+            c_expr.finalize(store)
+        context.store = store
+
+        for index, c_expr in enumerate(c_target_exprs):
+            if index in group_indexes:
+                value = next(key_iter)
+            else:
+                value = c_expr(context)
+            values.append(value)
+
+        # Compute result and sort-key objects.
+        result = ResultRow._make(values[index]
+                                 for index in result_indexes)
+        if order_indexes is None:
+            result_rows.append(result)
+        else:
             sortkey = row_sortkey(order_indexes, values, c_target_exprs)
-            schwartz_rows.append((sortkey, result))
+            result_rows.append((sortkey, result))
 
-    # Order results if requested.
-    if order_indexes is not None:
-        schwartz_rows.sort(key=operator.itemgetter(0),
-                           reverse=(query.ordering == 'DESC'))
+    time_stage = record_stage(stats, 'finalize', time_stage,
+                              len(agg_store) if isinstance(agg_store, dict) else None,
+                              len(result_rows))
 
-    # Extract final results, in sorted order at this point.
-    result_rows = [x[1] for x in schwartz_rows]
+    # Order, uniquify, limit and flatten the rows.
+    result_types, result_rows = finish_rows(query, result_types, ResultRow, result_rows,
+                                            None, stats)
+    return (result_types, list(result_rows))
 
-    # Apply distinct.
-    if query.distinct:
-        result_rows = list(misc_utils.uniquify(result_rows))
 
-    # Apply limit.
-    if query.limit is not None:
-        result_rows = result_rows[:query.limit]
+def _record_scan(stats, name, time_begin, c_where, rows_in, rows_out):
+    """Record the stages of the iteration over the postings.
 
-    # Flatten inventories if requested.
-    if query.flatten:
-        result_types, result_rows = flatten_results(result_types, result_rows)
+    The time spent evaluating the WHERE clause is recorded separately from the
+    time spent evaluating the targets or aggregates.
 
-    return (result_types, result_rows)
+    Args:
+      stats: An ExecutionStats instance.
+      name: A string, the name of the stage following the WHERE clause.
+      time_begin: A float, the time at which the iteration began.
+      c_where: A CountingWhere instance, or None, if there is no WHERE clause.
+      rows_in: The number of postings input to the named stage.
+      rows_out: The number of rows output by the named stage.
+    Returns:
+      A float, the current time.
+    """
+    time_end = time.perf_counter()
+    time_spent = time_end - time_begin
+    if c_where is not None:
+        stats.record('where', c_where.time, c_where.rows_in, c_where.rows_out)
+        time_spent -= c_where.time
+    stats.record(name, time_spent, rows_in, rows_out)
+    return time_end
 
 
 def flatten_results(result_types, result_rows):
@@ -399,19 +1055,54 @@ def flatten_results(result_types, result_rows):
           'result_types'. All inventories from the input should have been converted
           to Position types.
     """
+    output_types, output_rows = iter_flatten_results(result_types, result_rows)
+    return output_types, list(output_rows)
+
+
+def iter_flatten_results(result_types, result_rows):
+    """Convert inventories in result types to have a row for each, lazily.
+
+    This is the same as flatten_results(), but accepts and produces an iterator
+    of rows.
+
+    Args:
+        result_types: A list of (name, data-type) item pairs.
+        result_rows: An iterable of ResultRow tuples of length and types
+          described by 'result_types'.
+    Returns:
+        result_types: A list of (name, data-type) item pairs. There should be no
+          Inventory types anymore.
+        result_rows: An iterator of ResultRow tuples of length and types described
+          by 'result_types'.
+    """
     indexes = set(index
                   for index, (name, result_type) in enumerate(result_types)
                   if result_type is inventory.Inventory)
     if not indexes:
-        return (result_types, result_rows)
+        return (result_types, iter(result_rows))
 
-    # pylint: disable=invalid-name
-    ResultRow = type(result_rows[0])
+    # Convert the types.
+    output_types = [(name, (position.Position
+                            if result_type is inventory.Inventory
+                            else result_type))
+                    for name, result_type in result_types]
+
+    return output_types, _flatten_rows(result_rows, indexes, len(result_types))
 
-    # We have to make at least some conversions.
-    num_columns = len(result_types)
-    output_rows = []
+
+def _flatten_rows(result_rows, indexes, num_columns):
+    """Expand rows with inventories to have a row for each position.
+
+    Args:
+      result_rows: An iterable of ResultRow tuples.
+      indexes: A set of integers, the indexes of the inventory columns.
+      num_columns: An integer, the number of columns in each row.
+    Yields:
+      ResultRow tuples.
+    """
     for result_row in result_rows:
+        # pylint: disable=invalid-name
+        ResultRow = type(result_row)
         max_rows = max(len(result_row[icol]) for icol in indexes)
         for irow in range(max_rows):
             output_row = []
@@ -420,12 +1111,4 @@ def flatten_results(result_types, result_rows):
                 if icol in indexes:
                     value = value[irow] if irow < len(value) else None
                 output_row.append(value)
-            output_rows.append(ResultRow._make(output_row))
-
-    # Convert the types.
-    output_types = [(name, (position.Position
-                            if result_type is inventory.Inventory
-                            else result_type))
-                    for name, result_type in result_types]
-
-    return output_types, output_rows
+            yield ResultRow._make(output_row)
@@ -6,6 +6,7 @@ import decimal
 import io
 import unittest
 import textwrap
+from unittest import mock
 
 from beancount.core.number import D
 from beancount.core.number import Decimal
@@ -16,6 +17,7 @@ from beancount.query import query_env as qe
 from beancount.query import query_execute as qx
 from beancount.parser import cmptest
 from beancount.utils import misc_utils
+from beancount.utils import memo
 from beancount import loader
 
 
@@ -260,6 +262,39 @@ class TestFilterEntries(CommonInputBase, QueryBase):
 
         """), filtered_entries)
 
+    def test_filter_memoized(self):
+        for query in ["SELECT date FROM OPEN ON 2013-01-01 CLOSE ON 2014-01-01 CLEAR;",
+                      "SELECT date FROM CLOSE;"]:
+            c_from = self.compile(query).c_from
+            filtered_entries = qx.filter_entries(c_from, self.entries, self.options_map,
+                                                 self.context)
+            self.assertIs(filtered_entries,
+                          qx.filter_entries(c_from, self.entries, self.options_map,
+                                            self.context))
+
+            # Other entries, other options or a clear of the cache summarize again.
+            other_entries = qx.filter_entries(c_from, list(self.entries),
+                                              self.options_map, self.context)
+            self.assertIsNot(filtered_entries, other_entries)
+            self.assertEqual(filtered_entries, other_entries)
+            self.assertIsNot(filtered_entries,
+                             qx.filter_entries(c_from, self.entries,
+                                               dict(self.options_map), self.context))
+            memo.clear_ledger_caches()
+            self.assertIsNot(filtered_entries,
+                             qx.filter_entries(c_from, self.entries, self.options_map,
+                                               self.context))
+
+    def test_filter_memoized_modified_entries(self):
+        c_from = self.compile("SELECT date FROM OPEN ON 2016-01-01;").c_from
+        entries = list(self.entries)
+        filtered_entries = qx.filter_entries(c_from, entries, self.options_map,
+                                             self.context)
+        entries.pop()
+        self.assertNotEqual(filtered_entries,
+                            qx.filter_entries(c_from, entries, self.options_map,
+                                              self.context))
+
 
 class TestExecutePrint(CommonInputBase, QueryBase):
 
@@ -937,6 +972,270 @@ class TestArithmeticFunctions(QueryBase):
 
 
 
+class TestExecuteParallelAggregation(QueryBase):
+
+    INPUT = """
+
+      2010-01-01 open Assets:Bank:Checking
+      2010-01-01 open Expenses:Restaurant
+      2010-01-01 open Expenses:Grocery
+
+      2010-02-23 * "Dinner"
+        Expenses:Restaurant   12.00 USD
+        Assets:Bank:Checking
+
+      2010-03-24 * "Groceries"
+        Expenses:Grocery   40.00 USD
+        Assets:Bank:Checking
+
+      2011-02-24 * "Lunch"
+        Expenses:Restaurant   8.00 USD
+        Assets:Bank:Checking
+
+      2011-05-01 * "Groceries"
+        Expenses:Grocery   35.00 USD
+        Assets:Bank:Checking
+
+      2012-05-01 * "Groceries"
+        Expenses:Grocery   30.00 USD
+        Assets:Bank:Checking
+
+    """
+
+    def check_parallel(self, bql_string):
+        entries, _, options_map = loader.load_string(self.INPUT)
+        expected = qx.execute_query(self.compile(bql_string), entries, options_map)
+        with mock.patch.object(qx, 'PARALLEL_MIN_ENTRIES', 0):
+            with mock.patch.object(qx, 'parallel_aggregate_postings',
+                                   wraps=qx.parallel_aggregate_postings) as parallel:
+                actual = qx.execute_query(self.compile(bql_string), entries,
+                                          options_map, num_workers=3)
+        self.assertEqual(expected, actual)
+        return parallel.called
+
+    def test_mergeable(self):
+        self.assertTrue(self.check_parallel("""
+          SELECT year, account, count(position), sum(position), sum(number),
+                 first(narration), last(narration), min(number), max(number)
+          GROUP BY year, account
+        """))
+
+    def test_group_order(self):
+        self.assertTrue(self.check_parallel("""
+          SELECT account, sum(position) GROUP BY account ORDER BY account
+        """))
+
+    def test_uses_balance(self):
+        self.assertFalse(self.check_parallel("""
+          SELECT account, last(balance) GROUP BY account
+        """))
+
+
+class TestExecuteUnhashableKeys(QueryBase):
+
+    INPUT = """
+
+      2010-01-01 open Assets:Cash
+      2010-01-01 open Expenses:Restaurant
+      2010-01-01 open Equity:Opening-Balances
+
+      2010-02-01 * "Deposit"
+        Assets:Cash             10.00 USD
+        Equity:Opening-Balances
+
+      2010-02-23 * "Dinner" #food
+        Expenses:Restaurant     10.00 USD
+        Assets:Cash
+
+      2010-03-01 * "Deposit" #cash
+        Assets:Cash             10.00 USD
+        Equity:Opening-Balances
+
+      2010-03-23 * "Dinner" #food
+        Expenses:Restaurant     10.00 USD
+        Assets:Cash
+
+    """
+
+    def test_group_by_inventory(self):
+        self.check_query(
+            self.INPUT,
+            """
+            SELECT balance, count(position) WHERE account = 'Assets:Cash'
+            GROUP BY balance
+            """,
+            [('balance', inventory.Inventory),
+             ('count_position', int)],
+            [(inventory.from_string('10.00 USD'), 2),
+             (inventory.Inventory(), 2)])
+
+    def test_group_by_set(self):
+        self.check_query(
+            self.INPUT,
+            """
+            SELECT tags, sum(number) WHERE account = 'Expenses:Restaurant'
+            GROUP BY tags
+            """,
+            [('tags', set),
+             ('sum_number', Decimal)],
+            [(frozenset({'food'}), D('20.00'))])
+
+    def test_group_by_inventory_order(self):
+        entries, _, options_map = loader.load_string("""
+          2010-01-01 open Assets:Cash
+          2010-01-01 open Equity:Opening-Balances
+
+          2010-02-01 * "Deposit"
+            Assets:Cash             10.00 USD
+            Assets:Cash             20.00 CAD
+            Assets:Cash             30.00 EUR
+            Assets:Cash             40.00 JPY
+            Equity:Opening-Balances
+        """)
+        _, expected_rows = qx.execute_query(
+            self.compile("SELECT DISTINCT balance WHERE account = 'Assets:Cash'"),
+            entries, options_map)
+        query = self.compile("""
+          SELECT balance, count(position) WHERE account = 'Assets:Cash'
+          GROUP BY balance
+        """)
+        for max_groups in [None, 1]:
+            with mock.patch.object(qx, 'MAX_GROUPS', max_groups):
+                _, result_rows = qx.execute_query(query, entries, options_map)
+            # The grouped inventories keep the order of their positions.
+            self.assertEqual(
+                sorted(list(row.balance.get_positions()) for row in expected_rows),
+                sorted(list(row.balance.get_positions()) for row in result_rows))
+
+    def test_distinct_inventory(self):
+        self.check_query(
+            self.INPUT,
+            """
+            SELECT DISTINCT balance WHERE account = 'Assets:Cash'
+            """,
+            [('balance', inventory.Inventory)],
+            [(inventory.from_string('10.00 USD'),),
+             (inventory.Inventory(),)])
+
+    def test_spill(self):
+        bql_string = """
+          SELECT account, count(position), sum(position), first(narration),
+                 last(narration), min(number), max(number)
+          GROUP BY account
+          ORDER BY account
+        """
+        entries, _, options_map = loader.load_string(self.INPUT)
+        expected = qx.execute_query(self.compile(bql_string), entries, options_map)
+        with mock.patch.object(qx, 'MAX_GROUPS', 1):
+            with mock.patch.object(qx, 'SpilledStores',
+                                   wraps=qx.SpilledStores) as spilled_stores:
+                actual = qx.execute_query(self.compile(bql_string), entries, options_map)
+        self.assertTrue(spilled_stores.called)
+        self.assertEqual(expected, actual)
+
+    def test_spill_not_mergeable(self):
+        with mock.patch.object(qx, 'MAX_GROUPS', 1), \
+             mock.patch.object(qc, 'is_mergeable', return_value=False), \
+             mock.patch.object(qx, 'SpilledStores',
+                               wraps=qx.SpilledStores) as spilled_stores:
+            self.check_sorted_query(
+                self.INPUT,
+                """
+                SELECT account, count(position) GROUP BY account
+                """,
+                [('account', str),
+                 ('count_position', int)],
+                [('Assets:Cash', 4),
+                 ('Equity:Opening-Balances', 2),
+                 ('Expenses:Restaurant', 2)])
+        self.assertFalse(spilled_stores.called)
+
+
+class TestExecuteQueryIter(QueryBase):
+
+    INPUT = """
+
+      2010-01-01 open Assets:Bank:Checking
+      2010-01-01 open Expenses:Restaurant
+
+      2010-02-23 * "Dinner"
+        Expenses:Restaurant   12.00 USD
+        Assets:Bank:Checking
+
+      2010-02-24 * "Lunch"
+        Expenses:Restaurant   8.00 USD
+        Assets:Bank:Checking
+
+    """
+
+    def check_same(self, bql_string):
+        entries, _, options_map = loader.load_string(self.INPUT)
+        expected_types, expected_rows = qx.execute_query(
+            self.compile(bql_string), entries, options_map)
+        result_types, result_rows = qx.execute_query_iter(
+            self.compile(bql_string), entries, options_map)
+        self.assertFalse(isinstance(result_rows, list))
+        self.assertEqual(expected_types, result_types)
+        self.assertEqual(expected_rows, list(result_rows))
+
+    def test_is_streamable(self):
+        self.assertTrue(qx.is_streamable(self.compile(
+            "SELECT account, position")))
+        self.assertTrue(qx.is_streamable(self.compile(
+            "SELECT account, position ORDER BY account")))
+        self.assertFalse(qx.is_streamable(self.compile(
+            "SELECT account, sum(position)")))
+
+    def test_streamed(self):
+        self.check_same("SELECT date, account, position, balance")
+
+    def test_streamed_distinct_limit(self):
+        self.check_same("SELECT DISTINCT account LIMIT 1")
+
+    def test_streamed_where(self):
+        self.check_same("SELECT date, narration WHERE account ~ 'Expenses'")
+
+    def test_streamed_ordered(self):
+        self.check_same("SELECT date, account, position ORDER BY date, account DESC")
+
+    def test_streamed_ordered_spilled(self):
+        entries, _, options_map = loader.load_string(self.INPUT)
+        bql_string = "SELECT date, account, position, balance ORDER BY account, date DESC"
+        expected_types, expected_rows = qx.execute_query(
+            self.compile(bql_string), entries, options_map)
+        with mock.patch.object(qx.tempfile, 'TemporaryFile',
+                               wraps=qx.tempfile.TemporaryFile) as tmpfile:
+            result_types, result_rows = qx.execute_query_iter(
+                self.compile(bql_string), entries, options_map, max_sort_rows=1)
+            self.assertEqual(expected_types, result_types)
+            self.assertEqual(expected_rows, list(result_rows))
+        self.assertEqual(4, tmpfile.call_count)
+
+    def test_not_streamed(self):
+        self.check_same("SELECT account, sum(position) GROUP BY account ORDER BY account")
+
+
+class TestSortRows(unittest.TestCase):
+
+    ROWS = [((3, 'c'), ('c0',)),
+            ((1, 'a'), ('a0',)),
+            ((2, 'b'), ('b0',)),
+            ((1, 'a'), ('a1',)),
+            ((3, 'c'), ('c1',)),
+            ((2, 'a'), ('a2',)),
+            ((1, 'a'), ('a3',))]
+
+    def test_sort_rows(self):
+        for reverse in False, True:
+            expected = sorted(self.ROWS, key=lambda row: row[0], reverse=reverse)
+            for max_rows in None, 1, 2, 3, 7, 8:
+                self.assertEqual(expected, list(qx.sort_rows(iter(self.ROWS),
+                                                             reverse, max_rows)))
+
+    def test_sort_rows_empty(self):
+        self.assertEqual([], list(qx.sort_rows(iter([]), False, 1)))
+
+
 class TestExecuteFlatten(QueryBase):
 
     def test_flatten_results(self):
@@ -7,6 +7,7 @@ import collections
 import datetime
 import io
 import re
+import threading
 
 import dateutil.parser
 
@@ -81,6 +82,12 @@ Reload = collections.namedtuple('Reload', '')
 #   statement: An instance of a compiled statement to explain.
 Explain = collections.namedtuple('Explain', 'statement')
 
+# Explains a command and executes it, reporting the costs of its execution.
+#
+# Attributes:
+#   statement: An instance of a compiled statement to analyze.
+ExplainAnalyze = collections.namedtuple('ExplainAnalyze', 'statement')
+
 # RunCustom command (runs a custom query defined in the input file).
 #
 # Attributes:
@@ -201,7 +208,7 @@ class Lexer:
 
     # List of reserved keywords.
     keywords = {
-        'EXPLAIN',
+        'EXPLAIN', 'ANALYZE',
         'SELECT', 'AS', 'FROM', 'WHERE', 'OPEN', 'CLOSE', 'CLEAR', 'ON',
         'BALANCES', 'JOURNAL', 'PRINT', 'RUN', 'AT',
         'ERRORS', 'RELOAD',
@@ -286,17 +293,23 @@ class SelectParser(Lexer):
 
     start = 'select_statement'
 
+    # The name of the module of pregenerated parsing tables for this grammar.
+    # If the module is absent or out of date with respect to the grammar, the
+    # tables are regenerated on construction, which is slow. See write_tables().
+    tabmodule = 'beancount.query.select_parsetab'
+
     def __init__(self, **options):
         self.ply_lexer = ply.lex.lex(module=self,
                                      optimize=False,
                                      debuglog=None,
                                      debug=False)
-        self.ply_parser = ply.yacc.yacc(module=self,
-                                        optimize=False,
-                                        write_tables=False,
-                                        debuglog=None,
-                                        debug=False,
-                                        **options)
+        yacc_options = dict(optimize=False,
+                            write_tables=False,
+                            tabmodule=self.tabmodule,
+                            debuglog=None,
+                            debug=False)
+        yacc_options.update(options)
+        self.ply_parser = ply.yacc.yacc(module=self, **yacc_options)
 
         # The default value to use for the close date.
         self.default_close_date = None
@@ -653,6 +666,8 @@ class Parser(SelectParser):
     """
     start = 'top_statement'
 
+    tabmodule = 'beancount.query.parsetab'
+
     def p_regular_statement(self, p):
         "top_statement : statement delimiter"
         p[0] = p[1]
@@ -661,6 +676,10 @@ class Parser(SelectParser):
         "top_statement : EXPLAIN statement delimiter"
         p[0] = Explain(p[2])
 
+    def p_explain_analyze_statement(self, p):
+        "top_statement : EXPLAIN ANALYZE statement delimiter"
+        p[0] = ExplainAnalyze(p[3])
+
     def p_statement(self, p):
         """
         statement : select_statement
@@ -756,3 +775,36 @@ def get_expression_name(expr):
 
     else:
         assert False, "Unknown expression type."
+
+
+def write_tables(outputdir):
+    """Regenerate the modules of pregenerated parsing tables.
+
+    Run this after modifying the grammar, e.g. with 'make query-parser-tables'.
+
+    Args:
+      outputdir: A string, the directory of this package.
+    """
+    for parser_class in SelectParser, Parser:
+        parser_class(write_tables=True, outputdir=outputdir)
+
+
+# A thread-local holder of shared parser instances.
+_local = threading.local()
+
+
+def parse(line, default_close_date=None):
+    """Parse a statement with a parser shared by the calling thread.
+
+    Args:
+      line: A string, the statement to parse.
+      default_close_date: See Parser.parse().
+    Returns:
+      The parsed statement.
+    Raises:
+      ParseError: If the statement cannot be parsed.
+    """
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = Parser()
+    return parser.parse(line, default_close_date=default_close_date)
@@ -2,7 +2,11 @@ __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
 import datetime
+import threading
 import unittest
+from unittest import mock
+
+import ply.yacc
 
 from beancount.core.number import D
 from beancount.query import query_parser as qp
@@ -663,6 +667,38 @@ class TestExplain(QueryParserTestBase):
             qp.Journal('Assets:ETrade', 'units', None)
             ), "EXPLAIN JOURNAL 'Assets:ETrade' AT units;")
 
+    def test_explain_analyze(self):
+        self.assertParse(qp.ExplainAnalyze(
+            qSelect([qp.Target(qp.Column('account'), None)],
+                    where_clause=qp.Match(qp.Column('account'), qp.Constant('etrade')))
+            ), "EXPLAIN ANALYZE SELECT account WHERE account ~ 'etrade';")
+
+
+class TestParserTables(unittest.TestCase):
+
+    def test_tables_up_to_date(self):
+        # If this fails, regenerate the tables with 'make query-parser-tables'.
+        for parser_class in qp.SelectParser, qp.Parser:
+            with mock.patch.object(ply.yacc, 'LRGeneratedTable',
+                                   side_effect=AssertionError(parser_class.tabmodule)):
+                parser_class()
+
+    def test_parse(self):
+        self.assertEqual(qp.Parser().parse("SELECT account;"),
+                         qp.parse("SELECT account;"))
+
+        parsers = []
+        def get_parser():
+            qp.parse("SELECT account;")
+            parsers.append(qp._local.parser)
+        get_parser()
+        get_parser()
+        thread = threading.Thread(target=get_parser)
+        thread.start()
+        thread.join()
+        self.assertIs(parsers[0], parsers[1])
+        self.assertIsNot(parsers[0], parsers[2])
+
 
 if __name__ == '__main__':
     unittest.main()
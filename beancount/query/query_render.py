@@ -6,6 +6,7 @@ __license__ = "GNU GPLv2"
 import collections
 import csv
 import datetime
+import itertools
 import math
 from itertools import zip_longest
 
@@ -16,6 +17,11 @@ from beancount.core import inventory
 from beancount.core import distribution
 
 
+# The default number of rows used to estimate the widths of the columns when
+# rendering rows as they are produced.
+DEFAULT_SAMPLE_SIZE = 1000
+
+
 class ColumnRenderer:
     """Base class for classes that render and compute formatting and width for all
     values that appear within a column. All the values rendered are assumed to
@@ -28,6 +34,11 @@ class ColumnRenderer:
     # Override, the type of object to be rendered.
     dtype = None
 
+    # If true, values wider than the width computed by prepare() get cut to
+    # that width. This is disabled for renderers prepared from only a sample of
+    # the values of a column; see get_renderers().
+    truncate = True
+
     def __init__(self, unused_dcontext):
         pass
 
@@ -65,6 +76,18 @@ class ColumnRenderer:
         """
         raise NotImplementedError
 
+    def string_format(self, width):
+        """Return a format string for left-aligning a string to a width.
+
+        Args:
+          width: An integer, the width of the column.
+        Returns:
+          A format string, which cuts longer strings if 'truncate' is set.
+        """
+        if self.truncate:
+            return '{{:<{0}.{0}}}'.format(width)
+        return '{{:<{0}}}'.format(width)
+
 
 class ObjectRenderer(ColumnRenderer):
     """A renderer for a generic object type."""
@@ -103,7 +126,7 @@ class BoolRenderer(ColumnRenderer):
 
     def prepare(self):
         self.maxlen = 5 if self.seen_true else 4
-        self.fmt = '{{:<{}.{}}}'.format(self.maxlen, self.maxlen)
+        self.fmt = self.string_format(self.maxlen)
 
     def width(self):
         return self.maxlen
@@ -125,7 +148,7 @@ class StringRenderer(ColumnRenderer):
             self.maxlen = max(self.maxlen, len(string))
 
     def prepare(self):
-        self.fmt = '{{:<{}.{}}}'.format(self.maxlen, self.maxlen)
+        self.fmt = self.string_format(self.maxlen)
 
     def width(self):
         return self.maxlen
@@ -148,7 +171,7 @@ class StringSetRenderer(ColumnRenderer):
         self.maxlen = max(max(len(string) for string in string_set), self.maxlen)
 
     def prepare(self):
-        self.fmt = '{{:<{:d}.{:d}}}'.format(self.maxlen, self.maxlen)
+        self.fmt = self.string_format(self.maxlen)
         self.empty = self.fmt.format('')
 
     def width(self):
@@ -224,6 +247,8 @@ class DecimalRenderer(ColumnRenderer):
         self.max_adjusted = 0
         self.min_exponent = 0
         self.total_width = None
+        self.integral_width = 0
+        self.format_number = '{}'.format
         self.num_values = 0
         self.dists = collections.defaultdict(distribution.Distribution)
 
@@ -258,8 +283,7 @@ class DecimalRenderer(ColumnRenderer):
                 if width > total_width:
                     total_width = width
 
-            self.fmt = '{{:<{total_width}.{total_width}}}'.format(total_width=total_width)
-
+        self.fmt = self.string_format(total_width)
         self.total_width = total_width
         self.empty = ' ' * total_width
 
@@ -268,7 +292,7 @@ class DecimalRenderer(ColumnRenderer):
 
     # FIXME: 'key' is being ignored here. It shouldn't. This is likely problematic.
     def format(self, number, key=None):
-        if self.total_width == 0:
+        if self.total_width == 0 and self.truncate:
             return ''
         elif number is None:
             return self.fmt.format('')
@@ -304,10 +328,11 @@ class AmountRenderer(ColumnRenderer):
         self.ccylen = max(self.ccylen, len(amount_.currency))
 
     def prepare(self):
+        self.rdr.truncate = self.truncate
         self.rdr.prepare()
 
         if self.rdr.width() == 0:
-            self.fmt = None
+            self.fmt = None if self.truncate else '{} {}'
             self.empty = ''
         else:
             self.fmt = '{{:{0}}} {{:{1}}}'.format(self.rdr.width(), max(self.ccylen, 1))
@@ -317,10 +342,8 @@ class AmountRenderer(ColumnRenderer):
         return len(self.empty)
 
     def format(self, amount_):
-        if self.fmt is None:
+        if self.fmt is None or amount_ is None:
             return self.empty
-        elif amount_ is None:
-            return self.fmt.format('', '')
         return self.fmt.format(self.rdr.format(amount_.number, amount_.currency),
                                amount_.currency)
 
@@ -343,6 +366,7 @@ class PositionRenderer(ColumnRenderer):
         self.cost_rdr.update(pos.cost)
 
     def prepare(self):
+        self.units_rdr.truncate = self.cost_rdr.truncate = self.truncate
         self.units_rdr.prepare()
         self.cost_rdr.prepare()
 
@@ -353,7 +377,8 @@ class PositionRenderer(ColumnRenderer):
         fmt_units = '{{:{}}}'.format(units_width)
 
         if cost_width == 0:
-            self.fmt_with_cost = None # Will not get used.
+            # Will not get used, unless costs may appear past the values seen.
+            self.fmt_with_cost = None if self.truncate else fmt_units + ' {{{}}}'
             self.fmt_without_cost = fmt_units
             self.total_width = units_width
         else:
@@ -437,7 +462,7 @@ class InventoryRenderer(PositionRenderer):
             return strings
 
 
-def get_renderers(result_types, result_rows, dcontext):
+def get_renderers(result_types, result_rows, dcontext, truncate=True):
     """Create renderers for each column and prepare them with the given data.
 
     Args:
@@ -445,11 +470,15 @@ def get_renderers(result_types, result_rows, dcontext):
         each column.
       result_rows: A list of ResultRow instances.
       dcontext: A DisplayContext object prepared for rendering numbers.
+      truncate: A boolean, false if the rows are only a sample of the values to
+        be rendered, in which case wider values are not cut to the column widths.
     Returns:
       A list of subclass instances of ColumnRenderer.
     """
     renderers = [RENDERERS[dtype](dcontext)
                  for _, dtype in result_types]
+    for renderer in renderers:
+        renderer.truncate = truncate
 
     # Prime and prepare each of the renderers with the date in order to be ready
     # to begin rendering with correct alignment.
@@ -463,6 +492,102 @@ def get_renderers(result_types, result_rows, dcontext):
     return renderers
 
 
+def render_row(row, renderers, expand=False):
+    """Render a single result row to one or more rows of strings.
+
+    Args:
+      row: A ResultRow instance.
+      renderers: A list of prepared ColumnRenderer instances, one per column.
+      expand: A boolean, if true, expand columns that render to lists on multiple rows.
+    Returns:
+      A list of lists of strings, the rendered rows. There is a single one
+      unless some of the values were expanded over multiple lines.
+    """
+    # Rendering each row involves rendering all the columns, each of which
+    # produces one or more lines for its value, and then aligning those
+    # columns together to produce a final list of rendered row. This means
+    # that a single result row may result in multiple rendered rows.
+
+    # Render all the columns of a row into either strings or lists of
+    # strings. This routine also computes the maximum number of rows that a
+    # rendered value will generate.
+    exp_row = []
+    max_lines = 1
+    for value, renderer in zip(row, renderers):
+        # Update the column renderer.
+        exp_lines = renderer.format(value)
+        if isinstance(exp_lines, list):
+            if expand:
+                max_lines = max(max_lines, len(exp_lines))
+            else:
+                # Join the lines onto a single cell.
+                exp_lines = ', '.join(exp_lines)
+        exp_row.append(exp_lines)
+
+    # If all the values were rendered directly to strings, this is a row that
+    # renders on a single line. Just append this one row. This is the common
+    # case.
+    if max_lines == 1:
+        return [exp_row]
+
+    # Some of the values rendered to more than one line; we need to render
+    # them on separate lines and insert filler.
+
+    # Make sure all values in the column are wrapped in sequences.
+    exp_row = [exp_value if isinstance(exp_value, list) else (exp_value,)
+               for exp_value in exp_row]
+
+    # Create a matrix of the column.
+    str_lines = [[] for _ in range(max_lines)]
+    for exp_value in exp_row:
+        for index, exp_line in zip_longest(range(max_lines), exp_value,
+                                           fillvalue=''):
+            str_lines[index].append(exp_line)
+    return str_lines
+
+
+def iter_render_rows(result_types, result_rows, dcontext,
+                     expand=False, spaced=False, sample_size=DEFAULT_SAMPLE_SIZE):
+    """Render the result of executing a query in text format, lazily.
+
+    Only the first 'sample_size' rows are used to estimate the widths of the
+    columns before the first row is produced. The values beyond the sample are
+    never truncated, but they may render wider than their header.
+
+    Args:
+      result_types: A list of items describing the names and data types of the items in
+        each column.
+      result_rows: An iterable of ResultRow instances.
+      dcontext: A DisplayContext object prepared for rendering numbers.
+      expand: A boolean, if true, expand columns that render to lists on multiple rows.
+      spaced: If true, leave an empty line between each of the rows. This is useful if the
+        results have a lot of rows that render over multiple lines.
+      sample_size: An integer, the number of rows to use to estimate the widths
+        of the columns.
+    Returns:
+      A pair of an iterator of lists of strings, the rendered rows, and a list of
+      prepared ColumnRenderer instances.
+    """
+    result_rows = iter(result_rows)
+    sample_rows = list(itertools.islice(result_rows, sample_size))
+    renderers = get_renderers(result_types, sample_rows, dcontext, truncate=False)
+    spacing_row = [''] * len(renderers)
+
+    def generate_rows():
+        for row in sample_rows:
+            yield from render_row(row, renderers, expand)
+            if spaced:
+                yield spacing_row
+        sample_rows.clear()
+
+        for row in result_rows:
+            yield from render_row(row, renderers, expand)
+            if spaced:
+                yield spacing_row
+
+    return generate_rows(), renderers
+
+
 def render_rows(result_types, result_rows, dcontext,
                 expand=False, spaced=False):
     """Render the result of executing a query in text format.
@@ -492,54 +617,12 @@ def render_rows(result_types, result_rows, dcontext,
     renderers = get_renderers(result_types, result_rows, dcontext)
 
     # Precompute a spacing row.
-    if spaced:
-        spacing_row = [''] * len(renderers)
+    spacing_row = [''] * len(renderers)
 
     # Render all the columns of all the rows to strings.
     str_rows = []
     for row in result_rows:
-        # Rendering each row involves rendering all the columns, each of which
-        # produces one or more lines for its value, and then aligning those
-        # columns together to produce a final list of rendered row. This means
-        # that a single result row may result in multiple rendered rows.
-
-        # Render all the columns of a row into either strings or lists of
-        # strings. This routine also computes the maximum number of rows that a
-        # rendered value will generate.
-        exp_row = []
-        max_lines = 1
-        for value, renderer in zip(row, renderers):
-            # Update the column renderer.
-            exp_lines = renderer.format(value)
-            if isinstance(exp_lines, list):
-                if expand:
-                    max_lines = max(max_lines, len(exp_lines))
-                else:
-                    # Join the lines onto a single cell.
-                    exp_lines = ', '.join(exp_lines)
-            exp_row.append(exp_lines)
-
-        # If all the values were rendered directly to strings, this is a row that
-        # renders on a single line. Just append this one row. This is the common
-        # case.
-        if max_lines == 1:
-            str_rows.append(exp_row)
-
-        # Some of the values rendered to more than one line; we need to render
-        # them on separate lines and insert filler.
-        else:
-            # Make sure all values in the column are wrapped in sequences.
-            exp_row = [exp_value if isinstance(exp_value, list) else (exp_value,)
-                       for exp_value in exp_row]
-
-            # Create a matrix of the column.
-            str_lines = [[] for _ in range(max_lines)]
-            for exp_value in exp_row:
-                for index, exp_line in zip_longest(range(max_lines), exp_value,
-                                                   fillvalue=''):
-                    str_lines[index].append(exp_line)
-            str_rows.extend(str_lines)
-
+        str_rows.extend(render_row(row, renderers, expand))
         if spaced:
             str_rows.append(spacing_row)
 
@@ -547,22 +630,31 @@ def render_rows(result_types, result_rows, dcontext,
 
 
 def render_text(result_types, result_rows, dcontext, file,
-                expand=False, boxed=False, spaced=False):
+                expand=False, boxed=False, spaced=False, sample_size=None):
     """Render the result of executing a query in text format.
 
     Args:
       result_types: A list of items describing the names and data types of the items in
         each column.
-      result_rows: A list of ResultRow instances.
+      result_rows: A list of ResultRow instances, or an iterable of them if
+        'sample_size' is provided.
       dcontext: A DisplayContext object prepared for rendering numbers.
       file: A file object to render the results to.
       expand: A boolean, if true, expand columns that render to lists on multiple rows.
       boxed: A boolean, true if we should render the results in a fancy-looking ASCII box.
       spaced: If true, leave an empty line between each of the rows. This is useful if the
         results have a lot of rows that render over multiple lines.
+      sample_size: An optional integer. If provided, render the rows as they are
+        consumed, estimating the widths of the columns from this many rows
+        only. See iter_render_rows().
     """
-    str_rows, renderers = render_rows(result_types, result_rows, dcontext,
-                                      expand=expand, spaced=spaced)
+    if sample_size is None:
+        str_rows, renderers = render_rows(result_types, result_rows, dcontext,
+                                          expand=expand, spaced=spaced)
+    else:
+        str_rows, renderers = iter_render_rows(result_types, result_rows, dcontext,
+                                               expand=expand, spaced=spaced,
+                                               sample_size=sample_size)
 
     # Compute a final format strings.
     formats = ['{{:{}}}'.format(max(renderer.width(), 1))
@@ -602,19 +694,28 @@ def render_text(result_types, result_rows, dcontext, file,
         file.write(bottom_line)
 
 
-def render_csv(result_types, result_rows, dcontext, file, expand=False):
+def render_csv(result_types, result_rows, dcontext, file, expand=False,
+               sample_size=None):
     """Render the result of executing a query in text format.
 
     Args:
       result_types: A list of items describing the names and data types of the items in
         each column.
-      result_rows: A list of ResultRow instances.
+      result_rows: A list of ResultRow instances, or an iterable of them if
+        'sample_size' is provided.
       dcontext: A DisplayContext object prepared for rendering numbers.
       file: A file object to render the results to.
       expand: A boolean, if true, expand columns that render to lists on multiple rows.
+      sample_size: An optional integer. If provided, render the rows as they are
+        consumed, in constant memory. See iter_render_rows().
     """
-    str_rows, renderers = render_rows(result_types, result_rows, dcontext,
-                                      expand=expand, spaced=False)
+    if sample_size is None:
+        str_rows, _ = render_rows(result_types, result_rows, dcontext,
+                                  expand=expand, spaced=False)
+    else:
+        str_rows, _ = iter_render_rows(result_types, result_rows, dcontext,
+                                       expand=expand, spaced=False,
+                                       sample_size=sample_size)
 
     writer = csv.writer(file)
     header_row = [name for name, _ in result_types]
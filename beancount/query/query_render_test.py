@@ -284,6 +284,59 @@ class TestQueryRender(unittest.TestCase):
         """, oss.getvalue())
 
 
+    def test_render_text_streamed(self):
+        types = [('account', str), ('number', Decimal)]
+        Row = collections.namedtuple('TestRow', [name for name, type in types])
+        rows = [
+            Row('Assets:Cash', D('1.00')),
+            Row('Expenses:Restaurant', D('12.00')),
+            Row('Income:US:Babble:Vacation', D('1234.00')),
+        ]
+        oss = io.StringIO()
+        query_render.render_text(types, iter(rows), self.dcontext, oss,
+                                 sample_size=1)
+        lines = oss.getvalue().splitlines()
+        self.assertEqual(5, len(lines))
+        # The values beyond the sample do not get truncated.
+        self.assertRegex(lines[-1], r'Income:US:Babble:Vacation +1234.00')
+
+    def test_render_text_streamed_unseen(self):
+        types = [('position', position.Position), ('number', Decimal)]
+        Row = collections.namedtuple('TestRow', [name for name, type in types])
+        rows = [
+            Row(position.from_string('1.00 USD'), None),
+            Row(position.from_string('5 HOOL {500.23 USD}'), D('12.345')),
+        ]
+        str_rows, _ = query_render.iter_render_rows(types, iter(rows), self.dcontext,
+                                                    sample_size=1)
+        str_rows = list(str_rows)
+        self.assertEqual(2, len(str_rows))
+        # The cost and the number first seen beyond the sample do not get dropped.
+        self.assertRegex(str_rows[1][0], r'5 +HOOL {500.23 +USD}')
+        self.assertEqual('12.345', str_rows[1][1].strip())
+
+    def test_render_csv_streamed(self):
+        types = [('account', str), ('number', Decimal)]
+        Row = collections.namedtuple('TestRow', [name for name, type in types])
+        rows = [Row('Assets:Cash', D('1.00')),
+                Row('Expenses:Restaurant', D('12.00'))]
+
+        oss = io.StringIO()
+        query_render.render_csv(types, rows, self.dcontext, oss)
+        expected = oss.getvalue()
+
+        oss = io.StringIO()
+        query_render.render_csv(types, (row for row in rows), self.dcontext, oss,
+                                sample_size=10)
+        self.assertEqual(expected, oss.getvalue())
+
+        oss = io.StringIO()
+        query_render.render_csv(types, (row for row in rows), self.dcontext, oss,
+                                sample_size=1)
+        self.assertEqual(['account', 'Assets:Cash', 'Expenses:Restaurant'],
+                         [line.split(',')[0].strip()
+                          for line in oss.getvalue().splitlines()])
+
 
 # Add a test like this, where the column's result ends up being zero wide.
 # bean-query $L  "select account, sum(units(position)) from open on 2014-01-01
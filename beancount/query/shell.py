@@ -7,12 +7,14 @@ import atexit
 import cmd
 import codecs
 import io
+import itertools
 import logging
 import os
 import re
 import sys
 import shlex
 import textwrap
+import time
 import traceback
 from os import path
 
@@ -25,10 +27,13 @@ from beancount.query import query_parser
 from beancount.query import query_compile
 from beancount.query import query_env
 from beancount.query import query_execute
+from beancount.query import query_analyze
+from beancount.query import query_cache
 from beancount.query import query_render
 from beancount.query import numberify
 from beancount.parser import printer
 from beancount.core import data
+from beancount.utils import memo
 from beancount.utils import misc_utils
 from beancount.utils import pager
 from beancount.utils import version
@@ -95,6 +100,9 @@ class DispatchingShell(cmd.Cmd):
     # The maximum number of entries.
     max_entries = 64
 
+    # The maximum number of parsed statements to keep.
+    max_statements = 128
+
     # Header for parsed commands.
     doc_header = "Shell utility commands (type help <topic>):"
     misc_header = "Beancount query commands:"
@@ -113,6 +121,7 @@ class DispatchingShell(cmd.Cmd):
             load_history(path.expanduser(HISTORY_FILENAME))
         self.is_interactive = is_interactive
         self.parser = parser
+        self.statements = memo.LRUCache(self.max_statements)
         self.initialize_vars(default_format, do_numberify)
         self.add_help()
         self.outfile = outfile
@@ -126,6 +135,9 @@ class DispatchingShell(cmd.Cmd):
             'spaced': convert_bool,
             'expand': convert_bool,
             'numberify': convert_bool,
+            'stream': convert_bool,
+            'workers': int,
+            'sortbuffer': int,
             }
         self.vars = {
             'pager': os.environ.get('PAGER', None),
@@ -134,6 +146,9 @@ class DispatchingShell(cmd.Cmd):
             'spaced': False,
             'expand': False,
             'numberify': do_numberify,
+            'stream': False,
+            'workers': 1,
+            'sortbuffer': query_execute.SORT_MAX_ROWS,
             }
 
     def add_help(self):
@@ -266,14 +281,31 @@ class DispatchingShell(cmd.Cmd):
           default_close_date: A datetimed.date instance, the default close date.
         """
         try:
-            statement = self.parser.parse(line,
-                                          default_close_date=default_close_date)
+            statement = self.parse_statement(line, default_close_date)
             self.dispatch(statement)
         except query_parser.ParseError as exc:
             print(exc, file=self.outfile)
         except Exception as exc:
             traceback.print_exc(file=self.outfile)
 
+    def parse_statement(self, line, default_close_date=None):
+        """Parse a statement, reusing the result of a previous identical parse.
+
+        Args:
+          line: The string to be parsed.
+          default_close_date: A datetimed.date instance, the default close date.
+        Returns:
+          The parsed statement. This is shared and must not be modified.
+        Raises:
+          ParseError: If the statement cannot be parsed.
+        """
+        key = (line, default_close_date)
+        statement = self.statements.get(key)
+        if statement is None:
+            statement = self.parser.parse(line, default_close_date=default_close_date)
+            self.statements.put(key, statement)
+        return statement
+
     def emptyline(self):
         """Do nothing on an empty line."""
 
@@ -294,11 +326,12 @@ class BQLShell(DispatchingShell):
     prompt = 'beancount> '
 
     def __init__(self, is_interactive, loadfun, outfile,
-                 default_format='text', do_numberify=False):
+                 default_format='text', do_numberify=False, cache=None):
         super().__init__(is_interactive, query_parser.Parser(), outfile,
                          default_format, do_numberify)
 
         self.loadfun = loadfun
+        self.cache = cache
         self.entries = None
         self.errors = None
         self.options_map = None
@@ -307,11 +340,17 @@ class BQLShell(DispatchingShell):
         self.env_entries = query_env.FilterEntriesEnvironment()
         self.env_postings = query_env.FilterPostingsEnvironment()
 
+        # Compiled queries, keyed on the rendering of their parsed statement.
+        self.queries = memo.LRUCache(self.max_statements)
+
     def on_Reload(self, unused_statement=None):
         """
         Reload the input file without restarting the shell.
         """
         self.entries, self.errors, self.options_map = self.loadfun()
+        memo.clear_ledger_caches()
+        if self.cache is not None:
+            self.cache.set_ledger(self.entries, self.options_map)
         if self.is_interactive:
             print_statistics(self.entries, self.options_map, self.outfile)
 
@@ -404,18 +443,40 @@ class BQLShell(DispatchingShell):
         """
         # Compile the SELECT statement.
         try:
-            c_query = query_compile.compile(statement,
-                                            self.env_targets,
-                                            self.env_postings,
-                                            self.env_entries)
+            c_query = self.compile_statement(statement)
         except query_compile.CompilationError as exc:
             print('ERROR: {}.'.format(str(exc).rstrip('.')), file=self.outfile)
             return
 
-        # Execute it to obtain the result rows.
-        rtypes, rrows = query_execute.execute_query(c_query,
-                                                    self.entries,
-                                                    self.options_map)
+        # Stream the rows as they are produced if requested and possible.
+        # Numberification needs to see all the rows to split the columns, and
+        # cached results are materialized anyway.
+        stream = (self.vars['stream'] and
+                  self.cache is None and
+                  query_execute.is_streamable(c_query) and
+                  not (self.vars['format'] == 'csv' and self.vars['numberify']))
+
+        # Execute it to obtain the result rows, reusing cached results if
+        # available.
+        sample_size = None
+        if stream:
+            rtypes, rrows = query_execute.execute_query_iter(
+                c_query, self.entries, self.options_map,
+                self.vars['sortbuffer'] or None)
+            # Peek at the first row to find out if the result set is empty.
+            first_row = next(rrows, None)
+            rrows = itertools.chain([first_row], rrows) if first_row is not None else []
+            sample_size = query_render.DEFAULT_SAMPLE_SIZE
+        elif self.cache is not None:
+            rtypes, rrows = self.cache.execute_query(c_query,
+                                                     self.entries,
+                                                     self.options_map,
+                                                     self.vars['workers'])
+        else:
+            rtypes, rrows = query_execute.execute_query(c_query,
+                                                        self.entries,
+                                                        self.options_map,
+                                                        self.vars['workers'])
 
         # Output the resulting rows.
         if not rrows:
@@ -425,7 +486,8 @@ class BQLShell(DispatchingShell):
             if output_format == 'text':
                 kwds = dict(boxed=self.vars['boxed'],
                             spaced=self.vars['spaced'],
-                            expand=self.vars['expand'])
+                            expand=self.vars['expand'],
+                            sample_size=sample_size)
                 if self.outfile is sys.stdout:
                     with self.get_pager() as file:
                         query_render.render_text(rtypes, rrows,
@@ -447,7 +509,8 @@ class BQLShell(DispatchingShell):
                 query_render.render_csv(rtypes, rrows,
                                         self.options_map['dcontext'],
                                         self.outfile,
-                                        expand=self.vars['expand'])
+                                        expand=self.vars['expand'],
+                                        sample_size=sample_size)
 
             else:
                 assert output_format not in _SUPPORTED_FORMATS
@@ -455,6 +518,26 @@ class BQLShell(DispatchingShell):
                       file=self.outfile)
 
 
+    def compile_statement(self, statement):
+        """Compile a statement, reusing the result of a previous identical compile.
+
+        Args:
+          statement: An instance of a parsed statement.
+        Returns:
+          An instance of EvalQuery.
+        Raises:
+          CompilationError: If the statement cannot be compiled.
+        """
+        key = repr(statement)
+        c_query = self.queries.get(key)
+        if c_query is None:
+            c_query = query_compile.compile(statement,
+                                            self.env_targets,
+                                            self.env_postings,
+                                            self.env_entries)
+            self.queries.put(key, c_query)
+        return c_query
+
     def on_Journal(self, journal):
         """
         Select a journal of some subset of postings. This command is a
@@ -489,32 +572,80 @@ class BQLShell(DispatchingShell):
         """
         Compile and print a compiled statement for debugging.
         """
+        self.explain_statement(explain.statement)
+
+    def on_ExplainAnalyze(self, explain):
+        """
+        Compile and execute a statement, and print the time spent in each of the
+        stages of its execution, the number of rows in and out of each of them,
+        and the functions which took the most time to evaluate. The resulting
+        rows are rendered but not printed.
+
+           EXPLAIN ANALYZE <statement>
+        """
+        query = self.explain_statement(explain.statement)
+        if query is None:
+            return
+        if not isinstance(query, query_compile.EvalQuery):
+            print('ERROR: Can only analyze SELECT-like statements.', file=self.outfile)
+            return
+
+        rtypes, rrows, stats, profile = query_analyze.analyze_query(
+            query, self.entries, self.options_map)
+
+        # Time the rendering of the rows, discarding the output.
+        time_stage = time.perf_counter()
+        if rrows:
+            oss = io.StringIO()
+            if self.vars['format'] == 'csv':
+                query_render.render_csv(rtypes, rrows, self.options_map['dcontext'],
+                                        oss, expand=self.vars['expand'])
+            else:
+                query_render.render_text(rtypes, rrows, self.options_map['dcontext'],
+                                         oss,
+                                         boxed=self.vars['boxed'],
+                                         spaced=self.vars['spaced'],
+                                         expand=self.vars['expand'])
+        query_execute.record_stage(stats, 'render', time_stage, len(rrows), None)
+
+        query_analyze.render_analysis(stats, profile, self.outfile)
+
+    def explain_statement(self, statement):
+        """Compile and print a statement.
+
+        Args:
+          statement: An instance of a parsed statement.
+        Returns:
+          The compiled query, or None, if it failed to compile.
+        """
         # pylint: disable=invalid-name
         pr = lambda *args: print(*args, file=self.outfile)
         pr("Parsed statement:")
-        pr("  {}".format(explain.statement))
+        pr("  {}".format(statement))
         pr()
 
         # Compile the select statement and print it uot.
         try:
-            query = query_compile.compile(explain.statement,
+            query = query_compile.compile(statement,
                                           self.env_targets,
                                           self.env_postings,
                                           self.env_entries)
         except query_compile.CompilationError as exc:
             pr(str(exc).rstrip('.'))
-            return
+            return None
 
         pr("Compiled query:")
         pr("  {}".format(query))
         pr()
-        pr("Targets:")
-        for c_target in query.c_targets:
-            pr("  '{}'{}: {}".format(
-                c_target.name or '(invisible)',
-                ' (aggregate)' if query_compile.is_aggregate(c_target.c_expr) else '',
-                c_target.c_expr.dtype.__name__))
-        pr()
+        if isinstance(query, query_compile.EvalQuery):
+            pr("Targets:")
+            for c_target in query.c_targets:
+                pr("  '{}'{}: {}".format(
+                    c_target.name or '(invisible)',
+                    ' (aggregate)' if query_compile.is_aggregate(c_target.c_expr) else '',
+                    c_target.c_expr.dtype.__name__))
+            pr()
+        return query
 
     def on_RunCustom(self, run_stmt):
         """
@@ -546,7 +677,7 @@ class BQLShell(DispatchingShell):
             except KeyError:
                 print("ERROR: Query '{}' not found".format(name))
             else:
-                statement = self.parser.parse(query.query_string)
+                statement = self.parse_statement(query.query_string)
                 self.dispatch(statement)
 
 
@@ -786,6 +917,28 @@ def main():
     parser.add_argument('-q', '--no-errors', action='store_true',
                         help='Do not report errors')
 
+    parser.add_argument('--stream', action='store_true',
+                        help=("Render the rows of non-aggregated queries as they are "
+                              "produced, in bounded memory."))
+
+    parser.add_argument('--sort-buffer', action='store', type=int,
+                        default=query_execute.SORT_MAX_ROWS,
+                        help=("The number of rows of streamed ordered queries to sort "
+                              "in memory. Beyond this, sorted runs of rows are "
+                              "spilled to temporary files. Zero disables spilling."))
+
+    parser.add_argument('-j', '--workers', action='store', type=int, default=1,
+                        help=("The number of processes to use to evaluate "
+                              "aggregated queries over large ledgers."))
+
+    parser.add_argument('--cache', action='store_true',
+                        help=("Cache the results of queries in memory, to avoid "
+                              "recomputing identical queries on an unchanged ledger."))
+
+    parser.add_argument('--cache-filename', action='store',
+                        help=("Persist the cache of query results to this file. "
+                              "This implies --cache."))
+
     parser.add_argument('filename', metavar='FILENAME.beancount',
                         help='The Beancount input filename to load')
 
@@ -805,9 +958,18 @@ def main():
     # Create a receiver for output.
     outfile = sys.stdout if args.output is None else open(args.output, 'w')
 
+    # Create a cache for the results of queries, if requested.
+    cache = (query_cache.QueryCache(filename=args.cache_filename)
+             if args.cache or args.cache_filename
+             else None)
+
     # Create the shell.
     is_interactive = sys.stdin.isatty() and not args.query
-    shell_obj = BQLShell(is_interactive, load, outfile, args.format, args.numberify)
+    shell_obj = BQLShell(is_interactive, load, outfile, args.format, args.numberify,
+                         cache=cache)
+    shell_obj.vars['stream'] = args.stream
+    shell_obj.vars['workers'] = args.workers
+    shell_obj.vars['sortbuffer'] = args.sort_buffer
     shell_obj.on_Reload()
 
     # Run interactively if we're a TTY and no query is supplied.
@@ -828,6 +990,9 @@ def main():
 
         shell_obj.onecmd(query)
 
+    if cache is not None:
+        cache.close()
+
     return 0
 
 
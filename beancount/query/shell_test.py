@@ -5,6 +5,7 @@ import re
 import sys
 import unittest
 from os import path
+from unittest import mock
 
 from beancount.utils import test_utils
 from beancount.query import shell
@@ -158,6 +159,30 @@ class TestUseCases(unittest.TestCase):
 
 class TestRun(unittest.TestCase):
 
+    @runshell
+    def test_explain_analyze(self, output):
+        """
+        EXPLAIN ANALYZE
+        SELECT year(date) AS year, sum(cost(position)) AS balance
+        FROM OPEN ON 2014-01-01
+        WHERE account ~ 'Expenses'
+        GROUP BY year;
+        """
+        self.assertRegex(output, 'Compiled query:')
+        for stage in 'open', 'where', 'aggregate', 'finalize', 'render':
+            self.assertRegex(output, r'\n  {} +[0-9.]+'.format(stage))
+        self.assertRegex(output, r'\n  CostPosition +[0-9]+ +[0-9.]+ +[0-9.]+')
+
+    @runshell
+    def test_explain_analyze_print(self, output):
+        """
+        EXPLAIN ANALYZE PRINT FROM year = 2014;
+        """
+        self.assertRegex(output, 'Compiled query:')
+        self.assertNotRegex(output, 'Targets:')
+        self.assertEqual('ERROR: Can only analyze SELECT-like statements.',
+                         output.strip().splitlines()[-1])
+
     @runshell
     def test_run_custom__list(self, output):
         """
@@ -226,6 +251,62 @@ class TestShell(test_utils.TestCase):
             test_utils.run_with_args(shell.main, [filename, "SELECT 1;"])
         self.assertTrue(stdout.getvalue())
 
+    def test_statement_cache(self):
+        def loadfun():
+            return entries, errors, options_map
+        with test_utils.capture('stdout') as stdout:
+            shell_obj = shell.BQLShell(False, loadfun, sys.stdout)
+            shell_obj.on_Reload()
+            with mock.patch.object(shell_obj.parser, 'parse',
+                                   wraps=shell_obj.parser.parse) as parse, \
+                 mock.patch.object(shell.query_compile, 'compile',
+                                   wraps=shell.query_compile.compile) as compile_:
+                for _ in range(3):
+                    shell_obj.onecmd("SELECT count(position) WHERE account ~ 'Cash';")
+                shell_obj.onecmd("select count(position) where account ~ 'Cash'")
+            self.assertEqual(2, parse.call_count)
+            self.assertEqual(1, compile_.call_count)
+        self.assertEqual(4, len(re.findall(r'\b\d+\b\s*$', stdout.getvalue(), re.M)))
+
+    @test_utils.docfile
+    def test_stream(self, filename):
+        """
+        2013-01-01 open Assets:Account1
+        2013-01-01 open Equity:Unknown
+
+        2013-04-05 *
+          Equity:Unknown
+          Assets:Account1     5000 USD
+        """
+        for args in [[], ['--stream']]:
+            with test_utils.capture('stdout', 'stderr') as (stdout, _):
+                test_utils.run_with_args(shell.main, args + [
+                    '--format=csv', filename, "SELECT account, position;"])
+            self.assertRegex(stdout.getvalue(), 'Assets:Account1 *, *5000 USD')
+
+            with test_utils.capture('stdout', 'stderr') as (stdout, _):
+                test_utils.run_with_args(shell.main, args + [
+                    filename, "SELECT account WHERE account ~ 'Nothing';"])
+            self.assertEqual('(empty)', stdout.getvalue().strip())
+
+    @test_utils.docfile
+    def test_stream_ordered(self, filename):
+        """
+        2013-01-01 open Assets:Account1
+        2013-01-01 open Equity:Unknown
+
+        2013-04-05 *
+          Equity:Unknown
+          Assets:Account1     5000 USD
+        """
+        for args in [[], ['--stream'], ['--stream', '--sort-buffer=1']]:
+            with test_utils.capture('stdout', 'stderr') as (stdout, _):
+                test_utils.run_with_args(shell.main, args + [
+                    '--format=csv', filename,
+                    "SELECT account, position ORDER BY account DESC;"])
+            self.assertRegex(stdout.getvalue(),
+                             '(?s)Equity:Unknown.*Assets:Account1 *, *5000 USD')
+
 
 __incomplete__ = True
 
@@ -17,6 +17,7 @@ from beancount.parser import options
 from beancount.core import realization
 from beancount.core import prices
 from beancount.core import display_context
+from beancount.utils import memo
 from beancount.utils import version
 
 
@@ -174,6 +175,55 @@ class TableReport(HTMLReport):
         table.render_table(table_, file, 'csv')
 
 
+# Caches of the price maps and realizations of the most recently rendered lists
+# of entries, shared by the reports rendered from the same ledger.
+_PRICE_MAPS = memo.ledger_cache(4)
+_REALIZATIONS = memo.ledger_cache(4)
+
+
+def get_price_map(entries):
+    """Get the price map of a list of entries, building it if needed.
+
+    The price map is cached for the lifetime of the list object, like its
+    posting index (see realization.get_posting_index()). It must not be
+    modified.
+
+    Args:
+      entries: A sorted list of directives.
+    Returns:
+      A price map, as per prices.build_price_map().
+    """
+    key = id(entries)
+    cached = _PRICE_MAPS.get(key)
+    if cached is None or cached[0] is not entries or cached[1] != len(entries):
+        cached = (entries, len(entries), prices.build_price_map(entries))
+        _PRICE_MAPS.put(key, cached)
+    return cached[2]
+
+
+def get_realization(entries, options_map):
+    """Get the realization of a list of entries, computing it if needed.
+
+    The realization is cached for the lifetime of the list object. It must not
+    be modified.
+
+    Args:
+      entries: A sorted list of directives.
+      options_map: A dict of options, as produced by the parser.
+    Returns:
+      The root RealAccount instance of the realization of all the postings.
+    """
+    account_types = options.get_account_types(options_map)
+    key = (id(entries), account_types)
+    cached = _REALIZATIONS.get(key)
+    if cached is None or cached[0] is not entries or cached[1] != len(entries):
+        real_root = realization.realize_postings(
+            realization.get_posting_index(entries).by_account(), account_types)
+        cached = (entries, len(entries), real_root)
+        _REALIZATIONS.put(key, cached)
+    return cached[2]
+
+
 class RealizationMeta(type):
     """A metaclass for reports that render a realization.
 
@@ -216,9 +266,8 @@ class RealizationMeta(type):
 
             # Define a render_*() method on the class.
             def forward_method(self, entries, errors, options_map, file, fwdfunc=value):
-                account_types = options.get_account_types(options_map)
-                real_root = realization.realize(entries, account_types)
-                price_map = prices.build_price_map(entries)
+                real_root = get_realization(entries, options_map)
+                price_map = get_price_map(entries)
                 # Note: When we forward, use the latest date (None).
                 return fwdfunc(self, real_root, price_map, None, options_map, file)
             forward_method.__name__ = render_function_name
@@ -172,6 +172,29 @@ class TestRealizationMeta(unittest.TestCase):
 
 class TestReportFunctions(unittest.TestCase):
 
+    @loader.load_doc()
+    def test_get_price_map_and_realization(self, entries, _, options_map):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 CAD @ 0.8 USD
+          Assets:Checking
+
+        2014-02-02 price CAD  0.81 USD
+        """
+        price_map = base.get_price_map(entries)
+        self.assertIn(('CAD', 'USD'), price_map)
+        self.assertIs(price_map, base.get_price_map(entries))
+        self.assertIsNot(price_map, base.get_price_map(list(entries)))
+
+        real_root = base.get_realization(entries, options_map)
+        self.assertEqual(2, len(list(realization.iter_children(
+            realization.get(real_root, 'Assets')))))
+        self.assertIs(real_root, base.get_realization(entries, options_map))
+        self.assertIsNot(real_root, base.get_realization(entries[:-1], options_map))
+
     def test_get_html_template(self):
         template = base.get_html_template()
         self.assertTrue(template)
@@ -4,6 +4,8 @@ particular entry is applied.
 __copyright__ = "Copyright (C) 2014-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import collections
+import copy
 import io
 
 from beancount.core import compare
@@ -37,7 +39,40 @@ def render_file_context(entries, options_map, filename, lineno):
     return render_entry_context(entries, options_map, closest_entry)
 
 
-def render_entry_context(entries, options_map, entry):
+def compute_entry_context(posting_index, context_entry):
+    """Compute the balances of all accounts referenced by entry up to entry.
+
+    This is equivalent to interpolate.compute_entry_context(), but starts from
+    the cumulative balances of a posting index instead of replaying all the
+    entries which precede the entry.
+
+    Args:
+      posting_index: An instance of realization.PostingIndex.
+      context_entry: The entry for which we want to obtain the before and after
+        context. It should be in the indexed entries.
+    Returns:
+      Two dicts of account-name to Inventory instance, one which represents the
+      context before the entry is applied, and one that represents the context
+      after it has been applied.
+    """
+    context_before = collections.defaultdict(inventory.Inventory)
+    for account in getters.get_entry_accounts(context_entry):
+        balance = posting_index.balance_before(account, context_entry)
+        if balance is None:
+            # The entry is not indexed under this account; replay the entries.
+            return interpolate.compute_entry_context(posting_index.entries,
+                                                     context_entry)
+        context_before[account] = balance
+
+    context_after = copy.deepcopy(context_before)
+    if isinstance(context_entry, data.Transaction):
+        for posting in context_entry.postings:
+            context_after[posting.account].add_position(posting)
+
+    return context_before, context_after
+
+
+def render_entry_context(entries, options_map, entry, posting_index=None):
     """Render the context before and after a particular transaction is applied.
 
     Args:
@@ -45,6 +80,9 @@ def render_entry_context(entries, options_map, entry):
       options_map: A dict of options, as produced by the parser.
       entry: The entry instance which should be rendered. (Note that this object is
         expected to be in the set of entries, not just structurally equal.)
+      posting_index: An optional instance of realization.PostingIndex of the
+        entries, to compute the balances from. If absent, the balances are
+        computed by replaying the entries.
     Returns:
       A multiline string of text, which consists of the context before the
       transaction is applied, the transaction itself, and the context after it
@@ -67,8 +105,11 @@ def render_entry_context(entries, options_map, entry):
                       key=lambda account: order.get(account, 10000))
 
     # Accumulate the balances of these accounts up to the entry.
-    balance_before, balance_after = interpolate.compute_entry_context(entries,
-                                                                      entry)
+    if posting_index is not None:
+        balance_before, balance_after = compute_entry_context(posting_index, entry)
+    else:
+        balance_before, balance_after = interpolate.compute_entry_context(entries,
+                                                                          entry)
 
     # Create a format line for printing the contents of account balances.
     max_account_width = max(map(len, accounts)) if accounts else 1
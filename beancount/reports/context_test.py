@@ -3,7 +3,11 @@ __license__ = "GNU GPLv2"
 
 import textwrap
 import unittest
+from unittest import mock
 
+from beancount.core import getters
+from beancount.core import interpolate
+from beancount.core import realization
 from beancount.utils import test_utils
 from beancount.reports import context
 from beancount import loader
@@ -97,6 +101,49 @@ class TestContext(test_utils.TestCase):
 
     maxDiff = 8192
 
+    @loader.load_doc()
+    def test_compute_entry_context(self, entries, errors, options_map):
+        """
+        2012-01-01 open Assets:Cash             USD
+        2012-01-01 open Assets:Stock            HOOL
+        2012-01-01 open Expenses:Commissions    USD
+
+        2012-03-01 * "Buy"
+          Assets:Cash                -1009.95 USD
+          Assets:Stock               10 HOOL {100.00 USD}
+          Expenses:Commissions          9.95 USD
+
+        2012-03-01 * "Buy"
+          Assets:Cash                 -509.95 USD
+          Assets:Stock                5 HOOL {100.00 USD}
+          Expenses:Commissions          9.95 USD
+
+        2012-04-01 balance Assets:Stock   15 HOOL
+
+        2012-05-01 * "Sell"
+          Assets:Stock               -3 HOOL {100.00 USD}
+          Assets:Cash                  290.05 USD
+          Expenses:Commissions          9.95 USD
+
+        2012-06-01 note Assets:Cash "Some note"
+        """
+        self.assertFalse(errors)
+        for interval in (64, 2):
+            with mock.patch.object(realization.PostingIndex, 'BALANCE_INTERVAL', interval):
+                posting_index = realization.PostingIndex(entries)
+                for entry in entries:
+                    expected_before, expected_after = interpolate.compute_entry_context(
+                        entries, entry)
+                    before, after = context.compute_entry_context(posting_index, entry)
+                    for account in getters.get_entry_accounts(entry):
+                        self.assertEqual(expected_before[account], before[account])
+                        self.assertEqual(expected_after[account], after[account])
+
+                    self.assertEqual(
+                        context.render_entry_context(entries, options_map, entry),
+                        context.render_entry_context(entries, options_map, entry,
+                                                     posting_index))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -4,6 +4,7 @@ __copyright__ = "Copyright (C) 2014-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
 import csv
+import datetime
 
 from beancount.core.number import D
 from beancount.core.number import ZERO
@@ -18,6 +19,7 @@ from beancount.ops import holdings
 from beancount.ops import summarize
 from beancount.reports import table
 from beancount.reports import base
+from beancount.utils import date_utils
 
 
 def get_assets_holdings(entries, options_map, currency=None):
@@ -32,14 +34,14 @@ def get_assets_holdings(entries, options_map, currency=None):
       A list of Holding instances and a price-map.
     """
     # Compute a price map, to perform conversions.
-    price_map = prices.build_price_map(entries)
+    price_map = base.get_price_map(entries)
 
-    # Get the list of holdings.
+    # Get the list of holdings, shared with the other reports of the entries.
     account_types = options.get_account_types(options_map)
-    holdings_list = holdings.get_final_holdings(entries,
-                                                (account_types.assets,
-                                                 account_types.liabilities),
-                                                price_map)
+    holdings_list = list(holdings.get_holdings_snapshot(entries,
+                                                        (account_types.assets,
+                                                         account_types.liabilities),
+                                                        price_map))
 
     # Convert holdings to a unified currency.
     if currency:
@@ -359,8 +361,106 @@ class NetWorthReport(base.TableReport):
         return table.create_table(net_worths, field_spec)
 
 
+# The number of months of each of the intervals of a net worth series.
+INTERVAL_MONTHS = {
+    'month': 1,
+    'quarter': 3,
+    'year': 12,
+}
+
+
+def get_interval_end_dates(begin_date, end_date, interval):
+    """Get the last days of the intervals which overlap a range of dates.
+
+    Args:
+      begin_date: A datetime.date instance, the beginning of the range.
+      end_date: A datetime.date instance, the end of the range, inclusive.
+      interval: A string, one of the keys of INTERVAL_MONTHS.
+    Returns:
+      A sorted list of datetime.date instances, the last day of each calendar
+      month, quarter or year from the one of 'begin_date' to the one of
+      'end_date'.
+    """
+    num_months = INTERVAL_MONTHS[interval]
+    dates = []
+    date = datetime.date(begin_date.year, begin_date.month, 1)
+    while not dates or dates[-1] < end_date:
+        date = date_utils.next_month(date)
+        if (date.month - 1) % num_months == 0:
+            dates.append(date - datetime.timedelta(days=1))
+    return dates
+
+
+def get_net_worth(holdings_list, price_map, currency, date=None):
+    """Compute the total market value of a list of holdings in a currency.
+
+    Args:
+      holdings_list: A list of Holding instances.
+      price_map: A price map, to convert the holdings with.
+      currency: A string, the currency to convert to.
+      date: A datetime.date instance, the date of the rates to convert with, or
+        None, to use the latest rates.
+    Returns:
+      A Decimal, the market value, or None if none of the holdings could be
+      converted.
+    """
+    currency_holdings_list = [
+        holding
+        for holding in holdings.convert_to_currency(price_map, currency,
+                                                    holdings_list, date)
+        if holding.cost_currency]
+    if not currency_holdings_list:
+        return None
+    return holdings.aggregate_holdings_list(currency_holdings_list).market_value
+
+
+class NetWorthSeriesReport(base.TableReport):
+    """Generate a table of the net worth at the end of each month, quarter or year."""
+
+    names = ['networth_series']
+
+    @classmethod
+    def add_args(cls, parser):
+        parser.add_argument('-i', '--interval',
+                            action='store', default='month',
+                            choices=INTERVAL_MONTHS.keys(),
+                            help="The period at the end of which to value the holdings")
+
+    def generate_table(self, entries, errors, options_map):
+        currencies = options_map['operating_currency']
+        field_spec = [(0, 'Date', None)] + [
+            (index, currency, '{:,.2f}'.format)
+            for index, currency in enumerate(currencies, 1)]
+        # Cover the range from the first transaction to the last transaction or
+        # price, whichever is later.
+        txn_dates = [entry.date
+                     for entry in entries
+                     if isinstance(entry, data.Transaction)]
+        if not txn_dates:
+            return table.create_table([], field_spec)
+        end_date = max(txn_dates[-1], max((entry.date
+                                           for entry in entries
+                                           if isinstance(entry, data.Price)),
+                                          default=txn_dates[-1]))
+
+        # Sweep the entries once for all the dates, rather than computing the
+        # holdings of the entries truncated at each of them.
+        dates = get_interval_end_dates(txn_dates[0], end_date, self.args.interval)
+        account_types = options.get_account_types(options_map)
+        price_map = base.get_price_map(entries)
+        series = holdings.get_holdings_series(entries, dates,
+                                              (account_types.assets,
+                                               account_types.liabilities),
+                                              price_map)
+        rows = [[date] + [get_net_worth(holdings_list, price_map, currency, date)
+                          for currency in currencies]
+                for date, holdings_list in series]
+        return table.create_table(rows, field_spec)
+
+
 __reports__ = [
     HoldingsReport,
     CashReport,
     NetWorthReport,
+    NetWorthSeriesReport,
 ]
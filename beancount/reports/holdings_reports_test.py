@@ -1,16 +1,18 @@
 __copyright__ = "Copyright (C) 2014-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import datetime
 import unittest
 import io
 
 from beancount.reports import holdings_reports
 from beancount.reports import table
 from beancount.ops import holdings
+from beancount.utils import test_utils
 from beancount import loader
 
 
-class TestHoldingsReports(unittest.TestCase):
+class TestHoldingsReports(test_utils.TestCase):
 
     @loader.load_doc()
     def setUp(self, entries, errors, options_map):
@@ -61,6 +63,67 @@ class TestHoldingsReports(unittest.TestCase):
             output = report_.render(self.entries, self.errors, self.options_map, format_)
             self.assertTrue(output)
 
+    def test_get_interval_end_dates(self):
+        date = datetime.date
+        self.assertEqual([date(2014, 1, 31), date(2014, 2, 28), date(2014, 3, 31)],
+                         holdings_reports.get_interval_end_dates(
+                             date(2014, 1, 15), date(2014, 3, 1), 'month'))
+        self.assertEqual([date(2014, 3, 31), date(2014, 6, 30)],
+                         holdings_reports.get_interval_end_dates(
+                             date(2014, 2, 1), date(2014, 6, 30), 'quarter'))
+        self.assertEqual([date(2013, 12, 31), date(2014, 12, 31)],
+                         holdings_reports.get_interval_end_dates(
+                             date(2013, 12, 31), date(2014, 1, 1), 'year'))
+        self.assertEqual([date(2014, 12, 31)],
+                         holdings_reports.get_interval_end_dates(
+                             date(2014, 12, 1), date(2014, 12, 1), 'month'))
+
+    @loader.load_doc()
+    def test_report_networth_series(self, entries, errors, options_map):
+        """
+        option "operating_currency" "USD"
+        option "operating_currency" "CAD"
+
+        2014-01-01 open Assets:Bank
+        2014-01-01 open Assets:Invest
+        2014-01-01 open Income:Something
+
+        2014-01-15 *
+          Assets:Bank          1000 USD
+          Income:Something
+
+        2014-02-10 *
+          Assets:Invest         10 HOOL {50 USD}
+          Assets:Bank
+
+        2014-02-20 price HOOL  60 USD
+        2014-03-01 price USD   1.10 CAD
+        2014-03-15 price HOOL  70 USD
+        """
+        report_ = holdings_reports.NetWorthSeriesReport.from_args([])
+        self.assertLines("""
+            Date          USD       CAD
+            ----------  --------  --------
+            2014-01-31  1,000.00
+            2014-02-28  1,100.00
+            2014-03-31  1,200.00  1,320.00
+            ----------  --------  --------
+        """, report_.render(entries, errors, options_map, 'text'))
+
+        report_ = holdings_reports.NetWorthSeriesReport.from_args(['--interval=year'])
+        self.assertLines("""
+            Date          USD       CAD
+            ----------  --------  --------
+            2014-12-31  1,200.00  1,320.00
+            ----------  --------  --------
+        """, report_.render(entries, errors, options_map, 'text'))
+
+        self.assertLines("""
+            Date  USD  CAD
+            ----  ---  ---
+            ----  ---  ---
+        """, report_.render(entries[:3], errors, options_map, 'text'))
+
     def test_load_from_csv(self):
         oss = io.StringIO()
         table_ = holdings_reports.report_holdings(
@@ -3,10 +3,13 @@
 __copyright__ = "Copyright (C) 2014-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import bisect
 import collections
+import copy
 from os import path
 
 from beancount.core import data
+from beancount.core import inventory
 from beancount.core import position
 from beancount.core import convert
 from beancount.core import realization
@@ -42,7 +45,70 @@ Row = collections.namedtuple('Row',
                              'description links amount_str balance_str')
 
 
-def iterate_html_postings(txn_postings, formatter):
+# A page of the rows of a journal.
+#
+# Attributes:
+#   begin: An integer, the index of the first posting of the page in the list of
+#     postings of the journal.
+#   end: An integer, the index after the last posting of the page.
+#   balance: An Inventory, the balance before the first posting of the page.
+#     This should not be modified.
+#
+JournalPage = collections.namedtuple('JournalPage', 'begin end balance')
+
+
+def paginate_postings(txn_postings, page_size):
+    """Split a list of postings into pages of rows, the newest first.
+
+    Each page holds 'page_size' rows, but for the oldest one, unless the rows
+    of a date must be extended across the boundary: the rows of a date are
+    never split, because they may share the postings of the same entry. The
+    balance before each page is computed in a single pass over the postings,
+    so that any page can be rendered without going through the previous ones.
+
+    Args:
+      txn_postings: A sorted list of TxnPosting or directive instances.
+      page_size: An integer, the number of rows of a page.
+    Returns:
+      A list of JournalPage instances, the newest first. There is always at
+      least one page, possibly empty.
+    """
+    assert page_size > 0, "Invalid page size: {}".format(page_size)
+    get_entry = data.get_entry
+    row_begins = [index
+                  for index, txn_posting in enumerate(txn_postings)
+                  if index == 0 or get_entry(txn_posting) is not get_entry(
+                      txn_postings[index - 1])]
+
+    # Find the first posting of each page, from the newest page.
+    page_begins = []
+    num_rows = len(row_begins)
+    while num_rows > 0:
+        begin = row_begins[max(num_rows - page_size, 0)]
+        date = get_entry(txn_postings[begin]).date
+        while begin > 0 and get_entry(txn_postings[begin - 1]).date == date:
+            begin -= 1
+        page_begins.append(begin)
+        num_rows = bisect.bisect_left(row_begins, begin)
+    if not page_begins:
+        return [JournalPage(0, 0, inventory.Inventory())]
+
+    # Compute the balance before each page.
+    balances = {}
+    balance = inventory.Inventory()
+    begins = set(page_begins)
+    for index, txn_posting in enumerate(txn_postings):
+        if index in begins:
+            balances[index] = copy.copy(balance)
+        if isinstance(txn_posting, data.TxnPosting):
+            balance.add_position(txn_posting.posting)
+
+    page_ends = [len(txn_postings)] + page_begins[:-1]
+    return [JournalPage(begin, end, balances[begin])
+            for begin, end in zip(page_begins, page_ends)]
+
+
+def iterate_html_postings(txn_postings, formatter, balance=None):
     """Iterate through the list of transactions with rendered HTML strings for each cell.
 
     This pre-renders all the data for each row to HTML. This is reused by the entries
@@ -52,10 +118,11 @@ def iterate_html_postings(txn_postings, formatter):
       txn_postings: A list of TxnPosting or directive instances.
       formatter: An instance of HTMLFormatter, to be render accounts,
         inventories, links and docs.
+      balance: An optional Inventory, the balance before the first posting.
     Yields:
       Instances of Row tuples. See above.
     """
-    for entry_line in realization.iterate_with_balance(txn_postings):
+    for entry_line in realization.iterate_with_balance(txn_postings, balance):
         entry, leg_postings, change, entry_balance = entry_line
 
         # Prepare the data to be rendered for this row.
@@ -125,22 +192,9 @@ def iterate_html_postings(txn_postings, formatter):
                   flag, description, links, amount_str, balance_str)
 
 
-def html_entries_table_with_balance(oss, txn_postings, formatter, render_postings=True):
-    """Render a list of entries into an HTML table, with a running balance.
-
-    (This function returns nothing, it write to oss as a side-effect.)
-
-    Args:
-      oss: A file object to write the output to.
-      txn_postings: A list of Posting or directive instances.
-      formatter: An instance of HTMLFormatter, to be render accounts,
-        inventories, links and docs.
-      render_postings: A boolean; if true, render the postings as rows under the
-        main transaction row.
-    """
-    write = lambda data: (oss.write(data), oss.write('\n'))
-
-    write('''
+# The templates of the HTML tables of entries. Tables are rendered to a list of
+# strings, which are joined once at the end, each followed by a newline.
+ENTRIES_TABLE_WITH_BALANCE_HEADER = '''
       <table class="entry-table">
       <thead>
         <tr>
@@ -154,40 +208,19 @@ def html_entries_table_with_balance(oss, txn_postings, formatter, render_posting
          <th class="balance">Balance</th>
         </tr>
       </thead>
-    ''')
+    '''
 
-    for row in iterate_html_postings(txn_postings, formatter):
-        entry = row.entry
-
-        description = row.description
-        if row.links:
-            description += render_links(row.links)
-
-        # Render a row.
-        write('''
-          <tr class="{} {}" title="{}">
+ENTRY_ROW_WITH_BALANCE = '''
+          <tr class="{} {}" title="{}:{}">
             <td class="datecell"><a href="{}">{}</a></td>
             <td class="flag">{}</td>
             <td class="description" colspan="4">{}</td>
             <td class="change num">{}</td>
             <td class="balance num">{}</td>
           </tr>
-        '''.format(row.rowtype, row.extra_class,
-                   '{}:{}'.format(entry.meta["filename"], entry.meta["lineno"]),
-                   formatter.render_context(entry), entry.date,
-                   row.flag, description,
-                   row.amount_str, row.balance_str))
+        '''
 
-        if render_postings and isinstance(entry, data.Transaction):
-            for posting in entry.postings:
-
-                classes = ['Posting']
-                if posting.flag == flags.FLAG_WARNING:
-                    classes.append('warning')
-                if posting in row.leg_postings:
-                    classes.append('leg')
-
-                write('''
+POSTING_ROW_WITH_BALANCE = '''
                   <tr class="{}">
                     <td class="datecell"></td>
                     <td class="flag">{}</td>
@@ -198,14 +231,110 @@ def html_entries_table_with_balance(oss, txn_postings, formatter, render_posting
                     <td class="change num"></td>
                     <td class="balance num"></td>
                   </tr>
-                '''.format(' '.join(classes),
-                           posting.flag or '',
-                           formatter.render_account(posting.account),
-                           position.to_string(posting),
-                           posting.price or '',
-                           convert.get_weight(posting)))
+                '''
+
+ENTRIES_TABLE_HEADER = '''
+      <table class="entry-table">
+      <thead>
+        <tr>
+         <th class="datecell">Date</th>
+         <th class="flag">F</th>
+         <th class="description">Narration/Payee</th>
+         <th class="amount">Amount</th>
+         <th class="cost">Cost</th>
+         <th class="price">Price</th>
+         <th class="balance">Balance</th>
+        </tr>
+      </thead>
+    '''
+
+ENTRY_ROW = '''
+          <tr class="{} {}" title="{}:{}">
+            <td class="datecell"><a href="{}">{}</a></td>
+            <td class="flag">{}</td>
+            <td class="description" colspan="5">{}</td>
+          </tr>
+        '''
+
+POSTING_ROW = '''
+                  <tr class="{}">
+                    <td class="datecell"></td>
+                    <td class="flag">{}</td>
+                    <td class="description">{}</td>
+                    <td class="amount num">{}</td>
+                    <td class="cost num">{}</td>
+                    <td class="price num">{}</td>
+                    <td class="balance num">{}</td>
+                  </tr>
+                '''
+
+
+def get_posting_classes(posting, leg_postings=None):
+    """Get the CSS classes of the row of a posting.
+
+    Args:
+      posting: An instance of Posting.
+      leg_postings: An optional list of the postings of the row of the entry
+        which apply to the rendered account.
+    Returns:
+      A string, the space-separated classes.
+    """
+    classes = 'Posting'
+    if posting.flag == flags.FLAG_WARNING:
+        classes += ' warning'
+    if leg_postings is not None and any(posting is leg_posting
+                                        for leg_posting in leg_postings):
+        classes += ' leg'
+    return classes
 
-    write('</table>')
+
+def html_entries_table_with_balance(oss, txn_postings, formatter, render_postings=True,
+                                    balance=None):
+    """Render a list of entries into an HTML table, with a running balance.
+
+    (This function returns nothing, it write to oss as a side-effect.)
+
+    Args:
+      oss: A file object to write the output to.
+      txn_postings: A list of Posting or directive instances.
+      formatter: An instance of HTMLFormatter, to be render accounts,
+        inventories, links and docs.
+      render_postings: A boolean; if true, render the postings as rows under the
+        main transaction row.
+      balance: An optional Inventory, the balance before the first posting,
+        e.g., to render a page of a longer list. See paginate_postings().
+    """
+    parts = [ENTRIES_TABLE_WITH_BALANCE_HEADER]
+    append = parts.append
+    format_entry_row = ENTRY_ROW_WITH_BALANCE.format
+    format_posting_row = POSTING_ROW_WITH_BALANCE.format
+    render_account = formatter.render_account
+    for row in iterate_html_postings(txn_postings, formatter, balance):
+        entry = row.entry
+
+        description = row.description
+        if row.links:
+            description += render_links(row.links)
+
+        # Render a row.
+        append(format_entry_row(row.rowtype, row.extra_class,
+                                entry.meta["filename"], entry.meta["lineno"],
+                                formatter.render_context(entry), entry.date,
+                                row.flag, description,
+                                row.amount_str, row.balance_str))
+
+        if render_postings and isinstance(entry, data.Transaction):
+            for posting in entry.postings:
+                append(format_posting_row(get_posting_classes(posting, row.leg_postings),
+                                          posting.flag or '',
+                                          render_account(posting.account),
+                                          position.to_string(posting),
+                                          posting.price or '',
+                                          convert.get_weight(posting)))
+
+    append('</table>')
+    append('')
+    oss.write('\n'.join(parts))
 
 
 def html_entries_table(oss, txn_postings, formatter, render_postings=True):
@@ -225,23 +354,11 @@ def html_entries_table(oss, txn_postings, formatter, render_postings=True):
       render_postings: A boolean; if true, render the postings as rows under the
         main transaction row.
     """
-    write = lambda data: (oss.write(data), oss.write('\n'))
-
-    write('''
-      <table class="entry-table">
-      <thead>
-        <tr>
-         <th class="datecell">Date</th>
-         <th class="flag">F</th>
-         <th class="description">Narration/Payee</th>
-         <th class="amount">Amount</th>
-         <th class="cost">Cost</th>
-         <th class="price">Price</th>
-         <th class="balance">Balance</th>
-        </tr>
-      </thead>
-    ''')
-
+    parts = [ENTRIES_TABLE_HEADER]
+    append = parts.append
+    format_entry_row = ENTRY_ROW.format
+    format_posting_row = POSTING_ROW.format
+    render_account = formatter.render_account
     for row in iterate_html_postings(txn_postings, formatter):
         entry = row.entry
 
@@ -250,43 +367,24 @@ def html_entries_table(oss, txn_postings, formatter, render_postings=True):
             description += render_links(row.links)
 
         # Render a row.
-        write('''
-          <tr class="{} {}" title="{}">
-            <td class="datecell"><a href="{}">{}</a></td>
-            <td class="flag">{}</td>
-            <td class="description" colspan="5">{}</td>
-          </tr>
-        '''.format(row.rowtype, row.extra_class,
-                   '{}:{}'.format(entry.meta["filename"], entry.meta["lineno"]),
-                   formatter.render_context(entry), entry.date,
-                   row.flag, description))
+        append(format_entry_row(row.rowtype, row.extra_class,
+                                entry.meta["filename"], entry.meta["lineno"],
+                                formatter.render_context(entry), entry.date,
+                                row.flag, description))
 
         if render_postings and isinstance(entry, data.Transaction):
             for posting in entry.postings:
-
-                classes = ['Posting']
-                if posting.flag == flags.FLAG_WARNING:
-                    classes.append('warning')
-
-                write('''
-                  <tr class="{}">
-                    <td class="datecell"></td>
-                    <td class="flag">{}</td>
-                    <td class="description">{}</td>
-                    <td class="amount num">{}</td>
-                    <td class="cost num">{}</td>
-                    <td class="price num">{}</td>
-                    <td class="balance num">{}</td>
-                  </tr>
-                '''.format(' '.join(classes),
-                           posting.flag or '',
-                           formatter.render_account(posting.account),
-                           posting.units or '',
-                           posting.cost or '',
-                           posting.price or '',
-                           convert.get_weight(posting)))
-
-    write('</table>')
+                append(format_posting_row(get_posting_classes(posting),
+                                          posting.flag or '',
+                                          render_account(posting.account),
+                                          posting.units or '',
+                                          posting.cost or '',
+                                          posting.price or '',
+                                          convert.get_weight(posting)))
+
+    append('</table>')
+    append('')
+    oss.write('\n'.join(parts))
 
 
 def render_links(links):
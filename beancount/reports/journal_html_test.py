@@ -9,6 +9,7 @@ from beancount import loader
 from beancount.core import realization
 from beancount.core import data
 from beancount.core import display_context
+from beancount.core import inventory
 from beancount.reports import html_formatter
 from beancount.reports import journal_html
 
@@ -89,6 +90,42 @@ class TestJournalRender(unittest.TestCase):
         self.assertTrue(all(isinstance(row.amount_str, str) for row in rows))
         self.assertTrue(all(isinstance(row.balance_str, str) for row in rows))
 
+    def test_paginate_postings(self):
+        formatter = html_formatter.HTMLFormatter(display_context.DEFAULT_DISPLAY_CONTEXT)
+        txn_postings = self.real_account.txn_postings
+        all_rows = [(row.entry, row.amount_str, row.balance_str)
+                    for row in journal_html.iterate_html_postings(txn_postings, formatter)]
+        self.assertEqual(11, len(all_rows))
+
+        for page_size in range(1, 13):
+            pages = journal_html.paginate_postings(txn_postings, page_size)
+            self.assertEqual(len(txn_postings), pages[0].end)
+            self.assertEqual(0, pages[-1].begin)
+            rows = []
+            for page, older_page in zip(pages, pages[1:] + [None]):
+                if older_page is not None:
+                    self.assertEqual(page.begin, older_page.end)
+                    # The rows of a date are not split across pages.
+                    self.assertNotEqual(
+                        data.get_entry(txn_postings[page.begin]).date,
+                        data.get_entry(txn_postings[page.begin - 1]).date)
+                page_rows = [(row.entry, row.amount_str, row.balance_str)
+                             for row in journal_html.iterate_html_postings(
+                                 txn_postings[page.begin:page.end], formatter,
+                                 page.balance)]
+                self.assertLessEqual(len(page_rows), page_size + 1)
+                rows[0:0] = page_rows
+            # Rendering the pages produces the rows of the full journal.
+            self.assertEqual(all_rows, rows)
+
+        pages = journal_html.paginate_postings(txn_postings, 4)
+        self.assertEqual(3, len(pages))
+        self.assertEqual(4, len(list(journal_html.iterate_html_postings(
+            txn_postings[pages[0].begin:pages[0].end], formatter))))
+
+        self.assertEqual([(0, 0, inventory.Inventory())],
+                         journal_html.paginate_postings([], 10))
+
     def test_html_entries_table_with_balance(self):
         oss = io.StringIO()
         formatter = html_formatter.HTMLFormatter(display_context.DEFAULT_DISPLAY_CONTEXT)
@@ -107,6 +144,18 @@ class TestJournalRender(unittest.TestCase):
         self.assertTrue(isinstance(html, str))
         self.assertRegex(html, '<table')
 
+    def test_get_posting_classes(self):
+        entry = self.entries[-3]
+        posting = entry.postings[0]
+        self.assertEqual('Posting', journal_html.get_posting_classes(posting))
+        self.assertEqual('Posting leg', journal_html.get_posting_classes(
+            posting, [posting]))
+        # Membership is tested by identity, not equality.
+        self.assertEqual('Posting', journal_html.get_posting_classes(
+            posting, [posting._replace()]))
+        self.assertEqual('Posting warning', journal_html.get_posting_classes(
+            posting._replace(flag='!')))
+
     def test_render_links(self):
         html = journal_html.render_links({'132333b32eab', '6e3ac126f337'})
         self.assertRegex(html, '132333b32eab')
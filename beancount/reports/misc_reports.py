@@ -3,6 +3,7 @@
 __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import collections
 import datetime
 import re
 import io
@@ -19,8 +20,8 @@ from beancount.core import data
 from beancount.core import realization
 from beancount.core import getters
 from beancount.core import account_types
-from beancount.utils import misc_utils
 from beancount.utils import date_utils
+from beancount.utils import memo
 
 
 class NoopReport(base.Report):
@@ -143,6 +144,86 @@ class EventsReport(base.TableReport):
 
 
 
+# Statistics on the directives of a list of entries.
+#
+# Attributes:
+#   num_entries_by_type: A dict of the name of a directive type to the number of
+#     directives of that type, in order of first appearance.
+#   num_postings_by_account: A dict of account name to the number of postings
+#     of transactions to it, in order of first appearance.
+EntriesStatistics = collections.namedtuple('EntriesStatistics',
+                                           'num_entries_by_type num_postings_by_account')
+
+
+# Caches of the statistics and of the last active postings of the most recently
+# rendered lists of entries and realizations. See clear_cache().
+_STATISTICS = memo.ledger_cache(8)
+_LAST_ACTIVE = memo.ledger_cache(8)
+
+
+def clear_cache():
+    """Drop the cached statistics and last active postings.
+
+    These are cached for the lists of entries and realizations of the views
+    of bean-web, which are dropped when their views are evicted.
+    """
+    _STATISTICS.clear()
+    _LAST_ACTIVE.clear()
+
+
+def get_entries_statistics(entries):
+    """Get statistics on a list of entries, computing them if needed.
+
+    The statistics are accumulated in a single pass over the entries and
+    cached for the lifetime of the list object, so that rendering them again
+    for the same ledger or view does not scan the entries again. The list
+    must not be modified afterwards.
+
+    Args:
+      entries: A list of directives.
+    Returns:
+      An instance of EntriesStatistics.
+    """
+    key = id(entries)
+    cached = _STATISTICS.get(key)
+    if cached is None or cached[0] is not entries or cached[1] != len(entries):
+        num_entries_by_type = collections.Counter()
+        num_postings_by_account = collections.Counter()
+        for entry in entries:
+            num_entries_by_type[type(entry).__name__] += 1
+            if isinstance(entry, data.Transaction):
+                for posting in entry.postings:
+                    num_postings_by_account[posting.account] += 1
+        cached = (entries, len(entries),
+                  EntriesStatistics(num_entries_by_type, num_postings_by_account))
+        _STATISTICS.put(key, cached)
+    return cached[2]
+
+
+def get_last_active_postings(real_root):
+    """Get the last active posting of every account of a realization.
+
+    These are computed for all the accounts at once and cached for the
+    lifetime of the realization, which must not be modified afterwards.
+
+    Args:
+      real_root: An instance of RealAccount.
+    Returns:
+      A dict of account name to its last active posting or directive, as per
+      realization.find_last_active_posting(), or None.
+    """
+    key = id(real_root)
+    cached = _LAST_ACTIVE.get(key)
+    if cached is None or cached[0] is not real_root:
+        last_postings = {
+            real_account.account: realization.find_last_active_posting(
+                real_account.txn_postings)
+            for real_account in realization.iter_children(real_root)}
+        cached = (real_root, last_postings)
+        _LAST_ACTIVE.put(key, cached)
+    return cached[1]
+
+
 class ActivityReport(base.HTMLReport,
                      metaclass=base.RealizationMeta):
     """Render the last or recent update activity."""
@@ -160,16 +241,15 @@ class ActivityReport(base.HTMLReport,
     def render_real_text(self, real_root, price_map, price_date, options_map, file):
         rows = []
         account_types = options.get_account_types(options_map)
+        last_postings = get_last_active_postings(real_root)
         for root in (account_types.assets,
                      account_types.liabilities):
             for unused_first_line, unused_cont_line, real_account in realization.dump(
                     realization.get(real_root, root)):
 
-                last_posting = realization.find_last_active_posting(
-                    real_account.txn_postings)
+                last_posting = last_postings.get(real_account.account, None)
 
                 # Don't render updates to accounts that have been closed.
-                # Note: this is O(N), maybe we can store this at realization.
                 if last_posting is None or isinstance(last_posting, data.Close):
                     continue
 
@@ -186,6 +266,7 @@ class ActivityReport(base.HTMLReport,
 
     def render_real_htmldiv(self, real_root, price_map, price_date, options_map, file):
         account_types = options.get_account_types(options_map)
+        last_postings = get_last_active_postings(real_root)
         for root in (account_types.assets,
                      account_types.liabilities):
             oss = io.StringIO()
@@ -196,11 +277,9 @@ class ActivityReport(base.HTMLReport,
             for real_account, cells, row_classes in table:
                 if not isinstance(real_account, realization.RealAccount):
                     continue
-                last_posting = realization.find_last_active_posting(
-                    real_account.txn_postings)
+                last_posting = last_postings.get(real_account.account, None)
 
                 # Don't render updates to accounts that have been closed.
-                # Note: this is O(N), maybe we can store this at realization.
                 if last_posting is None or isinstance(last_posting, data.Close):
                     continue
 
@@ -228,10 +307,7 @@ class StatsDirectivesReport(base.TableReport):
     names = ['stats-types', 'stats-directives', 'stats-entries']
 
     def generate_table(self, entries, _, __):
-        entries_by_type = misc_utils.groupby(lambda entry: type(entry).__name__,
-                                             entries)
-        nb_entries_by_type = {name: len(entries)
-                              for name, entries in entries_by_type.items()}
+        nb_entries_by_type = get_entries_statistics(entries).num_entries_by_type
         rows = sorted(nb_entries_by_type.items(),
                       key=lambda x: x[1], reverse=True)
         rows = [(name, str(count)) for (name, count) in rows]
@@ -248,14 +324,7 @@ class StatsPostingsReport(base.TableReport):
     names = ['stats-postings']
 
     def generate_table(self, entries, _, __):
-        all_postings = [posting
-                        for entry in entries
-                        if isinstance(entry, data.Transaction)
-                        for posting in entry.postings]
-        postings_by_account = misc_utils.groupby(lambda posting: posting.account,
-                                                 all_postings)
-        nb_postings_by_account = {key: len(postings)
-                                  for key, postings in postings_by_account.items()}
+        nb_postings_by_account = get_entries_statistics(entries).num_postings_by_account
         rows = sorted(nb_postings_by_account.items(), key=lambda x: x[1], reverse=True)
         rows = [(name, str(count)) for (name, count) in rows]
         rows.append(('~Total~', str(sum(nb_postings_by_account.values()))))
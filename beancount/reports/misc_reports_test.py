@@ -1,11 +1,15 @@
 __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import datetime
 import io
 import unittest
 
+from beancount.core import data
 from beancount.reports import misc_reports
+from beancount.reports import base
 from beancount.reports import base_test
+from beancount.utils import test_utils
 from beancount.parser import options
 from beancount import loader
 
@@ -35,5 +39,81 @@ class TestMiscReports(unittest.TestCase):
             report_.render_htmldiv(entries, errors, options_map, oss)
 
 
+class TestStatistics(test_utils.TestCase):
+
+    @loader.load_doc()
+    def setUp(self, entries, errors, options_map):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Assets:Savings
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+
+        2014-02-02 * "Dinner"
+          Expenses:Restaurant   40.00 USD
+          Assets:Checking
+
+        2014-03-01 note Assets:Savings "Called the bank"
+        2014-04-01 close Assets:Savings
+        """
+        self.entries = entries
+        self.errors = errors
+        self.options_map = options_map
+
+    def test_get_entries_statistics(self):
+        stats = misc_reports.get_entries_statistics(self.entries)
+        self.assertEqual({'Open': 3, 'Transaction': 2, 'Note': 1, 'Close': 1},
+                         stats.num_entries_by_type)
+        self.assertEqual({'Expenses:Restaurant': 2, 'Assets:Checking': 2},
+                         stats.num_postings_by_account)
+        self.assertIs(stats, misc_reports.get_entries_statistics(self.entries))
+        self.assertEqual({'Open': 3, 'Transaction': 1},
+                         misc_reports.get_entries_statistics(
+                             self.entries[:4]).num_entries_by_type)
+
+    def test_stats_reports(self):
+        report_ = misc_reports.StatsDirectivesReport.from_args([])
+        self.assertLines("""
+            Type         Num Entries
+            -----------  -----------
+            Open                   3
+            Transaction            2
+            Note                   1
+            Close                  1
+            ~Total~                7
+            -----------  -----------
+        """, report_.render(self.entries, self.errors, self.options_map, 'text'))
+
+        report_ = misc_reports.StatsPostingsReport.from_args([])
+        self.assertLines("""
+            Account              Num Postings
+            -------------------  ------------
+            Expenses:Restaurant             2
+            Assets:Checking                 2
+            ~Total~                         4
+            -------------------  ------------
+        """, report_.render(self.entries, self.errors, self.options_map, 'text'))
+
+    def test_get_last_active_postings(self):
+        real_root = base.get_realization(self.entries, self.options_map)
+        last_postings = misc_reports.get_last_active_postings(real_root)
+        self.assertEqual(datetime.date(2014, 2, 2),
+                         data.get_entry(last_postings['Assets:Checking']).date)
+        self.assertIsInstance(last_postings['Assets:Savings'], data.Close)
+        self.assertIsNone(last_postings['Assets'])
+        self.assertIs(last_postings, misc_reports.get_last_active_postings(real_root))
+
+        report_ = misc_reports.ActivityReport.from_args([])
+        self.assertLines("""
+            Account          Last Date
+            ---------------  ----------
+            Assets:Checking  2014-02-02
+            ---------------  ----------
+        """, report_.render(self.entries, self.errors, self.options_map, 'text'))
+
+
 if __name__ == '__main__':
     unittest.main()
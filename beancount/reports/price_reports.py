@@ -24,7 +24,7 @@ class CommoditiesReport(base.TableReport):
     default_format = 'text'
 
     def generate_table(self, entries, errors, options_map):
-        price_map = prices.build_price_map(entries)
+        price_map = base.get_price_map(entries)
         return table.create_table([(base_quote,)
                                    for base_quote in sorted(price_map.forward_pairs)],
                                   [(0, "Base/Quote", self.formatter.render_commodity)])
@@ -80,7 +80,7 @@ class CommodityPricesReport(base.TableReport):
                         self.args.commodity):
             self.parser.error(('Invalid commodity pair "{}"; '
                                'must be in BASE/QUOTE format').format(self.args.commodity))
-        price_map = prices.build_price_map(entries)
+        price_map = base.get_price_map(entries)
         try:
             date_rates = prices.get_all_prices(price_map, self.args.commodity)
         except KeyError:
@@ -149,7 +149,7 @@ class PriceDBReport(base.Report):
 
     def render_beancount(self, entries, errors, options_map, file):
         dcontext = options_map['dcontext']
-        price_map = prices.build_price_map(entries)
+        price_map = base.get_price_map(entries)
         meta = data.new_metadata('<report_prices_db>', 0)
         for base_quote in price_map.forward_pairs:
             price_list = price_map[base_quote]
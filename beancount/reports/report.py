@@ -4,11 +4,14 @@ __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
 import argparse
+import collections
+import concurrent.futures
 import io
 import functools
 import operator
 import logging
 import re
+import shlex
 import sys
 import textwrap
 
@@ -142,6 +145,198 @@ class ListFormatsAction(argparse.Action):
         sys.exit(0)
 
 
+# The output formats of the reports.
+FORMATS = ['text', 'csv', 'html', 'htmldiv', 'xls', 'ofx', 'beancount']
+
+
+def add_report_parsers(parser, **kwargs):
+    """Add a subparser for each of the reports to a parser.
+
+    Args:
+      parser: An instance of argparse.ArgumentParser.
+      kwargs: Keyword arguments for add_subparsers().
+    Returns:
+      The subparsers action.
+    """
+    subparsers = parser.add_subparsers(title='report',
+                                       help='Name/specification of the desired report.',
+                                       **kwargs)
+
+    for report_class in get_all_reports():
+        name, aliases = report_class.names[0], report_class.names[1:]
+
+        oss = io.StringIO()
+        oss.write('  {} (aliases: {}; formats: {})'.format(
+            report_class.__doc__,
+            ','.join(report_class.names),
+            ','.join(report_class.get_supported_formats())))
+
+        report_parser = subparsers.add_parser(name,
+                                              aliases=aliases,
+                                              description=oss.getvalue())
+        report_parser.set_defaults(report_class=report_class)
+        report_class.add_args(report_parser)
+
+        # Each subparser must gather the filter arguments. This is unfortunate,
+        # but it works.
+        report_parser.add_argument(
+            'filters', nargs='*',
+            help='Filter expression(s) to select the subset of transactions.')
+
+    return subparsers
+
+
+class ManifestParser(argparse.ArgumentParser):
+    """A parser for the lines of a manifest, which raises its errors."""
+
+    def error(self, message):
+        raise ValueError(message)
+
+
+# A report to render in a batch.
+#
+# Attributes:
+#   report: An instance of the Report class to render.
+#   format: A string, the output format.
+#   output: A string, the name of the file to write the report to.
+#   lineno: An integer, the line number of the report in the manifest.
+BatchReport = collections.namedtuple('BatchReport', 'report format output lineno')
+
+
+def parse_manifest(lines):
+    """Parse a manifest of reports to render in a batch.
+
+    Each line of a manifest describes a report with the same arguments as
+    bean-report itself, except for the input file, with a mandatory output
+    file, e.g., "-o balsheet.html balsheet". Empty lines and lines starting
+    with '#' are ignored.
+
+    Args:
+      lines: An iterable of strings, the lines of the manifest.
+    Returns:
+      A list of BatchReport instances.
+    Raises:
+      ValueError: If a line is invalid.
+    """
+    parser = ManifestParser(prog='manifest', add_help=False)
+    parser.add_argument('-f', '--format', default=None, choices=FORMATS)
+    parser.add_argument('-o', '--output', action='store', required=True)
+    add_report_parsers(parser, dest='report', required=True)
+
+    batch = []
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            args = parser.parse_args(shlex.split(line))
+            if args.filters:
+                raise ValueError("Filters are not supported: {}".format(args.filters))
+            args.format = args.format or file_utils.guess_file_format(args.output)
+            report_ = args.report_class(args, parser)
+            output_format = args.format or report_.default_format
+            supported_formats = report_.get_supported_formats()
+            if output_format not in supported_formats:
+                raise ValueError("Unsupported format '{}' for {} (available: {})".format(
+                    output_format, report_.names[0], ','.join(supported_formats)))
+        except ValueError as exc:
+            raise ValueError("Line {}: {}".format(lineno, exc))
+        batch.append(BatchReport(report_, output_format, args.output, lineno))
+    return batch
+
+
+# The ledger and the reports of the batch being rendered, as a tuple of
+# (entries, errors, options_map, batch). This is set before starting the worker
+# processes, which inherit it if they are forked.
+_BATCH = None
+
+
+def _init_worker(filename, manifest_lines):
+    """Load the ledger and the manifest in a worker process, unless inherited.
+
+    Args:
+      filename: A string, the name of the Beancount input file.
+      manifest_lines: A list of strings, the lines of the manifest.
+    """
+    global _BATCH  # pylint: disable=global-statement
+    if _BATCH is None:
+        entries, errors, options_map = loader.load_file(filename)
+        _BATCH = (entries, errors, options_map, parse_manifest(manifest_lines))
+
+
+def render_batch_report(index):
+    """Render one of the reports of the batch to its output file.
+
+    Args:
+      index: An integer, the index of the report in the batch.
+    Returns:
+      A string, an error message, or None if the report was rendered.
+    """
+    entries, errors, options_map, batch = _BATCH
+    batch_report = batch[index]
+    with misc_utils.log_time('report.render {}'.format(batch_report.output),
+                             logging.info):
+        try:
+            with open(batch_report.output, 'w') as outfile:
+                batch_report.report.render(entries, errors, options_map,
+                                           batch_report.format, outfile)
+        except (base.ReportError, OSError) as exc:
+            return str(exc)
+        except Exception as exc:  # pylint: disable=broad-except
+            # Let the other reports of the batch be rendered.
+            logging.exception("Error rendering report '%s'", batch_report.output)
+            return "{}: {}".format(type(exc).__name__, exc)
+    return None
+
+
+def render_batch(filename, manifest_lines, entries, errors, options_map,
+                 num_workers=None):
+    """Render a batch of reports from a ledger loaded once.
+
+    The price map and the realization of the ledger are computed once and
+    shared by all the reports, which are rendered by a pool of worker
+    processes.
+
+    Args:
+      filename: A string, the name of the Beancount input file.
+      manifest_lines: A list of strings, the lines of the manifest.
+      entries: A list of directives, loaded from 'filename'.
+      errors: A list of errors that occurred during loading.
+      options_map: A dict of options, as produced by the parser.
+      num_workers: An integer, the number of worker processes, or None, for
+        the number of CPUs. If 1, the reports are rendered in this process.
+    Returns:
+      A list of (BatchReport, error message) pairs, for the reports which
+      could not be rendered.
+    Raises:
+      ValueError: If the manifest is invalid.
+    """
+    global _BATCH  # pylint: disable=global-statement
+    batch = parse_manifest(manifest_lines)
+
+    # Compute the shared structures before starting the workers, so that they
+    # inherit them, where processes are forked.
+    base.get_price_map(entries)
+    base.get_realization(entries, options_map)
+
+    _BATCH = (entries, errors, options_map, batch)
+    try:
+        if num_workers == 1:
+            executor = concurrent.futures.ThreadPoolExecutor(1)
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                num_workers, initializer=_init_worker,
+                initargs=(filename, manifest_lines))
+        with executor:
+            messages = list(executor.map(render_batch_report, range(len(batch))))
+    finally:
+        _BATCH = None
+
+    return [(batch_report, message)
+            for batch_report, message in zip(batch, messages)
+            if message is not None]
+
+
 def main():
     parser = version.ArgumentParser(description=__doc__)
 
@@ -158,8 +353,7 @@ def main():
                         help="Print the full list of supported formats and exit.")
 
     parser.add_argument('-f', '--format', default=None,
-                        choices=['text', 'csv', 'html', 'htmldiv', 'xls', 'ofx',
-                                 'beancount'],
+                        choices=FORMATS,
                         help="Output format.")
 
     parser.add_argument('-o', '--output', action='store',
@@ -173,32 +367,20 @@ def main():
     parser.add_argument('-q', '--no-errors', action='store_true',
                         help='Do not report errors.')
 
-    parser.add_argument('filename', metavar='FILENAME.beancount',
-                        help='The Beancount input filename to load.')
-
-    subparsers = parser.add_subparsers(title='report',
-                                       help='Name/specification of the desired report.')
-
-    for report_class in get_all_reports():
-        name, aliases = report_class.names[0], report_class.names[1:]
+    parser.add_argument('-b', '--batch', metavar='MANIFEST', action='store',
+                        help=("Render the reports listed in a manifest file, "
+                              "loading the input file once. Each line of the "
+                              "manifest holds the arguments of a report, with an "
+                              "output file, e.g., '-o balsheet.html balsheet'."))
 
-        oss = io.StringIO()
-        oss.write('  {} (aliases: {}; formats: {})'.format(
-            report_class.__doc__,
-            ','.join(report_class.names),
-            ','.join(report_class.get_supported_formats())))
+    parser.add_argument('-j', '--jobs', action='store', type=int, default=None,
+                        help=("The number of processes to render the reports of "
+                              "--batch with. Defaults to the number of CPUs."))
 
-        report_parser = subparsers.add_parser(name,
-                                              aliases=aliases,
-                                              description=oss.getvalue())
-        report_parser.set_defaults(report_class=report_class)
-        report_class.add_args(report_parser)
+    parser.add_argument('filename', metavar='FILENAME.beancount',
+                        help='The Beancount input filename to load.')
 
-        # Each subparser must gather the filter arguments. This is unfortunate,
-        # but it works.
-        report_parser.add_argument(
-            'filters', nargs='*',
-            help='Filter expression(s) to select the subset of transactions.')
+    add_report_parsers(parser)
 
     args = parser.parse_args()
 
@@ -213,7 +395,19 @@ def main():
         return
 
     is_check = False
-    if hasattr(args, 'report_class'):
+    if args.batch:
+        if hasattr(args, 'report_class'):
+            parser.error("A report cannot be specified with --batch")
+        with open(args.batch) as infile:
+            manifest_lines = infile.readlines()
+        try:
+            batch = parse_manifest(manifest_lines)
+        except ValueError as exc:
+            parser.error("Invalid manifest {}: {}".format(args.batch, exc))
+        is_check = any(isinstance(batch_report.report, misc_reports.ErrorReport)
+                       for batch_report in batch)
+
+    elif hasattr(args, 'report_class'):
         # Open output file and guess file format.
         outfile = open(args.output, 'w') if args.output else sys.stdout
         args.format = args.format or file_utils.guess_file_format(args.output)
@@ -245,7 +439,16 @@ def main():
                                                         log_errors=errors_file,
                                                         extra_validations=extra_validations)
 
-    if hasattr(args, 'report_class'):
+    if args.batch:
+        with misc_utils.log_time('report.render_batch', logging.info):
+            failures = render_batch(args.filename, manifest_lines,
+                                    entries, errors, options_map, args.jobs)
+        for batch_report, message in failures:
+            sys.stderr.write("Error: {} (line {}): {}\n".format(
+                batch_report.output, batch_report.lineno, message))
+        if failures:
+            sys.exit(1)
+    elif hasattr(args, 'report_class'):
         # Create holdings list.
         with misc_utils.log_time('report.render', logging.info):
             try:
@@ -4,6 +4,7 @@ __license__ = "GNU GPLv2"
 from os import path
 import unittest
 
+from beancount import loader
 from beancount.utils import test_utils
 from beancount.reports import report
 from beancount.reports import base
@@ -163,5 +164,91 @@ class TestScriptPositions(test_utils.TestCase):
         self.assertRegex(output, '</OFX>')
 
 
+class TestBatch(test_utils.TestTempdirMixin, test_utils.TestCase):
+
+    @loader.load_doc()
+    def setUp(self, entries, errors, options_map):
+        """
+        2013-01-01 open Expenses:Restaurant
+        2013-01-01 open Assets:Cash
+
+        2014-03-02 * "Something"
+          Expenses:Restaurant   50.02 USD
+          Assets:Cash
+        """
+        super().setUp()
+        self.entries = entries
+        self.errors = errors
+        self.options_map = options_map
+        self.manifest_lines = [
+            '# Comment.',
+            '-o {}'.format(path.join(self.tempdir, 'balsheet.html')) + ' balsheet',
+            '',
+            '-f text -o {} balances -e Expenses'.format(
+                path.join(self.tempdir, 'balances.out')),
+            '-o {} accounts'.format(path.join(self.tempdir, 'accounts.beancount')),
+        ]
+
+    def test_parse_manifest(self):
+        batch = report.parse_manifest(self.manifest_lines)
+        self.assertEqual([('balsheet', 'html', 2),
+                          ('balances', 'text', 4),
+                          ('accounts', 'beancount', 5)],
+                         [(batch_report.report.names[0],
+                           batch_report.format,
+                           batch_report.lineno)
+                          for batch_report in batch])
+        self.assertEqual('Expenses', batch[1].report.args.filter_expression)
+
+    def test_parse_manifest__invalid(self):
+        for line in ['balsheet',
+                     '-o out.html balsheet Assets',
+                     '-o out.csv balsheet',
+                     '-o out.html nonexistent']:
+            with self.assertRaisesRegex(ValueError, '^Line 2: '):
+                report.parse_manifest(['', line])
+
+    def test_render_batch(self):
+        failures = report.render_batch(None, self.manifest_lines,
+                                       self.entries, self.errors, self.options_map, 1)
+        self.assertEqual([], failures)
+        for batch_report in report.parse_manifest(self.manifest_lines):
+            with open(batch_report.output) as infile:
+                self.assertEqual(
+                    batch_report.report.render(self.entries, self.errors,
+                                               self.options_map, batch_report.format),
+                    infile.read())
+
+    def test_render_batch__failures(self):
+        manifest_lines = ['-o {} accounts'.format(path.join(self.tempdir, 'a', 'b')),
+                          '-o {} accounts'.format(path.join(self.tempdir, 'accounts'))]
+        failures = report.render_batch(None, manifest_lines,
+                                       self.entries, self.errors, self.options_map, 1)
+        self.assertEqual([1], [batch_report.lineno for batch_report, _ in failures])
+        self.assertTrue(path.exists(path.join(self.tempdir, 'accounts')))
+
+    @test_utils.docfile
+    def test_main(self, filename):
+        """
+        2013-01-01 open Expenses:Restaurant
+        2013-01-01 open Assets:Cash
+
+        2014-03-02 * "Something"
+          Expenses:Restaurant   50.02 USD
+          Assets:Cash
+        """
+        manifest_filename = path.join(self.tempdir, 'manifest')
+        with open(manifest_filename, 'w') as outfile:
+            outfile.write('\n'.join(self.manifest_lines))
+        with test_utils.capture():
+            test_utils.run_with_args(report.main, ['--batch', manifest_filename,
+                                                   '--jobs', '2', filename])
+        with open(path.join(self.tempdir, 'accounts.beancount')) as infile:
+            self.assertLines("""
+                Assets:Cash          2013-01-01
+                Expenses:Restaurant  2013-01-01
+            """, infile.read())
+
+
 if __name__ == '__main__':
     unittest.main()
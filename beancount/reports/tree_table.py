@@ -33,6 +33,12 @@ def is_account_active(real_account):
     return False
 
 
+# Templates for the lines of the rows of a tree table.
+ROW_HEADER = '<tr class="{}">'
+NAME_CELL = '<td class="tree-node-name">{}</td>'
+NUM_CELL = '<td class="num">{}</td>'
+
+
 def tree_table(oss, real_account, formatter, header=None, classes=None):
     """Generator to a tree of accounts as an HTML table.
 
@@ -59,7 +65,9 @@ def tree_table(oss, real_account, formatter, header=None, classes=None):
       last line, the 'real_account' object will be a special sentinel value to
       indicate that it is meant to render the totals line: TOTALS_LINE.
     """
-    write = lambda data: (oss.write(data), oss.write('\n'))
+    # Accumulate the lines and write them all at once at the end.
+    parts = []
+    write = parts.append
 
     classes = list(classes) if classes else []
     classes.append('tree-table')
@@ -96,7 +104,7 @@ def tree_table(oss, real_account, formatter, header=None, classes=None):
             continue
 
         # Render the row
-        write('<tr class="{}">'.format(' '.join(row_classes)))
+        write(ROW_HEADER.format(' '.join(row_classes)))
 
         if real_acc is TOTALS_LINE:
             label = '<span class="totals-label"></span>'
@@ -105,15 +113,17 @@ def tree_table(oss, real_account, formatter, header=None, classes=None):
                      if formatter
                      else real_acc.account)
 
-        write('<td class="tree-node-name">{}</td>'.format(label))
+        write(NAME_CELL.format(label))
 
         # Add columns for each value rendered.
         for cell in cells:
-            write('<td class="num">{}</td>'.format(cell))
+            write(NUM_CELL.format(cell))
 
         write('</tr>')
 
     write('</table>')
+    write('')
+    oss.write('\n'.join(parts))
 
 
 def table_of_balances(real_root, price_map, price_date,
@@ -9,21 +9,38 @@ __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
 from os import path
+import collections
+import concurrent.futures
 import functools
+import hashlib
 import importlib
+import json
 import logging
 import os
+import queue
 import re
 import shlex
 import shutil
 import subprocess
+import urllib.parse
 import zipfile
 
+import bottle
 import lxml.html
 
+import beancount
+from beancount.core import account_types
+from beancount.core import compare
+from beancount.core import data
+from beancount.core import getters
+from beancount.core import realization
+from beancount.ops import basicops
+from beancount.reports import context
+from beancount.web import bottle_utils
 from beancount.web import scrape
 from beancount.web import web
 from beancount.utils import file_utils
+from beancount.utils import misc_utils
 from beancount.utils import version
 
 
@@ -79,6 +96,29 @@ def remove_links(html, targets):
             element.set('class', 'removed-link')
 
 
+def rewrite_links(html_links, current_url, targets):
+    """Remove and relativize the links of a document, in a single pass.
+
+    This is equivalent to remove_links() followed by relativize_links(), on a
+    list of the links of the document.
+
+    Args:
+      html_links: A list of the links of an lxml document node, as produced by
+        lxml.html.iterlinks(), before any of them is modified.
+      current_url: A string, the URL of the current page. See relativize_links().
+      targets: A set of string, targets to be removed.
+    """
+    current_dir = path.dirname(current_url)
+    for element, attribute, link, pos in html_links:
+        if link in targets:
+            del element.attrib[attribute]
+            element.tag = 'span'
+            element.set('class', 'removed-link')
+        elif path.isabs(link):
+            relative_link = path.relpath(normalize_filename(link), current_dir)
+            element.set(attribute, relative_link)
+
+
 def save_scraped_document(output_dir, url, response, contents, html_root, skipped_urls):
     """Callback function to process a document being scraped.
 
@@ -97,6 +137,22 @@ def save_scraped_document(output_dir, url, response, contents, html_root, skippe
     if response.status != 200:
         logging.error("Invalid status: %s", response.status)
 
+    save_document(output_dir, url, response.info().get_content_type(), contents,
+                  html_root, skipped_urls)
+
+
+def save_document(output_dir, url, content_type, contents, html_root, skipped_urls):
+    """Convert a document to have relative links and write it out.
+
+    Args:
+      output_dir: A string, the output directory to write.
+      url: A string, the originally requested URL.
+      content_type: A string, the MIME type of the document.
+      contents: Bytes, the content of a response.
+      html_root: An lxml root node for the document, optionally. If this is provided,
+        this avoid you having to reprocess it (for performance reasons).
+      skipped_urls: A set of the links from the file that were skipped.
+    """
     # Ignore directories.
     if url.endswith('/'):
         return
@@ -104,13 +160,24 @@ def save_scraped_document(output_dir, url, response, contents, html_root, skippe
     # Note that we're saving the file under the non-redirected URL, because this
     # will have to be opened using files and there are no redirects that way.
 
-    if response.info().get_content_type() == 'text/html':
+    if content_type == 'text/html':
         if html_root is None:
             html_root = lxml.html.document_fromstring(contents)
         remove_links(html_root, skipped_urls)
         relativize_links(html_root, url)
         contents = lxml.html.tostring(html_root, method="html")
 
+    write_document(output_dir, url, contents)
+
+
+def write_document(output_dir, url, contents):
+    """Write out the contents of a document under the output directory.
+
+    Args:
+      output_dir: A string, the output directory to write.
+      url: A string, the originally requested URL.
+      contents: Bytes, the contents of the document, with relative links.
+    """
     # Compute output filename and write out the relativized contents.
     output_filename = path.join(output_dir,
                                 normalize_filename(url).lstrip('/'))
@@ -132,25 +199,460 @@ def bake_to_directory(webargs, output_dir, render_all_pages=True):
       True on success, False otherwise.
     """
     callback = functools.partial(save_scraped_document, output_dir)
+    ignore_regexp = get_ignore_regexp(render_all_pages)
+    processed_urls, skipped_urls = web.scrape_webapp(webargs, callback, ignore_regexp)
+
 
+def get_ignore_regexp(render_all_pages):
+    """Get the regular expression of the URLs not to bake.
+
+    Args:
+      render_all_pages: If true, fetch the full set of pages, not just the subset that
+        is palatable.
+    Returns:
+      A regular expression string, or None, to bake all the pages.
+    """
     if render_all_pages:
-        ignore_regexps = None
+        return None
+    regexps = [
+        # Skip the context pages, too slow.
+        r'/context/',
+        # Skip the link pages, too slow.
+        r'/link/',
+        # Skip the component pages... too many.
+        r'/view/component/',
+        # Skip served documents.
+        r'/.*/doc/',
+        # Skip monthly pages.
+        r'/view/year/\d\d\d\d/month/',
+    ]
+    return '({})'.format('|'.join(regexps))
+
+
+# The maximum number of redirects to follow to render a page.
+MAX_REDIRECTS = 5
+
+
+def render_page(url):
+    """Render a page of the web application in-process, following redirects.
+
+    Args:
+      url: A string, the path of the page.
+    Returns:
+      A tuple of the integer status code, the MIME type and the bytes of the
+      page.
+    """
+    for _ in range(MAX_REDIRECTS):
+        status, headers, contents = bottle_utils.call_app(web.app, url)
+        headers = dict(headers)
+        if status not in (301, 302, 303, 307):
+            break
+        location = urllib.parse.urlsplit(headers['Location'])
+        url = urllib.parse.urlunsplit(('', '', location.path, location.query, ''))
+    content_type = headers.get('Content-Type', '').split(';')[0].strip()
+    return status, content_type, contents
+
+
+def bake_page(output_dir, ignore_regexp, url, incremental=False, previous=None):
+    """Render a page in-process and write it to the output directory.
+
+    Args:
+      output_dir: A string, the output directory to write.
+      ignore_regexp: A regular expression string, the urls to ignore.
+      url: A string, the path of the page.
+      incremental: A boolean, true to compute the fingerprint of the page.
+      previous: A BakedPage instance, the result of baking the page in a
+        previous run, or None. If its fingerprint is that of the page, the page
+        is not rendered again.
+    Returns:
+      An instance of BakedPage.
+    """
+    fingerprint = None
+    if incremental:
+        fingerprint = get_fingerprints().fingerprint(url)
+        if (previous is not None and
+                previous.fingerprint == fingerprint and
+                (url.endswith('/') or
+                 path.exists(path.join(output_dir, normalize_filename(url).lstrip('/'))))):
+            return previous._replace(rendered=False)
+
+    status, content_type, contents = render_page(url)
+    if status != 200:
+        logging.error("Invalid status for '%s': %s", url, status)
+
+    # Process the links of the document from a single traversal of it, rather
+    # than one to find them, one to remove them and one to relativize them.
+    links = []
+    skipped_urls = set()
+    html_links = None
+    if content_type == 'text/html' and contents:
+        html_root = lxml.html.document_fromstring(contents)
+        html_links = list(lxml.html.iterlinks(html_root))
+        html_dir = path.dirname(url)
+        for _, _, link, _ in html_links:
+            link = scrape.normalize_link(link, html_dir)
+            if link is None:
+                continue
+            if ignore_regexp and re.match(ignore_regexp, link):
+                skipped_urls.add(link)
+            else:
+                links.append(link)
+
+    # Ignore directories.
+    if not url.endswith('/'):
+        if html_links is not None:
+            rewrite_links(html_links, url, skipped_urls)
+            contents = lxml.html.tostring(html_root, method="html")
+        write_document(output_dir, url, contents)
+
+    return BakedPage(fingerprint, links, sorted(skipped_urls), True)
+
+
+def get_page_urls(ignore_regexp):
+    """Enumerate the pages of the loaded ledger from the routes of the web app.
+
+    These are the pages of the global routes without parameters, the pages of
+    the views without parameters, for the view of all the entries and for
+    each year, month, tag and component, and the context and link pages. This
+    is not meant to be exhaustive; the links found in the pages are baked too.
+
+    Args:
+      ignore_regexp: A regular expression string, the urls to ignore.
+    Returns:
+      A list of URL paths.
+    """
+    app = web.app
+    view_pages = [route.rule.lstrip('/')
+                  for route in web.viewapp.routes
+                  if '<' not in route.rule]
+    if app.args.view:
+        urls = ['/']
+        view_prefixes = ['/view/{}/'.format(app.args.view)]
     else:
-        regexps = [
-            # Skip the context pages, too slow.
-            r'/context/',
-            # Skip the link pages, too slow.
-            r'/link/',
-            # Skip the component pages... too many.
-            r'/view/component/',
-            # Skip served documents.
-            r'/.*/doc/',
-            # Skip monthly pages.
-            r'/view/year/\d\d\d\d/month/',
-        ]
-        ignore_regexps = '({})'.format('|'.join(regexps))
-
-    processed_urls, skipped_urls = web.scrape_webapp(webargs, callback, ignore_regexps)
+        urls = [route.rule for route in app.routes if '<' not in route.rule]
+        view_prefixes = [app.router.build('all', path='')]
+        for year in app.active_years:
+            view_prefixes.append(app.router.build('year', year=year, path=''))
+            view_prefixes.extend(
+                app.router.build('month', year=year, month='{:02d}'.format(month),
+                                 path='')
+                for month in range(1, 13))
+        view_prefixes.extend(app.router.build('tag', tag=tag, path='')
+                             for tag in getters.get_all_tags(app.entries))
+        view_prefixes.extend(app.router.build('component', component=component, path='')
+                             for component in getters.get_account_components(app.entries))
+        urls.extend(app.router.build('context', ehash=ehash)
+                    for ehash in app.get_ledger().get_entries_by_hash())
+        urls.extend(app.router.build('link', link=link)
+                    for link in getters.get_all_links(app.entries))
+    for prefix in view_prefixes:
+        urls.extend(prefix + page for page in view_pages)
+
+    return [url
+            for url in misc_utils.uniquify(urls)
+            if not (ignore_regexp and re.match(ignore_regexp, url))]
+
+
+# The result of baking a page.
+#
+# Attributes:
+#   fingerprint: A string, the fingerprint of the page, or None, if not
+#     computed.
+#   links: A list of the links of the page to bake.
+#   skipped_urls: A sorted list of the links of the page that were skipped.
+#   rendered: A boolean, true if the page was rendered and written, false if
+#     it was unchanged since the previous bake.
+BakedPage = collections.namedtuple('BakedPage', 'fingerprint links skipped_urls rendered')
+
+
+class PageFingerprints:
+    """Fingerprints of the data the pages of a ledger are rendered from.
+
+    A page is rendered again by an incremental bake only if its fingerprint
+    changed. The pages of a view are fingerprinted by the hash of the filtered
+    entries of the view, the journal of an account by those of the postings
+    of the account and its sub-accounts, a context page by the hash of its
+    entry and the balances before it, and a link page by those of its linked
+    entries. Other pages are fingerprinted by the hash of the input files.
+    All fingerprints also cover the code and options used for rendering, and
+    whether the ledger has errors, which adds a link to them to every page.
+
+    Attributes:
+      ledger: An instance of web.Ledger.
+      entry_hashes: A dict of id of entry to its hash, as per
+        compare.hash_entry(), for the entries of the ledger.
+      common: A string, the hash of the version, templates, options and
+        presence of errors common to all the pages.
+      prices: A string, the hash of the price entries of the ledger.
+      view_fingerprints: A dict of view id to the fingerprint of the view.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.entry_hashes = {id(entry): ehash
+                             for ehash, entries in ledger.get_entries_by_hash().items()
+                             for entry in entries}
+        args = web.app.args
+        self.common = hash_strings([
+            beancount.__version__, web.STYLE, web.template.source,
+            repr((args.incognito, args.no_source, args.no_colons,
+                  args.view, args.first_month)),
+            repr(sorted((key, repr(sorted(value)
+                                   if isinstance(value, (set, frozenset))
+                                   else value))
+                        for key, value in ledger.options.items()
+                        if key not in ('input_hash', 'dcontext'))),
+            str(ledger.options['dcontext']),
+            # All the pages render a link to the errors if there are any.
+            str(bool(ledger.errors))])
+        self.prices = self.hash_entries(entry
+                                        for entry in ledger.entries
+                                        if isinstance(entry, data.Price))
+        self.view_fingerprints = {}
+
+    def hash_entries(self, entries):
+        """Hash a sequence of entries, including their source locations.
+
+        Args:
+          entries: An iterable of directives.
+        Returns:
+          A string, a hex digest.
+        """
+        md5 = hashlib.md5()
+        for entry in entries:
+            ehash = self.entry_hashes.get(id(entry), None)
+            if ehash is None:
+                # Entries synthesized by views are not in the index.
+                ehash = compare.hash_entry(entry)
+            md5.update('{}:{}:{};'.format(ehash,
+                                          entry.meta.get('filename'),
+                                          entry.meta.get('lineno')).encode('utf8'))
+        return md5.hexdigest()
+
+    def get_view_fingerprint(self, viewid, view):
+        """Get the fingerprint of a view.
+
+        Args:
+          viewid: A string, the view id.
+          view: An instance of views.View.
+        Returns:
+          A string, a hex digest.
+        """
+        fingerprint = self.view_fingerprints.get(viewid, None)
+        if fingerprint is None:
+            fingerprint = self.view_fingerprints[viewid] = hash_strings([
+                view.title, self.prices, self.hash_entries(view.entries)])
+        return fingerprint
+
+    def fingerprint(self, url):
+        """Compute the fingerprint of a page.
+
+        Args:
+          url: A string, the path of the page.
+        Returns:
+          A string, a hex digest.
+        """
+        app = web.app
+        match = re.match(r'/context/([a-fA-F0-9]*)$', url)
+        if match:
+            entries = self.ledger.get_entries_by_hash().get(match.group(1), [])
+            balances = []
+            if len(entries) == 1:
+                before, _ = context.compute_entry_context(
+                    realization.get_posting_index(self.ledger.entries), entries[0])
+                balances = sorted('{}={}'.format(account, balance)
+                                  for account, balance in before.items())
+            return hash_strings([self.common, url, self.hash_entries(entries)] + balances)
+
+        match = re.match(r'/link/(.*)$', url)
+        if match:
+            linked_entries = basicops.filter_link(urllib.parse.unquote(match.group(1)),
+                                                  self.ledger.entries)
+            return hash_strings([self.common, url, self.hash_entries(linked_entries)])
+
+        try:
+            viewid, view = web.get_url_view(url)
+        except bottle.HTTPError:
+            viewid = view = None
+        if view is None:
+            return hash_strings([self.common, url, self.ledger.options['input_hash']])
+
+        view_fingerprint = self.get_view_fingerprint(viewid, view)
+        match = re.match(r'journal/(.+)$', url[len(viewid)+1:])
+        if match and match.group(1) != 'all':
+            # Select the realization rendered by the journal, as in web.journal_().
+            account_name = app.account_xform.parse(urllib.parse.unquote(match.group(1)))
+            real_root = (view.closing_real_accounts
+                         if account_types.is_balance_sheet_account(account_name,
+                                                                   self.ledger.account_types)
+                         else view.real_accounts)
+            real_account = realization.get(real_root, account_name)
+            txn_postings = ([txn_posting
+                             for child in realization.iter_children(real_account)
+                             for txn_posting in child.txn_postings]
+                            if real_account is not None
+                            else [])
+            return hash_strings([self.common, url, view.title, self.prices,
+                                 self.hash_entries(data.get_entry(txn_posting)
+                                                   for txn_posting in txn_postings)])
+        return hash_strings([self.common, url, view_fingerprint])
+
+
+def hash_strings(strings):
+    """Hash a list of strings.
+
+    Args:
+      strings: A list of strings.
+    Returns:
+      A string, a hex digest.
+    """
+    md5 = hashlib.md5()
+    for string in strings:
+        md5.update(string.encode('utf8'))
+        md5.update(b'\0')
+    return md5.hexdigest()
+
+
+# The fingerprints of the pages of the ledger being baked, in this process.
+_fingerprints = None
+
+
+def get_fingerprints():
+    """Get the fingerprints of the pages of the ledger being baked.
+
+    Returns:
+      An instance of PageFingerprints.
+    """
+    global _fingerprints
+    if _fingerprints is None or _fingerprints.ledger is not web.app.ledger:
+        _fingerprints = PageFingerprints(web.app.ledger)
+    return _fingerprints
+
+
+def read_fingerprints(filename):
+    """Read the results of a previous bake.
+
+    Args:
+      filename: A string, the name of the file written by write_fingerprints().
+    Returns:
+      A dict of URL path to BakedPage instance, empty if the file does not exist.
+    """
+    if not path.exists(filename):
+        return {}
+    with open(filename, encoding='utf8') as infile:
+        return {url: BakedPage(fingerprint, links, skipped_urls, False)
+                for url, (fingerprint, links, skipped_urls) in json.load(infile).items()}
+
+
+def write_fingerprints(filename, baked_pages):
+    """Write the results of a bake, for the next incremental one.
+
+    Args:
+      filename: A string, the name of the file to write.
+      baked_pages: A dict of URL path to BakedPage instance.
+    """
+    with open(filename, 'w', encoding='utf8') as outfile:
+        json.dump({url: (page.fingerprint, page.links, page.skipped_urls)
+                   for url, page in sorted(baked_pages.items())}, outfile)
+
+
+def _init_worker(webargs):
+    """Set up the web application in a worker process, unless inherited.
+
+    Args:
+      webargs: An argparse parsed options object with the web app arguments.
+    """
+    if web.app.ledger is None:
+        web.setup_app(webargs)
+        web.app.ledger = web.load_ledger(webargs.filename)
+
+
+def bake_in_process(webargs, output_dir, render_all_pages=True, num_workers=None,
+                    fingerprints_filename=None):
+    """Render a Beancount's web pages in-process and in parallel to a directory.
+
+    Rather than serving the web application and crawling it, the pages are
+    enumerated from its routes and rendered by calling the application
+    directly, by a pool of worker processes which write the files out. The
+    links found in the rendered pages are baked too.
+
+    Args:
+      webargs: An argparse parsed options object with the web app arguments.
+      output_dir: A directory name. We don't check here whether it exists or not.
+      render_all_pages: If true, fetch the full set of pages, not just the subset that
+        is palatable.
+      num_workers: An integer, the number of worker processes, or None, for
+        the number of CPUs. If 1, the pages are rendered in this process.
+      fingerprints_filename: A string, the name of a file of the fingerprints
+        of the pages, or None. If provided, the bake is incremental: only the
+        pages whose fingerprint changed since the bake which wrote the file
+        are rendered again, the files of the pages which disappeared are
+        removed and the file is updated.
+    Returns:
+      A dict of all the processed URLs to BakedPage instances and a set of all
+      the skipped URLs.
+    """
+    ignore_regexp = get_ignore_regexp(render_all_pages)
+    incremental = fingerprints_filename is not None
+    previous_pages = read_fingerprints(fingerprints_filename) if incremental else {}
+    app_installs, view_installs = web.setup_app(webargs)
+    try:
+        web.app.ledger = ledger = web.load_ledger(webargs.filename)
+        urls = get_page_urls(ignore_regexp)
+        if incremental:
+            get_fingerprints()
+
+        # Build the indexes and the largest views before starting the workers,
+        # so that they inherit them, where processes are forked.
+        if not webargs.view:
+            web.app.views.get('/view/all', functools.partial(web.get_all_view, web.app))
+            for year in ledger.active_years:
+                web.app.views.get('/view/year/{:4d}'.format(year),
+                                  functools.partial(web.get_year_view, web.app, year))
+
+        if num_workers == 1:
+            executor = concurrent.futures.ThreadPoolExecutor(1)
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                num_workers, initializer=_init_worker, initargs=(webargs,))
+        done_queue = queue.Queue()
+        def submit(url):
+            future = executor.submit(bake_page, output_dir, ignore_regexp, url,
+                                     incremental, previous_pages.get(url, None))
+            future.add_done_callback(lambda future: done_queue.put((url, future)))
+
+        baked_pages = dict.fromkeys(urls)
+        all_skipped_urls = set()
+        with executor:
+            for url in urls:
+                submit(url)
+            num_pending = len(urls)
+            while num_pending:
+                url, future = done_queue.get()
+                baked_pages[url] = page = future.result()
+                num_pending -= 1
+                all_skipped_urls.update(page.skipped_urls)
+                for link in page.links:
+                    if link not in baked_pages:
+                        baked_pages[link] = None
+                        submit(link)
+                        num_pending += 1
+    finally:
+        web.teardown_app(app_installs, view_installs)
+        web.app.ledger = None
+
+    if incremental:
+        # Remove the files of the pages which have disappeared.
+        for url in previous_pages.keys() - baked_pages.keys():
+            filename = path.join(output_dir, normalize_filename(url).lstrip('/'))
+            if not url.endswith('/') and path.exists(filename):
+                os.remove(filename)
+        write_fingerprints(fingerprints_filename, baked_pages)
+        logging.info("Rendered %d of %d pages",
+                     sum(1 for page in baked_pages.values() if page.rendered),
+                     len(baked_pages))
+
+    return baked_pages, all_skipped_urls
 
 
 def archive(command_template, directory, archive, quiet=False):
@@ -231,7 +733,9 @@ def main():
     parser = version.ArgumentParser(description=__doc__)
 
     web_group = web.add_web_arguments(parser)
-    web_group.set_defaults(port=9475)
+    # Links to the pages of journals are not baked, render them whole. Pages
+    # are rendered once each, don't keep them.
+    web_group.set_defaults(port=9475, journal_page_size=0, page_cache_size=0)
 
     group = parser.add_argument_group("Bake process arguments")
 
@@ -247,6 +751,21 @@ def main():
                        help=("Don't ignore some of the more numerious pages, "
                              "like monthly reports."))
 
+    group.add_argument('--in-process', action='store_true',
+                       help=("Render the pages by calling the web application "
+                             "directly from a pool of processes, instead of "
+                             "serving and crawling it."))
+
+    group.add_argument('-j', '--jobs', action='store', type=int, default=None,
+                       help=("The number of processes to render pages with "
+                             "--in-process. Defaults to the number of CPUs."))
+
+    group.add_argument('--incremental', action='store_true',
+                       help=("Update the output of a previous incremental bake, "
+                             "rendering again only the pages whose data changed. "
+                             "The fingerprints of the pages are kept in a file "
+                             "next to the output directory. Implies --in-process."))
+
     opts = parser.parse_args()
 
     # Figure out the archival method.
@@ -262,19 +781,49 @@ def main():
     # Check pre-conditions on input/output filenames.
     if not path.exists(opts.filename):
         raise SystemExit("ERROR: Missing input file '{}'".format(opts.filename))
-    if path.exists(opts.output):
-        raise SystemExit("ERROR: Output path already exists '{}'".format(opts.output))
-    if path.exists(output_directory):
-        raise SystemExit(
-            "ERROR: Output directory already exists '{}'".format(output_directory))
+    fingerprints_filename = None
+    if opts.incremental:
+        # The output directory and archive of a previous bake are updated.
+        fingerprints_filename = output_directory + '.fingerprints'
+        if not path.exists(fingerprints_filename):
+            if path.exists(output_directory):
+                raise SystemExit(
+                    "ERROR: Output directory exists but was not baked incrementally "
+                    "'{}'".format(output_directory))
+            if path.exists(opts.output):
+                raise SystemExit(
+                    "ERROR: Output path exists but was not baked incrementally "
+                    "'{}'".format(opts.output))
+    else:
+        if path.exists(opts.output):
+            raise SystemExit("ERROR: Output path already exists '{}'".format(opts.output))
+        if path.exists(output_directory):
+            raise SystemExit(
+                "ERROR: Output directory already exists '{}'".format(output_directory))
 
     # Bake to a directory hierarchy of files with local links.
-    bake_to_directory(opts, output_directory, opts.render_all_pages)
+    if opts.in_process or opts.incremental:
+        baked_pages, _ = bake_in_process(opts, output_directory, opts.render_all_pages,
+                                         opts.jobs, fingerprints_filename)
+    else:
+        bake_to_directory(opts, output_directory, opts.render_all_pages)
 
     # Verify the bake output files. This is just a sanity checking step.
     # You can also use "bean-doctor validate_html <file> to run this manually.
     logging.info('Validating HTML output files & links.')
-    files, missing, empty = scrape.validate_local_links_in_dir(output_directory)
+    if opts.incremental:
+        # Only validate the pages which were rendered again.
+        files, missing, empty = [], set(), set()
+        for url, page in sorted(baked_pages.items()):
+            filename = path.join(output_directory, normalize_filename(url).lstrip('/'))
+            if page.rendered and filename.endswith('.html') and path.exists(filename):
+                file_missing, file_empty = scrape.validate_local_links(filename)
+                files.append(filename)
+                missing.update(file_missing)
+                if file_empty:
+                    empty.add(filename)
+    else:
+        files, missing, empty = scrape.validate_local_links_in_dir(output_directory)
     logging.info('Validation: %d files processed', len(files))
     for target in missing:
         logging.error("Validation error: Missing '%s'", target)
@@ -290,8 +839,10 @@ def main():
             raise IOError("Directory to archive '{}' does not exist".format(
                 output_directory))
         if path.exists(archive_filename):
-            raise IOError("Output archive name '{}' already exists".format(
-                archive_filename))
+            if not opts.incremental:
+                raise IOError("Output archive name '{}' already exists".format(
+                    archive_filename))
+            os.remove(archive_filename)
 
         # Dispatch to a particular compressor.
         if isinstance(archival_command, str):
@@ -299,8 +850,10 @@ def main():
         elif callable(archival_command):
             archival_command(output_directory, archive_filename)
 
-        # Delete the output directory.
-        shutil.rmtree(output_directory)
+        # Delete the output directory, unless it is kept to be updated by the
+        # next incremental bake.
+        if not opts.incremental:
+            shutil.rmtree(output_directory)
 
     print("Output in '{}'".format(opts.output))
 
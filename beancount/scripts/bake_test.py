@@ -11,7 +11,9 @@ import lxml.html
 
 from beancount.utils import test_utils
 from beancount.utils import file_utils
+from beancount.utils import version
 from beancount.scripts import bake
+from beancount.web import web
 
 
 class TestBakeFunctions(test_utils.TestCase):
@@ -103,6 +105,16 @@ class TestBakeFunctions(test_utils.TestCase):
         contents = lxml.html.tostring(html, method="html").decode('utf8')
         self.assertLines(self.nolinks_html, contents)
 
+    def test_rewrite_links(self):
+        html = lxml.html.document_fromstring(self.test_html)
+        bake.rewrite_links(list(lxml.html.iterlinks(html)), '/path/to/index',
+                           {'/path/to/other', '/path/to/sub/child'})
+        expected_html = lxml.html.document_fromstring(self.test_html)
+        bake.remove_links(expected_html, {'/path/to/other', '/path/to/sub/child'})
+        bake.relativize_links(expected_html, '/path/to/index')
+        self.assertEqual(lxml.html.tostring(expected_html, method="html"),
+                         lxml.html.tostring(html, method="html"))
+
     def test_save_scraped_document__file(self):
         html = lxml.html.document_fromstring(self.test_html)
         with test_utils.tempdir() as tmp:
@@ -147,6 +159,125 @@ class TestBakeFunctions(test_utils.TestCase):
             self.assertEqual(expected_contents, actual_contents)
 
 
+class TestBakeInProcess(test_utils.TestCase):
+
+    @test_utils.docfile
+    def test_bake_page(self, filename):
+        """
+        2013-01-01 open Expenses:Restaurant
+        2013-01-01 open Assets:Cash
+
+        2014-03-02 * "Some basic transaction"
+          Expenses:Restaurant   50.02 USD
+          Assets:Cash
+        """
+        argparser = version.ArgumentParser()
+        web.add_web_arguments(argparser)
+        webargs = argparser.parse_args([filename])
+        app_installs, view_installs = web.setup_app(webargs)
+        try:
+            web.app.ledger = web.load_ledger(filename)
+            urls = bake.get_page_urls(bake.get_ignore_regexp(True))
+            self.assertIn('/view/all/balsheet', urls)
+            self.assertIn('/view/year/2014/month/03/income', urls)
+            self.assertEqual(3, len([url for url in urls if url.startswith('/context/')]))
+
+            urls = bake.get_page_urls(bake.get_ignore_regexp(False))
+            self.assertIn('/view/year/2014/income', urls)
+            self.assertFalse([url for url in urls
+                              if '/month/' in url or url.startswith('/context/')])
+            with test_utils.tempdir() as tmpdir:
+                page = bake.bake_page(
+                    tmpdir, bake.get_ignore_regexp(False), '/view/all/journal/all')
+                self.assertTrue(path.exists(path.join(tmpdir, 'view/all/journal/all.html')))
+        finally:
+            web.teardown_app(app_installs, view_installs)
+            web.app.ledger = None
+        self.assertTrue(page.rendered)
+        self.assertIsNone(page.fingerprint)
+        self.assertIn('/view/all/balsheet', page.links)
+        self.assertTrue(all(url.startswith('/context/') or url.startswith('/link/')
+                            for url in page.skipped_urls))
+        self.assertTrue(page.skipped_urls)
+
+    def test_bake_incremental(self):
+        ledger = textwrap.dedent("""
+          2013-01-01 open Expenses:Restaurant
+          2013-01-01 open Expenses:Books
+          2013-01-01 open Assets:Cash
+
+          2014-03-02 * "Some basic transaction"
+            Expenses:Restaurant   50.02 USD
+            Assets:Cash
+        """)
+        with test_utils.tempdir() as tmpdir:
+            filename = path.join(tmpdir, 'input.beancount')
+            outdir = path.join(tmpdir, 'output')
+            fingerprints_filename = path.join(tmpdir, 'output.fingerprints')
+            argparser = version.ArgumentParser()
+            web.add_web_arguments(argparser)
+            webargs = argparser.parse_args([filename])
+
+            def bake_incremental():
+                with mock.patch.object(bake, 'render_page',
+                                       side_effect=bake.render_page) as render_page:
+                    baked_pages, _ = bake.bake_in_process(webargs, outdir, True, 1,
+                                                          fingerprints_filename)
+                rendered_urls = {url for url, page in baked_pages.items() if page.rendered}
+                self.assertEqual(len(rendered_urls), render_page.call_count)
+                return baked_pages, rendered_urls
+
+            with open(filename, 'w') as outfile:
+                outfile.write(ledger)
+            baked_pages, rendered_urls = bake_incremental()
+            self.assertEqual(set(baked_pages), rendered_urls)
+            self.assertTrue(path.exists(fingerprints_filename))
+            with open(path.join(outdir, 'view/all/balsheet.html')) as infile:
+                balsheet = infile.read()
+
+            # Nothing changed, nothing is rendered.
+            _, rendered_urls = bake_incremental()
+            self.assertEqual(set(), rendered_urls)
+
+            # Only the pages depending on the new transaction are rendered.
+            with open(filename, 'a') as outfile:
+                outfile.write(textwrap.dedent("""
+                  2014-04-02 * "Another transaction"
+                    Expenses:Books   10.00 USD
+                    Assets:Cash
+                """))
+            new_baked_pages, rendered_urls = bake_incremental()
+            self.assertIn('/view/all/balsheet', rendered_urls)
+            self.assertIn('/view/all/journal/Assets:Cash', rendered_urls)
+            self.assertIn('/view/year/2014/month/04/income', rendered_urls)
+            self.assertNotIn('/view/all/journal/Expenses:Restaurant', rendered_urls)
+            self.assertNotIn('/view/year/2014/month/03/income', rendered_urls)
+            self.assertNotIn('/view/year/2013/balsheet', rendered_urls)
+            self.assertFalse([url for url in rendered_urls
+                              if url.startswith('/context/') and url in baked_pages])
+            self.assertLess(len(rendered_urls), len(new_baked_pages) / 2)
+            with open(path.join(outdir, 'view/all/balsheet.html')) as infile:
+                self.assertNotEqual(balsheet, infile.read())
+
+            # An error renders a link to the errors on all the pages, even if
+            # the entries of their views are unchanged.
+            with open(filename, 'a') as outfile:
+                outfile.write("\n2014-05-01 this-is-not-a-directive\n")
+            _, rendered_urls = bake_incremental()
+            self.assertIn('/view/year/2013/balsheet', rendered_urls)
+            with open(path.join(outdir, 'view/year/2013/balsheet.html')) as infile:
+                self.assertIn('>Errors</a>', infile.read())
+
+            # And removing it again renders them without the link.
+            with open(filename, 'w') as outfile:
+                outfile.write(ledger)
+            _, rendered_urls = bake_incremental()
+            self.assertIn('/view/year/2013/balsheet', rendered_urls)
+            with open(path.join(outdir, 'view/year/2013/balsheet.html')) as infile:
+                self.assertNotIn('>Errors</a>', infile.read())
+
+
+
 class TestScriptBake(test_utils.TestCase):
 
     def get_args(self):
@@ -187,6 +318,17 @@ class TestScriptBake(test_utils.TestCase):
                 open(output, 'w')
                 test_utils.run_with_args(bake.main, self.get_args() + [filename, output])
 
+        # An archive not baked incrementally is not replaced by an incremental bake.
+        with test_utils.tempdir() as tmpdir:
+            output = path.join(tmpdir, 'output.zip')
+            with open(output, 'w') as outfile:
+                outfile.write('archive')
+            with self.assertRaises(SystemExit):
+                test_utils.run_with_args(bake.main, self.get_args() + [
+                    '--incremental', filename, output])
+            with open(output) as infile:
+                self.assertEqual('archive', infile.read())
+
     @test_utils.docfile
     def test_bake_directory(self, filename):
         """
@@ -206,6 +348,39 @@ class TestScriptBake(test_utils.TestCase):
             directories = [root for root, _, _ in os.walk(outdir)]
             self.assertGreater(len(directories), 10)
 
+    @test_utils.docfile
+    def test_bake_in_process(self, filename):
+        """
+        2013-01-01 open Expenses:Restaurant
+        2013-01-01 open Assets:Cash
+
+        2014-03-02 * "Some basic transaction"
+          Expenses:Restaurant   50.02 USD
+          Assets:Cash
+        """
+        with test_utils.tempdir() as tmpdir:
+            outdirs = [path.join(tmpdir, 'output'), path.join(tmpdir, 'output_in_process')]
+            with test_utils.capture('stdout', 'stderr'):
+                test_utils.run_with_args(bake.main,
+                                         self.get_args() + [filename, outdirs[0]])
+                test_utils.run_with_args(bake.main,
+                                         self.get_args() + [filename, outdirs[1],
+                                                            '--in-process', '--jobs=2'])
+            baked_files = []
+            for outdir in outdirs:
+                baked_files.append({path.relpath(path.join(root, filename), outdir)
+                                    for root, _, filenames in os.walk(outdir)
+                                    for filename in filenames})
+            self.assertGreater(len(baked_files[0]), 10)
+            # The favicon isn't linked to, but is enumerated from the routes.
+            self.assertEqual(baked_files[0] | {'favicon.ico'}, baked_files[1])
+
+            filename = 'view/all/balsheet.html'
+            with open(path.join(outdirs[0], filename)) as infile:
+                expected_contents = infile.read()
+            with open(path.join(outdirs[1], filename)) as infile:
+                self.assertEqual(expected_contents, infile.read())
+
 
 class TestScriptArchive(TestScriptBake):
 
@@ -3,12 +3,14 @@
 __copyright__ = "Copyright (C) 2015-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import collections
 import shelve
 import threading
 import hashlib
 import datetime
 import functools
 import io
+import weakref
 
 
 def now():
@@ -57,3 +59,142 @@ def memoize_recent_fileobj(function, cache_filename, expiration=None):
 
         return io.BytesIO(contents) if contents else None
     return memoized
+
+
+class LRUCache:
+    """A bounded, thread-safe mapping which evicts its least recently used items.
+
+    Attributes:
+      maxsize: An integer, the maximum number of items to hold.
+    """
+
+    def __init__(self, maxsize):
+        assert maxsize > 0, "Invalid cache size: {}".format(maxsize)
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self._items = collections.OrderedDict()
+
+    def get(self, key, default=None):
+        """Fetch an item and mark it as the most recently used.
+
+        Args:
+          key: A hashable key.
+          default: The value to return if the key is not present.
+        Returns:
+          The cached value, or 'default'.
+        """
+        with self.lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                return default
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Insert an item, evicting the least recently used one if full.
+
+        Args:
+          key: A hashable key.
+          value: The value to store.
+        """
+        with self.lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove an item from the cache.
+
+        Args:
+          key: A hashable key.
+          default: The value to return if the key is not present.
+        Returns:
+          The removed value, or 'default'.
+        """
+        with self.lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        "Remove all the items from the cache."
+        with self.lock:
+            self._items.clear()
+
+    def keys(self):
+        """Return the list of keys, from least to most recently used.
+
+        Returns:
+          A list of keys.
+        """
+        with self.lock:
+            return list(self._items.keys())
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self._items
+
+    def __len__(self):
+        with self.lock:
+            return len(self._items)
+
+
+# All the caches of values derived from lists of entries. See ledger_cache().
+_LEDGER_CACHES = weakref.WeakSet()
+
+
+def ledger_cache(maxsize):
+    """Create a cache of values derived from the lists of entries of ledgers.
+
+    Such caches keep the lists of entries they are computed from alive. They
+    are all cleared at once by clear_ledger_caches().
+
+    Args:
+      maxsize: An integer, the maximum number of items to hold.
+    Returns:
+      An instance of LRUCache.
+    """
+    cache = LRUCache(maxsize)
+    _LEDGER_CACHES.add(cache)
+    return cache
+
+
+def clear_ledger_caches():
+    """Clear all the caches created by ledger_cache().
+
+    Call this after a ledger has been reloaded, or the views derived from it
+    dropped, so that the caches do not keep their old entries alive.
+    """
+    for cache in list(_LEDGER_CACHES):
+        cache.clear()
+
+
+def call_memoized(cache, objects, key, function):
+    """Call a function, reusing its result while its input objects are unchanged.
+
+    The result is cached under the identities of the input objects and a key.
+    It is reused only if the very same objects are passed in again with the
+    same lengths, which catches lists of entries which have been appended to,
+    but not ones modified in place. The cache is meant to be owned by the code
+    which owns the input objects and never modifies them, nor the results.
+
+    Args:
+      cache: An instance of LRUCache.
+      objects: A tuple of sized objects the result is computed from, e.g., a
+        list of entries and an options map.
+      key: A hashable key for the other inputs of the function.
+      function: A callable of no arguments computing the result.
+    Returns:
+      The result of the function.
+    """
+    cache_key = (tuple(id(obj) for obj in objects), key)
+    lengths = tuple(len(obj) for obj in objects)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        cached_objects, cached_lengths, result = cached
+        if (cached_lengths == lengths and
+                all(cached_obj is obj for cached_obj, obj in zip(cached_objects, objects))):
+            return result
+    result = function()
+    cache.put(cache_key, (objects, lengths, result))
+    return result
@@ -48,5 +48,70 @@ class TestMemoization(unittest.TestCase):
             del mem_function
 
 
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_put(self):
+        cache = memo.LRUCache(2)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, cache.get('a', 0))
+        cache.put('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        self.assertTrue('a' in cache)
+        self.assertEqual(1, len(cache))
+
+    def test_eviction(self):
+        cache = memo.LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        # Touch 'a' so that 'b' becomes the least recently used item.
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(['a', 'c'], cache.keys())
+        self.assertFalse('b' in cache)
+
+    def test_pop_clear(self):
+        cache = memo.LRUCache(4)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.pop('a'))
+        self.assertIsNone(cache.pop('a'))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+
+class TestCallMemoized(unittest.TestCase):
+
+    def test_call_memoized(self):
+        cache = memo.LRUCache(4)
+        function = mock.MagicMock(side_effect=lambda: object())
+        entries, options_map = [1, 2, 3], {}
+        result = memo.call_memoized(cache, (entries, options_map), 'a', function)
+        self.assertIs(result, memo.call_memoized(cache, (entries, options_map), 'a',
+                                                 function))
+        self.assertEqual(1, function.call_count)
+
+        # Other keys, equal objects and modified objects are computed again.
+        self.assertIsNot(result, memo.call_memoized(cache, (entries, options_map), 'b',
+                                                    function))
+        self.assertIsNot(result, memo.call_memoized(cache, (list(entries), options_map),
+                                                    'a', function))
+        entries.append(4)
+        self.assertIsNot(result, memo.call_memoized(cache, (entries, options_map), 'a',
+                                                    function))
+        self.assertEqual(4, function.call_count)
+
+
+class TestLedgerCaches(unittest.TestCase):
+
+    def test_clear_ledger_caches(self):
+        cache = memo.ledger_cache(4)
+        other_cache = memo.LRUCache(4)
+        cache.put('a', 1)
+        other_cache.put('a', 1)
+        memo.clear_ledger_caches()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(1, len(other_cache))
+
+
 if __name__ == '__main__':
     unittest.main()
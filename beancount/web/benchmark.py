@@ -0,0 +1,214 @@
+"""Load test for the web interface.
+
+This serves a ledger in-process, like bean-web does, and measures the number
+of requests per second it sustains for a number of concurrent clients fetching
+a fixed set of pages, e.g., to compare a single-threaded server with a pool of
+threads (--server-threads). Everything runs on the local host.
+
+Example:
+
+  python -m beancount.web.benchmark examples/example.beancount \\
+    --clients 8 --requests 400 --server-threads 0 8
+"""
+__copyright__ = "Copyright (C) 2013-2016  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import collections
+import concurrent.futures
+import socket
+import sys
+import time
+import urllib.request
+
+from beancount.utils import version
+from beancount.web import web
+
+
+# The pages of the view of all entries to fetch.
+ALL_PAGES = [
+    '/view/all/balsheet',
+    '/view/all/income',
+    '/view/all/trial',
+    '/view/all/journal/all',
+    '/view/all/equity/holdings',
+]
+
+# The pages of the view of each year to fetch.
+YEAR_PAGES = [
+    '/view/year/{year}/balsheet',
+    '/view/year/{year}/income',
+    '/view/year/{year}/journal/all',
+]
+
+
+# The result of a load test.
+#
+# Attributes:
+#   num_threads: An integer, the number of threads of the server, or zero.
+#   num_clients: An integer, the number of concurrent clients.
+#   num_requests: An integer, the number of requests issued.
+#   num_errors: An integer, the number of requests which failed.
+#   elapsed: A float, the duration of the test, in seconds.
+#   latencies: A sorted list of floats, the duration of each request, in seconds.
+LoadResult = collections.namedtuple(
+    'LoadResult', 'num_threads num_clients num_requests num_errors elapsed latencies')
+
+
+def get_pages(years):
+    """Get the paths of the pages to fetch.
+
+    Args:
+      years: A list of integers, the years of the ledger.
+    Returns:
+      A list of URL paths.
+    """
+    return ALL_PAGES + [page.format(year=year)
+                        for year in years
+                        for page in YEAR_PAGES]
+
+
+def fetch(url):
+    """Fetch a page.
+
+    Args:
+      url: A string, the URL to fetch.
+    Returns:
+      A float, the time it took, in seconds.
+    Raises:
+      IOError: If the request failed.
+    """
+    time_begin = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - time_begin
+
+
+def run_load(url_format, pages, num_clients, num_requests):
+    """Fetch pages from concurrent clients.
+
+    Args:
+      url_format: A format string for the URL of a path.
+      pages: A list of URL paths, fetched in a round-robin fashion.
+      num_clients: An integer, the number of concurrent clients.
+      num_requests: An integer, the total number of requests to issue.
+    Returns:
+      A tuple of the number of failed requests, the total elapsed time and a
+      sorted list of the durations of the successful requests.
+    """
+    urls = [url_format.format(pages[index % len(pages)])
+            for index in range(num_requests)]
+    num_errors = 0
+    latencies = []
+    time_begin = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(num_clients) as executor:
+        for future in [executor.submit(fetch, url) for url in urls]:
+            try:
+                latencies.append(future.result())
+            except IOError:
+                num_errors += 1
+    elapsed = time.perf_counter() - time_begin
+    return num_errors, elapsed, sorted(latencies)
+
+
+def get_free_port():
+    """Find a port to listen to on the local host.
+
+    Returns:
+      An integer, a port number which was free at the time of the call.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+
+def benchmark(filename, num_clients, num_requests, num_threads, warmup=True):
+    """Serve a ledger and measure the throughput of the server.
+
+    Args:
+      filename: A string, the name of the Beancount input file.
+      num_clients: An integer, the number of concurrent clients.
+      num_requests: An integer, the total number of requests to issue.
+      num_threads: An integer, the number of threads of the server; zero
+        runs the default single-threaded server.
+      warmup: A boolean, true to fetch each page once before the measurement,
+        so that the time to load the ledger and build its views is excluded.
+    Returns:
+      An instance of LoadResult.
+    """
+    argparser = version.ArgumentParser()
+    web.add_web_arguments(argparser)
+    webargs = argparser.parse_args([filename,
+                                    '--quiet',
+                                    '--port', str(get_free_port()),
+                                    '--server-threads', str(num_threads)])
+    url_format = 'http://localhost:{}{{}}'.format(webargs.port)
+
+    thread = web.thread_server_start(webargs)
+    try:
+        # Load the ledger to find the years to fetch pages for.
+        fetch(url_format.format('/'))
+        pages = get_pages(web.app.active_years)
+        if warmup:
+            for page in pages:
+                fetch(url_format.format(page))
+        num_errors, elapsed, latencies = run_load(url_format, pages,
+                                                  num_clients, num_requests)
+    finally:
+        web.thread_server_shutdown(thread)
+    return LoadResult(num_threads, num_clients, num_requests, num_errors,
+                      elapsed, latencies)
+
+
+def render_results(results, file):
+    """Render a table of the results of load tests.
+
+    Args:
+      results: A list of LoadResult instances.
+      file: A file object to write to.
+    """
+    # pylint: disable=invalid-name
+    pr = lambda *args: print(*args, file=file)
+    pr("{:>8} {:>8} {:>9} {:>7} {:>10} {:>9} {:>9}".format(
+        'threads', 'clients', 'requests', 'errors', 'req/sec', 'p50 (ms)', 'p95 (ms)'))
+    for result in results:
+        latencies = result.latencies or [0.]
+        pr("{:>8} {:>8} {:>9} {:>7} {:>10.1f} {:>9.1f} {:>9.1f}".format(
+            result.num_threads,
+            result.num_clients,
+            result.num_requests,
+            result.num_errors,
+            (result.num_requests - result.num_errors) / result.elapsed,
+            latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.95)] * 1000))
+
+
+def main():
+    argparser = version.ArgumentParser(description=__doc__.strip())
+
+    argparser.add_argument('filename',
+                           help="Beancount input filename to serve.")
+
+    argparser.add_argument('--clients', action='store', type=int, default=8,
+                           help="The number of concurrent clients.")
+
+    argparser.add_argument('--requests', action='store', type=int, default=200,
+                           help="The number of requests to issue for each test.")
+
+    argparser.add_argument('--server-threads', action='store', type=int, nargs='+',
+                           default=[0, 8],
+                           help=("The numbers of server threads to test with, "
+                                 "zero for the single-threaded server."))
+
+    argparser.add_argument('--no-warmup', dest='warmup', action='store_false',
+                           help="Include the time to load the ledger and build views.")
+
+    args = argparser.parse_args()
+
+    results = [benchmark(args.filename, args.clients, args.requests, num_threads,
+                         args.warmup)
+               for num_threads in args.server_threads]
+    render_results(results, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+__copyright__ = "Copyright (C) 2013-2016  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import io
+import unittest
+from os import path
+
+from beancount.utils import test_utils
+from beancount.web import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_get_pages(self):
+        pages = benchmark.get_pages([2015, 2016])
+        self.assertEqual(len(benchmark.ALL_PAGES) + 2 * len(benchmark.YEAR_PAGES),
+                         len(pages))
+        self.assertIn('/view/year/2016/balsheet', pages)
+
+    def test_benchmark(self):
+        filename = path.join(test_utils.find_repository_root(__file__),
+                             'examples', 'simple', 'starter.beancount')
+        results = [benchmark.benchmark(filename, 2, 10, num_threads)
+                   for num_threads in (0, 2)]
+        for result in results:
+            self.assertEqual(0, result.num_errors)
+            self.assertEqual(10, len(result.latencies))
+
+        oss = io.StringIO()
+        benchmark.render_results(results, oss)
+        self.assertRegex(oss.getvalue(), 'req/sec')
+        self.assertEqual(3, len(oss.getvalue().splitlines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
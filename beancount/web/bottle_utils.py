@@ -4,8 +4,16 @@ Bottle utilities, mostly helpers to do mounts on top of dynamic routes.
 __copyright__ = "Copyright (C) 2013-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import collections
+import concurrent.futures
+import gzip
+import urllib.parse
+import wsgiref.simple_server
+import wsgiref.util
+
 import bottle
 from bottle import request
+from bottle import response
 
 
 class AttrMapper:
@@ -74,3 +82,223 @@ def internal_redirect(app, path_depth):
         return rs
     finally:
         request.path_shift(-path_depth)
+
+
+class ThreadPoolWSGIServer(wsgiref.simple_server.WSGIServer):
+    """A WSGI server which handles requests concurrently in a pool of threads.
+
+    This is a drop-in replacement for the single-threaded server of the
+    standard library used by Bottle by default. The number of threads is
+    bounded, unlike with socketserver.ThreadingMixIn, so that a burst of
+    requests does not create as many threads. Subclass it with
+    thread_pool_server_class() to set the number of threads.
+    """
+
+    num_threads = 8
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            self.num_threads, thread_name_prefix='wsgi')
+
+    def process_request(self, request, client_address):
+        """See base class. Handle the request in a thread of the pool."""
+        # pylint: disable=redefined-outer-name
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        """Handle a request, in a thread of the pool. This is copied from
+        socketserver.ThreadingMixIn."""
+        # pylint: disable=redefined-outer-name
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def serve_forever(self, *args, **kwargs):
+        """See base class. The requests in progress are completed on shutdown."""
+        try:
+            super().serve_forever(*args, **kwargs)
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def thread_pool_server_class(num_threads):
+    """Create a server class for Bottle's 'wsgiref' server with a pool of threads.
+
+    Args:
+      num_threads: An integer, the number of requests to handle concurrently.
+    Returns:
+      A subclass of ThreadPoolWSGIServer, to be provided as the 'server_class'
+      option of bottle.run().
+    """
+    return type('ThreadPoolWSGIServer', (ThreadPoolWSGIServer,),
+                {'num_threads': num_threads})
+
+
+# The prefixes of the content types of the responses to compress.
+COMPRESSIBLE_TYPES = ('text/', 'application/json')
+
+# The minimum size of a response to compress, in bytes.
+GZIP_MIN_SIZE = 1024
+
+
+# A successful response, which can be served again for the same request.
+#
+# Attributes:
+#   etag: A string, the quoted entity tag of the response.
+#   content_type: A string, the content type of the response, or an empty string.
+#   body: A bytes object, the contents of the response.
+#   gzip_body: A bytes object, the contents compressed with gzip, or None, if
+#     they have not been compressed.
+CachedResponse = collections.namedtuple('CachedResponse',
+                                        'etag content_type body gzip_body')
+
+
+def cache_response(etag, output):
+    """Capture the output of a route callback, to serve it again later.
+
+    Args:
+      etag: A string, the quoted entity tag to serve the response with.
+      output: The value returned by a route callback for the current request.
+    Returns:
+      An instance of CachedResponse, or None, if the output is not a
+      successful response with contents in memory, e.g., a redirect or a file.
+    """
+    if isinstance(output, bottle.HTTPResponse):
+        status_code, content_type, charset = (output.status_code,
+                                              output.content_type, output.charset)
+        body = output.body
+        if isinstance(body, (list, tuple)) and all(isinstance(chunk, bytes)
+                                                   for chunk in body):
+            body = b''.join(body)
+    else:
+        status_code, content_type, charset = (response.status_code,
+                                              response.content_type, response.charset)
+        body = output
+        if isinstance(body, str) and not content_type:
+            # This is what Bottle serves strings with by default.
+            content_type = 'text/html; charset=UTF-8'
+    if status_code != 200:
+        return None
+    if isinstance(body, str):
+        body = body.encode(charset or 'utf8')
+    if not isinstance(body, bytes):
+        return None
+    return CachedResponse(etag, content_type, body, None)
+
+
+def accepts_gzip():
+    """Return true if the client of the current request accepts gzip contents.
+
+    Returns:
+      A boolean.
+    """
+    for coding in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = coding.partition(';')
+        if name.strip().lower() == 'gzip':
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def compress_response(cached):
+    """Compress a response with gzip, if it is worth it.
+
+    Args:
+      cached: An instance of CachedResponse.
+    Returns:
+      An instance of CachedResponse, with 'gzip_body' set if the response is
+      textual and large enough to be compressed.
+    """
+    if (cached.gzip_body is None and
+            len(cached.body) >= GZIP_MIN_SIZE and
+            cached.content_type.startswith(COMPRESSIBLE_TYPES)):
+        cached = cached._replace(gzip_body=gzip.compress(cached.body, mtime=0))
+    return cached
+
+
+def etag_matches(etag):
+    """Return true if the current request is conditional on an entity tag.
+
+    Args:
+      etag: A string, the quoted entity tag of the current version of the
+        requested resource.
+    Returns:
+      A boolean, true if the client has this version and it need not be sent.
+    """
+    if_none_match = request.headers.get('If-None-Match', None)
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, as per RFC 7232.
+    return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag
+                                   for tag in tags)
+
+
+def get_cache_headers(etag):
+    """Get the headers of a response which clients may cache but revalidate.
+
+    Args:
+      etag: A string, the quoted entity tag of the response.
+    Returns:
+      A dict of header names to values.
+    """
+    return {'ETag': etag,
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding'}
+
+
+def serve_cached_response(cached):
+    """Serve a cached response to the current request.
+
+    The compressed contents are served if the client accepts them.
+
+    Args:
+      cached: An instance of CachedResponse.
+    Returns:
+      A bytes object, the body of the response.
+    """
+    for name, value in get_cache_headers(cached.etag).items():
+        response.set_header(name, value)
+    if cached.content_type:
+        response.content_type = cached.content_type
+    if cached.gzip_body is not None and accepts_gzip():
+        response.set_header('Content-Encoding', 'gzip')
+        return cached.gzip_body
+    return cached.body
+
+
+def call_app(app, url, headers=None):
+    """Handle a GET request in-process, without a server.
+
+    Args:
+      app: A WSGI application, e.g., a Bottle instance.
+      url: A string, the path of the request, with an optional query string.
+      headers: An optional dict of the names of request headers to values.
+    Returns:
+      A tuple of the integer status code, a list of (name, value) pairs of
+      response headers and the bytes of the response body.
+    """
+    # pylint: disable=redefined-outer-name
+    parsed_url = urllib.parse.urlsplit(url)
+    environ = {'REQUEST_METHOD': 'GET',
+               # Note: WSGI paths are bytes decoded as latin-1 (PEP 3333).
+               'PATH_INFO': urllib.parse.unquote(parsed_url.path, 'latin-1'),
+               'QUERY_STRING': parsed_url.query}
+    for name, value in (headers or {}).items():
+        environ['HTTP_{}'.format(name.upper().replace('-', '_'))] = value
+    wsgiref.util.setup_testing_defaults(environ)
+
+    response = []
+    def start_response(status, headers, exc_info=None):
+        response[:] = [int(status.split()[0]), headers]
+    body = app(environ, start_response)
+    try:
+        contents = b''.join(body)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    status, headers = response
+    return status, headers, contents
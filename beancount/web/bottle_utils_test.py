@@ -1,7 +1,13 @@
 __copyright__ = "Copyright (C) 2014, 2016-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import gzip
+import threading
 import unittest
+import urllib.request
+import wsgiref.simple_server
+
+import bottle
 
 from beancount.web import bottle_utils
 
@@ -26,5 +32,153 @@ class TestAttrMapper(unittest.TestCase):
         self.assertTrue(self.mapper.build('b'), 'the_b')
 
 
+class TestThreadPoolWSGIServer(unittest.TestCase):
+
+    def test_concurrent_requests(self):
+        # Two requests which can only complete if they are handled concurrently.
+        barrier = threading.Barrier(2, timeout=5)
+        def application(environ, start_response):
+            barrier.wait()
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [environ['PATH_INFO'].encode('utf8')]
+
+        server_class = bottle_utils.thread_pool_server_class(2)
+        self.assertEqual(2, server_class.num_threads)
+        server = server_class(('localhost', 0), QuietHandler)
+        server.set_app(application)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            url = 'http://localhost:{}/{{}}'.format(server.server_port)
+            results = {}
+            def fetch(name):
+                with urllib.request.urlopen(url.format(name)) as response:
+                    results[name] = response.read()
+            clients = [threading.Thread(target=fetch, args=(name,))
+                       for name in ('a', 'b')]
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+        finally:
+            server.shutdown()
+            thread.join()
+            server.server_close()
+        self.assertEqual({'a': b'/a', 'b': b'/b'}, results)
+
+
+class TestCallApp(unittest.TestCase):
+
+    def test_call_app(self):
+        app = bottle.Bottle()
+        @app.route('/hello/<name>')
+        def hello(name):
+            return 'Hello {} {}'.format(name, bottle.request.query.get('punct', ''))
+        @app.route('/')
+        def root():
+            bottle.redirect('/hello/world')
+
+        status, headers, contents = bottle_utils.call_app(app, '/hello/caf%C3%A9?punct=!')
+        self.assertEqual(200, status)
+        self.assertEqual('Hello café !', contents.decode('utf8'))
+        self.assertIn('Content-Type', dict(headers))
+
+        status, headers, _ = bottle_utils.call_app(app, '/')
+        self.assertIn(status, (302, 303))
+        self.assertTrue(dict(headers)['Location'].endswith('/hello/world'))
+
+        status, _, _ = bottle_utils.call_app(app, '/missing')
+        self.assertEqual(404, status)
+
+
+class TestCachedResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app = bottle.Bottle()
+        self.responses = {}
+        def cache(callback):
+            def wrapper(*args, **kwargs):
+                etag = '"{}"'.format(bottle.request.path)
+                if bottle_utils.etag_matches(etag):
+                    return bottle.HTTPResponse(
+                        status=304, headers=bottle_utils.get_cache_headers(etag))
+                output = callback(*args, **kwargs)
+                cached = bottle_utils.cache_response(etag, output)
+                self.responses[bottle.request.path] = cached
+                if cached is None:
+                    return output
+                if bottle_utils.accepts_gzip():
+                    cached = bottle_utils.compress_response(cached)
+                return bottle_utils.serve_cached_response(cached)
+            return wrapper
+        app.install(cache)
+
+        @app.route('/small')
+        def small():
+            return 'Small'
+        @app.route('/large')
+        def large():
+            bottle.response.content_type = 'text/csv'
+            return 'a,b\n' * 1000
+        @app.route('/binary')
+        def binary():
+            bottle.response.content_type = 'image/png'
+            return b'\0' * 2000
+        @app.route('/error')
+        def error():
+            return bottle.HTTPResponse('Not found', status=404)
+        @app.route('/response')
+        def response():
+            return bottle.HTTPResponse([b'Page'], headers={'Content-Type': 'text/plain'})
+
+    def test_cache_response(self):
+        status, headers, contents = bottle_utils.call_app(self.app, '/small')
+        self.assertEqual((200, b'Small'), (status, contents))
+        self.assertEqual(('"/small"', 'text/html; charset=UTF-8', b'Small', None),
+                         self.responses['/small'])
+        self.assertEqual('"/small"', dict(headers)['Etag'])
+
+        status, _, _ = bottle_utils.call_app(self.app, '/error')
+        self.assertEqual(404, status)
+        self.assertIsNone(self.responses['/error'])
+
+        status, headers, contents = bottle_utils.call_app(self.app, '/response')
+        self.assertEqual((200, b'Page'), (status, contents))
+        self.assertEqual('text/plain', dict(headers)['Content-Type'])
+        self.assertEqual(('"/response"', 'text/plain', b'Page', None),
+                         self.responses['/response'])
+
+    def test_gzip(self):
+        for url, gzip_expected in [('/small', False),
+                                   ('/large', True),
+                                   ('/binary', False)]:
+            for accept_encoding, compressed in [('gzip, deflate', gzip_expected),
+                                                ('deflate', False),
+                                                ('gzip;q=0', False)]:
+                _, headers, contents = bottle_utils.call_app(
+                    self.app, url, {'Accept-Encoding': accept_encoding})
+                headers = dict(headers)
+                self.assertEqual(compressed, headers.get('Content-Encoding') == 'gzip')
+                if compressed:
+                    contents = gzip.decompress(contents)
+                self.assertEqual(self.responses[url].body, contents)
+
+    def test_etag_matches(self):
+        for if_none_match, expected_status in [('"/large"', 304),
+                                               ('W/"/large"', 304),
+                                               ('"/small", "/large"', 304),
+                                               ('*', 304),
+                                               ('"/small"', 200)]:
+            status, headers, _ = bottle_utils.call_app(self.app, '/large',
+                                                       {'If-None-Match': if_none_match})
+            self.assertEqual(expected_status, status)
+            self.assertEqual('"/large"', dict(headers)['Etag'])
+
+
+class QuietHandler(wsgiref.simple_server.WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -30,15 +30,29 @@ def iterlinks(html, html_path):
     """
     html_dir = path.dirname(html_path)
     for element, attribute, link, pos in lxml.html.iterlinks(html):
-        url = urllib.parse.urlparse(link)
-        if url.scheme or url.netloc:
-            continue  # Skip external urls.
-        link = url.path
-        if not link:
-            continue
-        if not path.isabs(link):
-            link = path.join(html_dir, link)
-        yield link
+        link = normalize_link(link, html_dir)
+        if link is not None:
+            yield link
+
+
+def normalize_link(link, html_dir):
+    """Convert a link target to an absolute path.
+
+    Args:
+      link: A string, the target of a link.
+      html_dir: A string, the directory of the URL of the document of the link.
+    Returns:
+      A URL path string, or None, if the link is external or empty.
+    """
+    url = urllib.parse.urlparse(link)
+    if url.scheme or url.netloc:
+        return None  # Skip external urls.
+    link = url.path
+    if not link:
+        return None
+    if not path.isabs(link):
+        link = path.join(html_dir, link)
+    return link
 
 
 def scrape_urls(url_format, callback, ignore_regexp=None):
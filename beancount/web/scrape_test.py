@@ -37,6 +37,12 @@ class TestScrapeFunctions(test_utils.TestCase):
                               '/path/to/other.png'],
                              list(scrape.iterlinks(html_root, '/path/to/file')))
 
+    def test_normalize_link(self):
+        self.assertEqual('/path/to/file', scrape.normalize_link('/path/to/file', '/other'))
+        self.assertEqual('/path/to/file', scrape.normalize_link('file?a=1#b', '/path/to'))
+        self.assertIsNone(scrape.normalize_link('http://example.com/file', '/path'))
+        self.assertIsNone(scrape.normalize_link('#anchor', '/path'))
+
 
 Redirect = collections.namedtuple('Redirect', 'target_url')
 
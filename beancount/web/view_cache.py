@@ -0,0 +1,269 @@
+"""A bounded cache of views, which can be precomputed in the background.
+
+Views are expensive to build, because they filter and realize the entries of
+the ledger. The web application keeps the views it has built in this cache,
+bounded both in the number of views and in the total number of directives and
+postings they reference, evicting the least recently used ones. After a
+reload, the views which are the most likely to be requested next can be
+rebuilt by a pool of background threads, before they are requested.
+"""
+__copyright__ = "Copyright (C) 2013-2016  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import collections
+import concurrent.futures
+import logging
+import threading
+
+from beancount.core import realization
+from beancount.reports import misc_reports
+
+
+# The default maximum number of views to keep.
+DEFAULT_MAX_VIEWS = 64
+
+# The default maximum total weight of the views to keep, in number of
+# directives and postings. See get_weight().
+DEFAULT_MAX_WEIGHT = 5000000
+
+# The default number of the most used views to rebuild after a reload, in
+# addition to those explicitly requested.
+DEFAULT_NUM_MOST_USED = 8
+
+# The default number of threads used to build views in the background.
+DEFAULT_NUM_WORKERS = 2
+
+
+def get_weight(view):
+    """Estimate the memory held by a view.
+
+    Args:
+      view: An instance of views.View.
+    Returns:
+      An integer, the number of directives in the lists of entries of the view
+      and of postings in its realizations.
+    """
+    weight = 0
+    for entries in (view.entries, view.opening_entries, view.closing_entries):
+        weight += len(entries or [])
+    for real_root in (view.real_accounts,
+                      view.opening_real_accounts,
+                      view.closing_real_accounts):
+        if real_root is not None:
+            weight += sum(len(real_account.txn_postings)
+                          for real_account in realization.iter_children(real_root))
+    return weight
+
+
+class ViewCache:
+    """A cache of views, bounded in number and in total weight.
+
+    Views are identified by a string, typically the prefix of the URLs that
+    render them, and created by calling a factory function without arguments.
+    The cache remembers how many times each view has been requested and the
+    last factory used to create it, across clears; this is used to select the
+    views to rebuild after a reload.
+
+    Attributes:
+      max_views: An integer, the maximum number of views to keep.
+      max_weight: An integer, the maximum total weight of the views to keep.
+      num_workers: An integer, the number of background threads to build views.
+      views: An OrderedDict of view id to (view, weight) pairs, from the least
+        to the most recently used.
+      weight: An integer, the total weight of the views.
+      pending: A dict of view id to a Future of the view being built.
+      generation: An integer, incremented on every clear. Views built for a
+        previous generation are not inserted.
+      usage: A Counter of view id to the number of requests for it.
+      factories: A dict of view id to the last factory used to create it.
+      lock: A lock protecting all of the above.
+      executor: A ThreadPoolExecutor for background builds, created lazily.
+    """
+
+    def __init__(self,
+                 max_views=DEFAULT_MAX_VIEWS,
+                 max_weight=DEFAULT_MAX_WEIGHT,
+                 num_workers=DEFAULT_NUM_WORKERS):
+        self.max_views = max_views
+        self.max_weight = max_weight
+        self.num_workers = num_workers
+        self.views = collections.OrderedDict()
+        self.weight = 0
+        self.pending = {}
+        self.generation = 0
+        self.usage = collections.Counter()
+        self.factories = {}
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def __len__(self):
+        return len(self.views)
+
+    def __contains__(self, viewid):
+        return viewid in self.views
+
+    def get(self, viewid, factory, is_valid=None):
+        """Fetch a view, creating it if needed.
+
+        If the view is being built in the background, this waits for it rather
+        than building it a second time.
+
+        Args:
+          viewid: A string, the identifier of the view.
+          factory: A function of no arguments which creates the view.
+          is_valid: An optional predicate on a view, false if a cached view
+            cannot be used, e.g., because it was built from another ledger. An
+            invalid view is rebuilt.
+        Returns:
+          An instance of views.View.
+        """
+        with self.lock:
+            self.usage[viewid] += 1
+            self.factories[viewid] = factory
+            cached = self.views.get(viewid, None)
+            if cached is not None:
+                view, weight = cached
+                if is_valid is None or is_valid(view):
+                    self.views.move_to_end(viewid)
+                    return view
+                del self.views[viewid]
+                self.weight -= weight
+            future = self.pending.get(viewid, None)
+            if future is None:
+                future = self._create_future(viewid)
+                build_args = (viewid, factory, future, self.generation)
+            else:
+                build_args = None
+        if build_args is None:
+            view = future.result()
+            if is_valid is None or is_valid(view):
+                return view
+            # Note: This view is not cached, another one is already.
+            return factory()
+        return self._build(*build_args)
+
+    def _create_future(self, viewid):
+        """Register a view as being built. The lock must be held.
+
+        Args:
+          viewid: A string, the identifier of the view.
+        Returns:
+          A new Future instance.
+        """
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        self.pending[viewid] = future
+        return future
+
+    def _build(self, viewid, factory, future, generation):
+        """Build a view, insert it and resolve its future.
+
+        Args:
+          viewid: A string, the identifier of the view.
+          factory: A function of no arguments which creates the view.
+          future: The Future registered for the view.
+          generation: The generation of the cache the view is built for.
+        Returns:
+          The new view.
+        """
+        try:
+            view = factory()
+        except BaseException as exc:
+            with self.lock:
+                if self.pending.get(viewid, None) is future:
+                    del self.pending[viewid]
+            future.set_exception(exc)
+            raise
+        weight = get_weight(view)
+        with self.lock:
+            if self.pending.get(viewid, None) is future:
+                del self.pending[viewid]
+            if generation == self.generation:
+                self._insert(viewid, view, weight)
+        future.set_result(view)
+        return view
+
+    def _insert(self, viewid, view, weight):
+        """Insert a view and evict the least recently used ones as needed.
+        The lock must be held.
+
+        Args:
+          viewid: A string, the identifier of the view.
+          view: An instance of views.View.
+          weight: An integer, the weight of the view.
+        """
+        old = self.views.pop(viewid, None)
+        if old is not None:
+            self.weight -= old[1]
+        self.views[viewid] = (view, weight)
+        self.weight += weight
+        # Always keep the newest view, even if it alone exceeds the budget.
+        evicted = False
+        while (len(self.views) > 1 and
+               (len(self.views) > self.max_views or self.weight > self.max_weight)):
+            evicted_viewid, (_, evicted_weight) = self.views.popitem(last=False)
+            self.weight -= evicted_weight
+            evicted = True
+            logging.info("Evicted view '%s' (weight %d)", evicted_viewid, evicted_weight)
+
+        # Do not let the reports keep the entries of the evicted views alive.
+        if evicted:
+            misc_reports.clear_cache()
+
+    def clear(self):
+        """Remove all the views, e.g., after the ledger has been reloaded.
+
+        The usage counts and factories are preserved. Views being built are
+        not inserted once they complete.
+        """
+        with self.lock:
+            self.views.clear()
+            self.weight = 0
+            self.pending.clear()
+            self.generation += 1
+
+    def prebuild(self, factories, num_most_used=DEFAULT_NUM_MOST_USED):
+        """Build views in background threads.
+
+        Args:
+          factories: A list of (view id, factory) pairs of views to build, in
+            order of priority.
+          num_most_used: An integer, the number of the most requested views to
+            build in addition to 'factories'.
+        Returns:
+          A list of the Future instances of the views scheduled to be built.
+        """
+        futures = []
+        with self.lock:
+            factories = list(factories) + [(viewid, self.factories[viewid])
+                                           for viewid, _ in self.usage.most_common(
+                                               num_most_used)]
+            if self.executor is None:
+                self.executor = concurrent.futures.ThreadPoolExecutor(
+                    self.num_workers, thread_name_prefix='view-cache')
+            for viewid, factory in factories:
+                if viewid in self.views or viewid in self.pending:
+                    continue
+                future = self._create_future(viewid)
+                self.executor.submit(self._build_quietly,
+                                     viewid, factory, future, self.generation)
+                futures.append(future)
+        return futures
+
+    def _build_quietly(self, viewid, factory, future, generation):
+        """Build a view in the background. Errors are logged and left to be
+        raised again when the view is requested.
+
+        Args:
+          See _build().
+        """
+        try:
+            self._build(viewid, factory, future, generation)
+        except Exception:  # pylint: disable=broad-except
+            logging.exception("Error building view '%s' in the background", viewid)
+
+    def close(self):
+        "Stop the background threads, waiting for the views being built."
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
@@ -0,0 +1,166 @@
+__copyright__ = "Copyright (C) 2013-2016  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import threading
+import unittest
+from unittest import mock
+
+from beancount import loader
+from beancount.reports import misc_reports
+from beancount.web import view_cache
+from beancount.web import views
+
+
+class TestViewCache(unittest.TestCase):
+
+    @loader.load_doc()
+    def setUp(self, entries, _, options_map):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+
+        2015-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+        """
+        self.entries = entries
+        self.options_map = options_map
+
+    def factory(self, title='All'):
+        return mock.Mock(wraps=lambda: views.AllView(self.entries, self.options_map, title))
+
+    def test_get_weight(self):
+        view = views.AllView(self.entries, self.options_map, 'All')
+        # 4 entries, and 5 with the transfer of the expenses to equity; 6
+        # opens and postings realized, and 8 with the transfer.
+        self.assertEqual(4 + 5 + 6 + 8, view_cache.get_weight(view))
+        view = views.EmptyView(self.entries, self.options_map, 'Empty')
+        self.assertEqual(0, view_cache.get_weight(view))
+
+    def test_get(self):
+        cache = view_cache.ViewCache()
+        factory = self.factory()
+        view = cache.get('/view/all', factory)
+        self.assertIsInstance(view, views.AllView)
+        self.assertIs(view, cache.get('/view/all', factory))
+        self.assertEqual(1, factory.call_count)
+        self.assertEqual(2, cache.usage['/view/all'])
+        self.assertEqual(view_cache.get_weight(view), cache.weight)
+
+    def test_get_invalid(self):
+        cache = view_cache.ViewCache()
+        factory = self.factory()
+        view = cache.get('/view/all', factory)
+        self.assertIs(view, cache.get('/view/all', factory, lambda view: True))
+        new_view = cache.get('/view/all', factory, lambda cached: cached is not view)
+        self.assertIsNot(view, new_view)
+        self.assertEqual(2, factory.call_count)
+        self.assertIs(new_view, cache.get('/view/all', factory))
+        self.assertEqual(view_cache.get_weight(new_view), cache.weight)
+
+    def test_error(self):
+        cache = view_cache.ViewCache()
+        factory = mock.Mock(side_effect=ValueError)
+        with self.assertRaises(ValueError):
+            cache.get('/view/all', factory)
+        self.assertNotIn('/view/all', cache)
+        self.assertFalse(cache.pending)
+
+    def test_evict_by_number(self):
+        cache = view_cache.ViewCache(max_views=2)
+        for viewid in 'abc':
+            cache.get(viewid, self.factory())
+        self.assertEqual(['b', 'c'], list(cache.views))
+        cache.get('b', self.factory())
+        cache.get('d', self.factory())
+        self.assertEqual(['b', 'd'], list(cache.views))
+
+    def test_evict_clears_reports(self):
+        cache = view_cache.ViewCache(max_views=1)
+        view = cache.get('a', self.factory())
+        misc_reports.get_entries_statistics(view.entries)
+        misc_reports.get_last_active_postings(view.real_accounts)
+        cache.get('b', self.factory())
+        self.assertEqual(0, len(misc_reports._STATISTICS))
+        self.assertEqual(0, len(misc_reports._LAST_ACTIVE))
+
+    def test_evict_by_weight(self):
+        weight = view_cache.get_weight(self.factory()())
+        cache = view_cache.ViewCache(max_weight=weight * 2)
+        for viewid in 'abc':
+            cache.get(viewid, self.factory())
+        self.assertEqual(['b', 'c'], list(cache.views))
+        self.assertEqual(weight * 2, cache.weight)
+
+        # The newest view is always kept.
+        cache = view_cache.ViewCache(max_weight=1)
+        for viewid in 'abc':
+            cache.get(viewid, self.factory())
+        self.assertEqual(['c'], list(cache.views))
+
+    def test_clear(self):
+        cache = view_cache.ViewCache()
+        factory = self.factory()
+        cache.get('/view/all', factory)
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.weight)
+        self.assertEqual(1, cache.usage['/view/all'])
+        cache.get('/view/all', factory)
+        self.assertEqual(2, factory.call_count)
+
+    def test_prebuild(self):
+        cache = view_cache.ViewCache()
+        factory_all, factory_year = self.factory(), self.factory()
+        cache.get('/view/all', factory_all)
+        cache.clear()
+        try:
+            futures = cache.prebuild([('/view/year/2015', factory_year)])
+            self.assertEqual(2, len(futures))
+            for future in futures:
+                future.result()
+            self.assertEqual(['/view/year/2015', '/view/all'], sorted(cache.views, reverse=True))
+
+            # Views already built are not built again.
+            self.assertEqual([], cache.prebuild([('/view/year/2015', factory_year)]))
+            cache.get('/view/year/2015', factory_year)
+            self.assertEqual(1, factory_year.call_count)
+            self.assertEqual(2, factory_all.call_count)
+        finally:
+            cache.close()
+
+    def test_get_waits_for_prebuild(self):
+        cache = view_cache.ViewCache()
+        started, release = threading.Event(), threading.Event()
+        view = self.factory()()
+        def slow_factory():
+            started.set()
+            release.wait()
+            return view
+        factory = mock.Mock(wraps=slow_factory)
+        try:
+            cache.prebuild([('/view/all', factory)])
+            started.wait()
+            threading.Timer(0.05, release.set).start()
+            self.assertIs(view, cache.get('/view/all', factory))
+            self.assertEqual(1, factory.call_count)
+        finally:
+            cache.close()
+
+    def test_stale_build(self):
+        cache = view_cache.ViewCache()
+        def factory():
+            # The ledger is reloaded while this view is being built.
+            cache.clear()
+            return self.factory()()
+        view = cache.get('/view/all', factory)
+        self.assertIsInstance(view, views.AllView)
+        self.assertNotIn('/view/all', cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
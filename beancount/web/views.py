@@ -8,13 +8,42 @@ import enum
 import logging
 
 from beancount.core import data
+from beancount.core import flags
 from beancount.ops import summarize
 from beancount.core import realization
 from beancount.parser import options
+from beancount.utils import bisect_key
+from beancount.utils import memo
 from beancount.utils import misc_utils
 from beancount.utils import date_utils
 
 
+# The maximum number of summarized lists of entries to keep in memory.
+SUMMARIES_MAXSIZE = 32
+
+# A cache of the entries of the views clamped to their period and capped, so
+# that rebuilding a view, e.g., after it was evicted from the cache of the web
+# application, does not summarize its entries again.
+_SUMMARIES = memo.ledger_cache(SUMMARIES_MAXSIZE)
+
+
+def clamp_period(entries, begin_date, end_date, options_map):
+    """Clamp entries to a period, reusing the result for the same entries.
+
+    Args:
+      entries: A list of directives, which must not be modified afterwards.
+      begin_date: See summarize.clamp().
+      end_date: See summarize.clamp().
+      options_map: A parser's option_map.
+    Returns:
+      Same as summarize.clamp(). The list of entries must not be modified.
+    """
+    return memo.call_memoized(
+        _SUMMARIES, (entries, options_map), ('clamp', begin_date, end_date),
+        lambda: summarize.clamp_opt(entries, begin_date, end_date, options_map,
+                                    summarize.get_checkpoints(entries)))
+
+
 class MonthNavigation(enum.Enum):
     NONE = 0    # No monthly navigation.
     COMPACT = 1 # Compact combobox outgoing to monthly navigation.
@@ -27,6 +56,10 @@ class View:
 
     # pylint: disable=too-many-instance-attributes
 
+    # A pair of the begin and end dates of the period the entries are clamped
+    # to, or None, if the entries are not clamped.
+    period = None
+
     def __init__(self, all_entries, options_map, title):
         """Build a View instance.
 
@@ -77,8 +110,14 @@ class View:
         # Compute the list of entries that includes transfer entries of the
         # income/expenses amounts to the balance sheet's equity (as "net
         # income"). This is used to render the end-period balance sheet, with
-        # the current period's net income, closing the period.
-        self.closing_entries = summarize.cap_opt(self.entries, options_map)
+        # the current period's net income, closing the period. Only the
+        # entries which are stable across rebuilds of the view are memoized.
+        if self.period is not None or self.entries is self.all_entries:
+            self.closing_entries = memo.call_memoized(
+                _SUMMARIES, (self.entries, options_map), 'cap',
+                lambda: summarize.cap_opt(self.entries, options_map))
+        else:
+            self.closing_entries = summarize.cap_opt(self.entries, options_map)
 
         # Realize the three sets of entries.
         account_types = options.get_account_types(options_map)
@@ -87,8 +126,16 @@ class View:
                                                              account_types)
 
         with misc_utils.log_time('realize', logging.info):
-            self.real_accounts = realization.realize(self.entries,
-                                                     account_types)
+            if self.period is not None:
+                self.real_accounts = self.realize_period(account_types)
+            elif self.entries is self.all_entries:
+                # Share the index of the postings of the full ledger.
+                posting_index = realization.get_posting_index(self.entries)
+                self.real_accounts = realization.realize_postings(
+                    posting_index.by_account(), account_types)
+            else:
+                self.real_accounts = realization.realize(self.entries,
+                                                         account_types)
 
         with misc_utils.log_time('realize_closing', logging.info):
             self.closing_real_accounts = realization.realize(self.closing_entries,
@@ -97,6 +144,59 @@ class View:
         assert self.real_accounts is not None
         assert self.closing_real_accounts is not None
 
+    def realize_period(self, account_types):
+        """Realize the entries clamped to the period of this view.
+
+        Rather than regrouping and summing up all the postings of the period,
+        this slices them from the index of all the entries and computes their
+        balances from its cumulative balances. Only the summarizing entries
+        before the period and the conversion entry at its end are realized
+        anew.
+
+        Args:
+          account_types: An instance of AccountTypes.
+        Returns:
+          The root RealAccount instance, as per realize() on the clamped
+          entries.
+        """
+        begin_date, end_date = self.period
+        before_entries = self.entries[:self.begin_index]
+        period_entries = self.entries[self.begin_index:]
+
+        # Find the conversion entry inserted at the end of the period.
+        after_entries = []
+        if period_entries:
+            last_entry = period_entries[-1]
+            if (isinstance(last_entry, data.Transaction) and
+                    last_entry.flag == flags.FLAG_CONVERSIONS and
+                    last_entry.meta.get('filename', None) == '<conversions>'):
+                after_entries.append(last_entry)
+                period_entries = period_entries[:-1]
+
+        posting_index = realization.get_posting_index(self.all_entries)
+        real_root = realization.realize_window(posting_index, begin_date, end_date,
+                                               account_types,
+                                               before_entries, after_entries)
+
+        # Clamping removes the balance assertions following the transfers of
+        # the income statement accounts. Remove them from the realization too.
+        begin_index, end_index = [
+            bisect_key.bisect_left_with_key(self.all_entries, date,
+                                            key=lambda entry: entry.date)
+            for date in (begin_date, end_date)]
+        if end_index - begin_index > len(period_entries):
+            kept_balances = set(id(entry)
+                                for entry in period_entries
+                                if isinstance(entry, data.Balance))
+            for real_account in realization.iter_children(real_root):
+                real_account.txn_postings = [
+                    txn_posting
+                    for txn_posting in real_account.txn_postings
+                    if not (isinstance(txn_posting, data.Balance) and
+                            begin_date <= txn_posting.date < end_date and
+                            id(txn_posting) not in kept_balances)]
+        return real_root
+
     def apply_filter(self, entries):
         """Filter the list of entries.
 
@@ -163,18 +263,17 @@ class YearView(View):
         self.first_month = first_month
         if not (1 <= first_month <= 12):
             raise ValueError("Invalid month: {}".format(first_month))
+        self.period = (datetime.date(year, first_month, 1),
+                       datetime.date(year+1, first_month, 1))
         View.__init__(self, entries, options_map, title)
 
         self.monthly = MonthNavigation.COMPACT
 
     def apply_filter(self, entries, options_map):
         # Clamp to the desired period.
-        begin_date = datetime.date(self.year, self.first_month, 1)
-        end_date = datetime.date(self.year+1, self.first_month, 1)
+        begin_date, end_date = self.period
         with misc_utils.log_time('clamp', logging.info):
-            entries, index = summarize.clamp_opt(entries,
-                                                 begin_date, end_date,
-                                                 options_map)
+            entries, index = clamp_period(entries, begin_date, end_date, options_map)
         return entries, index, end_date
 
 
@@ -193,19 +292,17 @@ class MonthView(View):
         """
         self.year = year
         self.month = month
+        begin_date = datetime.date(year, month, 1)
+        self.period = (begin_date, date_utils.next_month(begin_date))
         View.__init__(self, entries, options_map, title)
 
         self.monthly = MonthNavigation.FULL
 
     def apply_filter(self, entries, options_map):
         # Clamp to the desired period.
-        begin_date = datetime.date(self.year, self.month, 1)
-        end_date = date_utils.next_month(begin_date)
-
+        begin_date, end_date = self.period
         with misc_utils.log_time('clamp', logging.info):
-            entries, index = summarize.clamp_opt(entries,
-                                                 begin_date, end_date,
-                                                 options_map)
+            entries, index = clamp_period(entries, begin_date, end_date, options_map)
         return entries, index, end_date
 
 
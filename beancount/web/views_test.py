@@ -1,11 +1,15 @@
 __copyright__ = "Copyright (C) 2014-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import datetime
 import unittest
+from os import path
 
 from beancount import loader
 from beancount.parser import options
 from beancount.core import realization
+from beancount.utils import memo
+from beancount.utils import test_utils
 from beancount.web import views
 
 
@@ -122,6 +126,23 @@ class TestViews(unittest.TestCase):
         with self.assertRaises(ValueError):
             view = views.YearView(self.entries, self.options_map, 'Year', 2013, 13)
 
+    def test_YearView_summaries(self):
+        view = views.YearView(self.entries, self.options_map, 'Year', 2013)
+        other_view = views.YearView(self.entries, self.options_map, 'Year', 2013)
+        self.assertIs(view.entries, other_view.entries)
+        self.assertIs(view.closing_entries, other_view.closing_entries)
+        self.assertIsNot(view.entries,
+                         views.YearView(self.entries, self.options_map, 'Year', 2014).entries)
+
+        # The summaries are computed again for other entries, or after a clear.
+        other_view = views.YearView(list(self.entries), self.options_map, 'Year', 2013)
+        self.assertIsNot(view.entries, other_view.entries)
+        self.assertEqual(view.entries, other_view.entries)
+        memo.clear_ledger_caches()
+        other_view = views.YearView(self.entries, self.options_map, 'Year', 2013)
+        self.assertIsNot(view.entries, other_view.entries)
+        self.assertEqual(view.closing_entries, other_view.closing_entries)
+
     def test_TagView(self):
         view = views.TagView(self.entries, self.options_map, 'Tag', {'trip1'})
         self.assertNotEqual([], view.entries)
@@ -162,5 +183,61 @@ class TestViews(unittest.TestCase):
         self.assertNotEqual(self.empty_realization, view.closing_real_accounts)
 
 
+class TestRealizePeriod(unittest.TestCase):
+
+    @loader.load_doc()
+    def test_realize_period(self, entries, _, options_map):
+        """
+        2010-01-01 open Assets:Checking
+        2010-01-01 open Assets:Cash
+        2010-01-01 open Income:Salary
+
+        2012-11-15 *
+          Assets:Checking        100 USD
+          Income:Salary
+
+        2012-12-01 balance Income:Salary  -100 USD
+
+        2013-02-03 *
+          Assets:Checking        100 USD
+          Income:Salary
+
+        2013-03-01 balance Income:Salary  -200 USD
+        2013-03-01 balance Assets:Checking  200 USD
+
+        2013-04-03 *
+          Assets:Cash            50 CAD
+          Assets:Checking       -40 USD @ 1.25 CAD
+
+        2014-01-18 *
+          Assets:Checking        100 USD
+          Income:Salary
+        """
+        account_types = options.get_account_types(options_map)
+        for view in [views.YearView(entries, options_map, 'Year', 2012),
+                     views.YearView(entries, options_map, 'Year', 2013),
+                     views.YearView(entries, options_map, 'Year', 2013, 3),
+                     views.MonthView(entries, options_map, 'Month', 2013, 3),
+                     views.MonthView(entries, options_map, 'Month', 2013, 5),
+                     views.YearView(entries, options_map, 'Year', 2020)]:
+            self.assertEqual(realization.realize(view.entries, account_types),
+                             view.real_accounts)
+
+    def test_realize_period_example(self):
+        example_filename = path.join(test_utils.find_repository_root(__file__),
+                                     'examples', 'example.beancount')
+        entries, _, options_map = loader.load_file(example_filename)
+        account_types = options.get_account_types(options_map)
+        for year in range(entries[0].date.year, entries[-1].date.year + 1):
+            view = views.YearView(entries, options_map, 'Year', year)
+            self.assertEqual(realization.realize(view.entries, account_types),
+                             view.real_accounts)
+        date = entries[-1].date
+        view = views.MonthView(entries, options_map, 'Month', date.year, date.month)
+        self.assertEqual(realization.realize(view.entries, account_types),
+                         view.real_accounts)
+        self.assertEqual(datetime.date(date.year, date.month, 1), view.period[0])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -13,19 +13,31 @@ import time
 import threading
 import datetime
 import calendar
+import collections
+import functools
+import hashlib
+import urllib.parse
 
 import bottle
 from bottle import response
 from bottle import request
 
+import beancount
+
+from beancount.core.number import ZERO
 from beancount.core import data
 from beancount.core import getters
 from beancount.core import account
+from beancount.core import amount
 from beancount.core import account_types
 from beancount.core import compare
 from beancount.core import convert
+from beancount.core import inventory
+from beancount.core import position
+from beancount.core import realization
 from beancount.ops import basicops
 from beancount.core import prices
+from beancount.utils import memo
 from beancount.utils import misc_utils
 from beancount.utils import text_utils
 from beancount.utils import version
@@ -34,6 +46,7 @@ from beancount.parser import options
 from beancount.parser import printer
 from beancount import loader
 from beancount.web import views
+from beancount.web import view_cache
 from beancount.web import scrape
 from beancount.reports import html_formatter
 from beancount.reports import balance_reports
@@ -52,13 +65,26 @@ DEFAULT_VIEW_REDIRECT = 'balsheet'
 # The protocol to use for file links.
 FILELINK_PROTOCOL = 'beancount://{filename}?lineno={lineno}'
 
+# The default number of rows of the pages of journals.
+DEFAULT_JOURNAL_PAGE_SIZE = 200
+
+# The default maximum number of rendered pages to keep in memory.
+DEFAULT_PAGE_CACHE_SIZE = 64
+
 
 class HTMLFormatter(html_formatter.HTMLFormatter):
     """A formatter object that can be used to render accounts links.
 
+    Formatters are created for each page, and the renderings of accounts and
+    inventories, which are repeated across the rows of the tables of a page,
+    are memoized for their lifetime.
+
     Attributes:
       build_url: A function used to render links to a Bottle application.
       leafonly: a boolean, if true, render only the name of the leaf nodes.
+      accounts: A dict of account name to its rendering.
+      inventories: A dict of the tuple of the positions of an inventory to its
+        rendering.
     """
     def __init__(self, dcontext, build_url, leaf_only, account_xform, view_links=True):
         super().__init__(dcontext)
@@ -66,6 +92,8 @@ class HTMLFormatter(html_formatter.HTMLFormatter):
         self.leaf_only = leaf_only
         self.view_links = view_links
         self.account_xform = account_xform
+        self.accounts = {}
+        self.inventories = {}
 
     def build_global(self, *args, **kwds):
         "Render to global application."
@@ -75,6 +103,13 @@ class HTMLFormatter(html_formatter.HTMLFormatter):
 
     def render_account(self, account_name):
         """See base class."""
+        html = self.accounts.get(account_name, None)
+        if html is None:
+            html = self.accounts[account_name] = self._render_account(account_name)
+        return html
+
+    def _render_account(self, account_name):
+        """Render an account name, without memoization. See render_account()."""
         if self.view_links:
             if self.leaf_only:
                 # Calculate the number of components to figure out the indent to
@@ -107,7 +142,21 @@ class HTMLFormatter(html_formatter.HTMLFormatter):
 
     def render_inventory(self, inv):
         """Override this formatter to convert the inventory to units only."""
-        return super().render_inventory(inv.reduce(convert.get_units))
+        key = tuple(inv.values())
+        html = self.inventories.get(key, None)
+        if html is None:
+            # Sum the units by currency, rather than reducing the inventory
+            # with convert.get_units(), which adds each lot to a new inventory.
+            units = {}
+            for pos in key:
+                currency = pos.units.currency
+                units[currency] = units.get(currency, ZERO) + pos.units.number
+            units_inv = inventory.Inventory([
+                position.Position(amount.Amount(number, currency), None)
+                for currency, number in units.items()
+                if number != ZERO])
+            html = self.inventories[key] = super().render_inventory(units_inv)
+        return html
 
     def render_context(self, entry):
         """See base class."""
@@ -209,8 +258,134 @@ NOT_IMPLEMENTED = '''
 </p>
 '''
 
+class Ledger:
+    """A loaded ledger and the data precomputed from it.
+
+    Instances are shared by all the requests and are never modified after
+    they have been created, but for the indexes built lazily from the entries;
+    a reload creates a new instance.
+
+    Attributes:
+      entries: A list of directives.
+      errors: A list of errors from loading.
+      options: An options dict, as per the parser.
+      account_types: An instance of AccountTypes.
+      price_map: A price map, as per prices.build_price_map().
+      active_years: A list of the years with entries.
+      source: A string, the contents of the top-level input file.
+      entries_by_hash: A dict of entry hash to the list of entries with this
+        hash, or None if it has not been built yet. See get_entries_by_hash().
+      lock: A lock protecting the building of the indexes.
+    """
+
+    def __init__(self, entries, errors, options_map, source):
+        self.entries = entries
+        self.errors = errors
+        self.options = options_map
+        self.account_types = options.get_account_types(options_map)
+        self.price_map = prices.build_price_map(entries)
+        self.active_years = list(getters.get_active_years(entries))
+        self.source = source
+        self.entries_by_hash = None
+        self.lock = threading.Lock()
+
+    def get_entries_by_hash(self):
+        """Get the entries by hash, building the index on the first call.
+
+        Returns:
+          A dict of entry hash, as per compare.hash_entry(), to the list of the
+          entries with this hash. There is more than one entry for a hash only
+          if there are duplicate entries.
+        """
+        with self.lock:
+            if self.entries_by_hash is None:
+                entries_by_hash = collections.defaultdict(list)
+                for entry in self.entries:
+                    entries_by_hash[compare.hash_entry(entry)].append(entry)
+                self.entries_by_hash = dict(entries_by_hash)
+            return self.entries_by_hash
+
+
+def load_ledger(filename):
+    """Load a ledger and print out its errors.
+
+    Args:
+      filename: A string, the name of the top-level input file.
+    Returns:
+      An instance of Ledger.
+    """
+    # Save the source for later, to render.
+    with open(filename, encoding='utf8') as f:
+        source = f.read()
+
+    # Parse the beancount file.
+    entries, errors, options_map = loader.load_file(filename)
+
+    # Print out the list of errors.
+    if errors:
+        print(',----------------------------------------------------------------')
+        printer.print_errors(errors, file=sys.stdout)
+        print('`----------------------------------------------------------------')
+
+    return Ledger(entries, errors, options_map, source)
+
+
+def _ledger_property(name):
+    """Create a property for an attribute of the ledger of an application.
+
+    Args:
+      name: A string, the name of the attribute of Ledger.
+    Returns:
+      A property, which is None if no ledger has been loaded yet.
+    """
+    return property(lambda self: getattr(self.get_ledger(), name, None),
+                    doc="The '{}' attribute of the ledger.".format(name))
+
+
+class WebApp(bottle.Bottle):
+    """The application, serving a ledger which may be reloaded at any time.
+
+    The attributes of the ledger are available as attributes of the
+    application, e.g. app.entries. While a request is handled, they resolve to
+    the ledger that was current when it began, so that a ledger swapped in by
+    a background reload is never mixed with the previous one in a page.
+
+    Attributes:
+      ledger: The current instance of Ledger, or None, if not loaded yet.
+      request_ledger: A thread-local holder of the ledger of the request
+        being handled by the thread.
+      reloading: A threading.Event, set while the input file has changed and
+        a new ledger is being loaded in the background.
+      reload_lock: A lock serializing the reloads, so that concurrent
+        requests do not load the same changes more than once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ledger = None
+        self.request_ledger = threading.local()
+        self.reloading = threading.Event()
+        self.reload_lock = threading.Lock()
+
+    def get_ledger(self):
+        """Return the ledger of the current request, or the current one.
+
+        Returns:
+          An instance of Ledger, or None.
+        """
+        return getattr(self.request_ledger, 'ledger', None) or self.ledger
+
+    entries = _ledger_property('entries')
+    errors = _ledger_property('errors')
+    options = _ledger_property('options')
+    account_types = _ledger_property('account_types')
+    price_map = _ledger_property('price_map')
+    active_years = _ledger_property('active_years')
+    source = _ledger_property('source')
+
+
 # pylint: disable=invalid-name
-app = bottle.Bottle()
+app = WebApp()
 A = bottle_utils.AttrMapper(app.router.build)
 
 
@@ -251,14 +426,20 @@ def render_global(*args, **kw):
     kw['navigation'] = GLOBAL_NAVIGATION
     kw['scripts'] = kw.get('scripts', '')
 
-    kw['overlay'] = (
-        render_overlay('<li><a href="{}">Errors</a></li>'.format(
+    overlays = []
+    if request.params.pop('render_overlay', True):
+        overlays.append('<li><a href="{}">Errors</a></li>'.format(
             app.router.build('errors')))
-        if request.params.pop('render_overlay', True)
-        else '')
+    if app.reloading.is_set():
+        overlays.append(STALE_OVERLAY)
+    kw['overlay'] = render_overlay(' '.join(overlays)) if overlays else ''
     return template.render(*args, **kw)
 
 
+# An overlay item rendered while the input file is being reloaded.
+STALE_OVERLAY = '<li><span class="stale">Stale (reloading...)</span></li>'
+
+
 @app.route('/', name='root')
 def root():
     "Redirect the root page to the home page."
@@ -383,9 +564,7 @@ def link(link=None):
 def context_(ehash=None):
     "Render the before & after context around a transaction entry."
 
-    matching_entries = [entry
-                        for entry in app.entries
-                        if ehash == compare.hash_entry(entry)]
+    matching_entries = app.get_ledger().get_entries_by_hash().get(ehash, [])
 
     oss = io.StringIO()
     if len(matching_entries) == 0:
@@ -404,7 +583,9 @@ def context_(ehash=None):
 
         # Render the context.
         oss.write("<pre>\n")
-        oss.write(context.render_entry_context(app.entries, app.options, entry))
+        oss.write(context.render_entry_context(
+            app.entries, app.options, entry,
+            realization.get_posting_index(app.entries)))
         oss.write("</pre>\n")
 
         # Render the filelinks.
@@ -518,6 +699,8 @@ def render_view(*args, **kw):
     if request.params.pop('render_overlay', False):
         overlays.append(
             '<li><a href="{}">Errors</a></li>'.format(app.router.build('errors')))
+    if app.reloading.is_set():
+        overlays.append(STALE_OVERLAY)
 
     # Render navigation, with monthly navigation option.
     oss = io.StringIO()
@@ -734,26 +917,177 @@ def journal_all():
     bottle.redirect(request.app.get_url('journal', account_name=''))
 
 
+def get_journal_real_root(account_name):
+    """Get the realization to render the journal of an account from.
+
+    Args:
+      account_name: A string, the name of the account, or an empty string for
+        the journal of all accounts.
+    Returns:
+      The root RealAccount of the realization of the current view.
+    """
+    if account_name and account_types.is_balance_sheet_account(account_name,
+                                                                app.account_types):
+        return request.view.closing_real_accounts
+    return request.view.real_accounts
+
+
+def get_request_int(name, default):
+    """Get an integer parameter of the current request.
+
+    Args:
+      name: A string, the name of the parameter.
+      default: The value to return if the parameter is not present.
+    Returns:
+      An integer.
+    Raises:
+      bottle.HTTPError: If the value of the parameter is not an integer.
+    """
+    value = request.params.get(name, None)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise bottle.HTTPError(400, 'Invalid {}: {}'.format(name, value))
+
+
+# A cache of the postings and pages of the most recently requested journals.
+_JOURNAL_PAGES = memo.ledger_cache(32)
+
+
+def get_journal_pages(real_account, page_size):
+    """Get the postings of a journal and their pages, computing them if needed.
+
+    The balances before the pages are computed once for the postings of an
+    account, so that any page can be rendered from them in time proportional
+    to its size, rather than to that of the journal.
+
+    Args:
+      real_account: The RealAccount of the journal.
+      page_size: An integer, the number of rows of a page.
+    Returns:
+      A pair of the list of postings of the journal, as per
+      realization.get_postings(), and the list of its JournalPage instances,
+      the newest first. See journal_html.paginate_postings().
+    """
+    key = (id(real_account), page_size)
+    cached = _JOURNAL_PAGES.get(key)
+    if cached is None or cached[0] is not real_account:
+        txn_postings = realization.get_postings(real_account)
+        cached = (real_account, txn_postings,
+                  journal_html.paginate_postings(txn_postings, page_size))
+        _JOURNAL_PAGES.put(key, cached)
+    return cached[1], cached[2]
+
+
+def get_journal_page_size():
+    """Get the number of rows of the pages of journals for the current request.
+
+    Returns:
+      An integer, zero if journals are not paginated.
+    Raises:
+      bottle.HTTPError: If the 'page_size' parameter is invalid.
+    """
+    page_size = get_request_int('page_size', app.args.journal_page_size)
+    if page_size < 0:
+        raise bottle.HTTPError(400, 'Invalid page_size: {}'.format(page_size))
+    return page_size
+
+
+def get_journal_page(account_name, page_size):
+    """Get a page of the journal of an account, as per the request parameters.
+
+    Args:
+      account_name: A string, the name of the account, or an empty string for
+        the journal of all accounts.
+      page_size: An integer, the number of rows of a page.
+    Returns:
+      A tuple of the list of postings of the page, its instance of JournalPage,
+      its number, from 1 for the newest, and the number of pages.
+    Raises:
+      bottle.HTTPError: If the account or the page does not exist.
+    """
+    real_root = get_journal_real_root(account_name)
+    real_account = (realization.get(real_root, account_name)
+                    if account_name
+                    else real_root)
+    if real_account is None:
+        raise bottle.HTTPError(404, 'Account {} not found'.format(account_name))
+    txn_postings, pages = get_journal_pages(real_account, page_size)
+    page_number = get_request_int('page', 1)
+    if not 1 <= page_number <= len(pages):
+        raise bottle.HTTPError(404, 'Page {} not found'.format(page_number))
+    page = pages[page_number - 1]
+    return txn_postings[page.begin:page.end], page, page_number, len(pages)
+
+
+def render_journal_navigation(page_number, num_pages):
+    """Render the links to the other pages of a journal.
+
+    Args:
+      page_number: An integer, the number of the current page.
+      num_pages: An integer, the number of pages.
+    Returns:
+      An HTML string.
+    """
+    def link(label, number):
+        query = dict(request.query, page=number)
+        return '<a href="?{}">{}</a>'.format(urllib.parse.urlencode(query), label)
+    links = ['Page {} of {}'.format(page_number, num_pages)]
+    if page_number > 1:
+        links.extend([link('Newest', 1), link('Newer', page_number - 1)])
+    if page_number < num_pages:
+        links.extend([link('Older', page_number + 1), link('Oldest', num_pages)])
+    return '<p class="journal-pages">{}</p>'.format(' | '.join(links))
+
+
+def get_render_postings():
+    """Return true if the postings of the entries of a journal are to be rendered.
+
+    Returns:
+      A boolean, from the 'postings' parameter of the request.
+    """
+    render_postings = request.params.get('postings', True)
+    if isinstance(render_postings, str):
+        render_postings = render_postings.lower() in ('1', 'true')
+    return render_postings
+
+
 @viewapp.route('/journal/<account_name:re:.*>', name='journal')
 def journal_(account_name=None):
-    "A list of all the entries for this account realization."
+    """A list of all the entries for this account realization.
+
+    If the journal is paginated, this renders a page of its rows, the newest
+    first, as per the 'page' and 'page_size' parameters.
+    """
     account_name = app.account_xform.parse(account_name)
+    pagetitle = '{}'.format(account_name or 'General Ledger (All Accounts)')
+    render_postings = get_render_postings()
+
+    page_size = get_journal_page_size()
+    if page_size > 0:
+        txn_postings, page, page_number, num_pages = get_journal_page(account_name,
+                                                                      page_size)
+        formatter = HTMLFormatter(app.options['dcontext'],
+                                  request.app.get_url, False, app.account_xform)
+        oss = io.StringIO()
+        navigation = (render_journal_navigation(page_number, num_pages)
+                      if num_pages > 1
+                      else '')
+        oss.write(navigation)
+        journal_html.html_entries_table_with_balance(oss, txn_postings, formatter,
+                                                     render_postings, page.balance)
+        oss.write(navigation)
+        return render_view(pagetitle=pagetitle, contents=oss.getvalue())
 
     # Figure out which account to render this from.
-    real_accounts = request.view.real_accounts
-    if account_name:
-        if account_name and account_types.is_balance_sheet_account(account_name,
-                                                                   app.account_types):
-            real_accounts = request.view.closing_real_accounts
+    real_accounts = get_journal_real_root(account_name)
 
     # Render the report.
     args = []
     if account_name:
         args.append('--account={}'.format(account_name))
-
-    render_postings = request.params.get('postings', True)
-    if isinstance(render_postings, str):
-        render_postings = render_postings.lower() in ('1', 'true')
     if render_postings:
         args.append('--verbose')
 
@@ -766,9 +1100,64 @@ def journal_(account_name=None):
     except KeyError as e:
         raise bottle.HTTPError(404, '{}'.format(e))
 
-    return render_view(pagetitle='{}'.format(account_name or
-                                             'General Ledger (All Accounts)'),
-                       contents=html_journal)
+    return render_view(pagetitle=pagetitle, contents=html_journal)
+
+
+@viewapp.route('/journal_rows/<account_name:re:.*>', name='journal_rows')
+def journal_rows(account_name=None):
+    """A page of the rows of the journal of an account, as JSON.
+
+    This serves the same pages as the journal, e.g., for a client to load the
+    older rows as they are scrolled to. The HTML of the cells is pre-rendered.
+    """
+    account_url_name = account_name
+    account_name = app.account_xform.parse(account_name)
+    page_size = get_journal_page_size() or DEFAULT_JOURNAL_PAGE_SIZE
+    txn_postings, page, page_number, num_pages = get_journal_page(account_name, page_size)
+    render_postings = get_render_postings()
+    formatter = HTMLFormatter(app.options['dcontext'],
+                              request.app.get_url, False, app.account_xform)
+    rows = []
+    for row in journal_html.iterate_html_postings(txn_postings, formatter, page.balance):
+        entry = row.entry
+        description = row.description
+        if row.links:
+            description += journal_html.render_links(row.links)
+        json_row = {
+            'date': entry.date.isoformat(),
+            'type': row.rowtype,
+            'class': row.extra_class,
+            'flag': row.flag,
+            'description': description,
+            'change': row.amount_str,
+            'balance': row.balance_str,
+            'context': formatter.render_context(entry),
+            'location': '{}:{}'.format(entry.meta["filename"], entry.meta["lineno"]),
+        }
+        if render_postings and isinstance(entry, data.Transaction):
+            json_row['postings'] = [{
+                'flag': posting.flag or '',
+                'account': formatter.render_account(posting.account),
+                'position': position.to_string(posting),
+                'price': str(posting.price or ''),
+                'cost': str(convert.get_weight(posting)),
+                'leg': posting in row.leg_postings,
+            } for posting in entry.postings]
+        rows.append(json_row)
+
+    next_url = None
+    if page_number < num_pages:
+        query = dict(request.query, page=page_number + 1)
+        next_url = '{}?{}'.format(
+            request.app.get_url('journal_rows', account_name=account_url_name),
+            urllib.parse.urlencode(query))
+    return {
+        'account': account_name,
+        'page': page_number,
+        'num_pages': num_pages,
+        'rows': rows,
+        'next': next_url,
+    }
 
 
 @viewapp.route('/conversions', name='conversions')
@@ -875,8 +1264,16 @@ def stats_postings():
 # Views.
 
 
-# A cache for views that have been created (on access).
-app.views = {}
+# A cache for views that have been created (on access). This is replaced by
+# one configured from the command-line arguments in run_app().
+app.views = view_cache.ViewCache()
+
+# A cache of rendered pages, by entity tag, or None. This is configured from
+# the command-line arguments in run_app().
+app.pages = None
+
+# The number of recent months whose views to prebuild after a reload.
+NUM_PREBUILT_MONTHS = 3
 
 
 def handle_view(path_depth):
@@ -894,21 +1291,46 @@ def handle_view(path_depth):
         def wrapper(*args, **kwargs):
             components = request.path.split('/')
             viewid = '/'.join(components[:path_depth+1])
-            try:
-                # Try fetching the view from the cache.
-                view = app.views[viewid]
-            except KeyError:
-                # We need to create the view.
-                view = app.views[viewid] = callback(*args, **kwargs)
+
+            # Fetch the view from the cache, creating it if necessary. A view
+            # of another ledger than that of the request may be cached around a
+            # reload; it is replaced.
+            view = app.views.get(viewid, functools.partial(callback, *args, **kwargs),
+                                 lambda view: view.all_entries is app.entries)
 
             # Save the view for the subrequest and redirect. populate_view()
             # picks this up and saves it in request.view.
             request.environ['VIEW'] = view
             return bottle_utils.internal_redirect(viewapp, path_depth)
+        wrapper.view_factory = callback
+        wrapper.path_depth = path_depth
         return wrapper
     return view_populator
 
 
+def get_url_view(url):
+    """Get the view a page is rendered from, creating it if needed.
+
+    This does not render the page.
+
+    Args:
+      url: A string, the path of a page.
+    Returns:
+      A pair of the view id and the instance of views.View for the page, or
+      (None, None) if the page is not rendered from a view.
+    Raises:
+      bottle.HTTPError: If the path does not match any of the routes.
+    """
+    route, args = app.router.match({'PATH_INFO': url, 'REQUEST_METHOD': 'GET'})
+    factory = getattr(route.callback, 'view_factory', None)
+    if factory is None:
+        return None, None
+    viewid = '/'.join(url.split('/')[:route.callback.path_depth+1])
+    view = app.views.get(viewid, functools.partial(factory, **args),
+                         lambda view: view.all_entries is app.entries)
+    return viewid, view
+
+
 def populate_view(callback):
     """A plugin that will populate the request with the current view instance.
 
@@ -969,6 +1391,60 @@ def get_all_view(app):
     return views.AllView(app.entries, app.options, 'All Transactions')
 
 
+def get_year_view(app, year):
+    """Return a view of the transactions of a year.
+
+    Args:
+      year: An integer, the year.
+    Returns:
+      An instance of YearView.
+    """
+    return views.YearView(app.entries, app.options, 'Year {:4d}'.format(year),
+                          year, app.args.first_month)
+
+
+def get_month_view(app, year, month):
+    """Return a view of the transactions of a month.
+
+    Args:
+      year: An integer, the year.
+      month: An integer, the month.
+    Returns:
+      An instance of MonthView.
+    """
+    date = datetime.date(year, month, 1)
+    text = date.strftime('%B %Y')
+    return views.MonthView(app.entries, app.options, text, year, month)
+
+
+def get_prebuilt_views(app, today=None):
+    """Return the views to build ahead of requests after a reload.
+
+    These are the view of all transactions and those of the current year and
+    of the last few months, in order of priority. The views requested most
+    often are added by the cache itself.
+
+    Args:
+      today: A datetime.date instance, the current date, or None for today.
+    Returns:
+      A list of (view id, factory) pairs, as per ViewCache.prebuild().
+    """
+    if app.args.view:
+        # Only the restricted view can be requested.
+        return []
+    if today is None:
+        today = datetime.date.today()
+    factories = [('/view/all', functools.partial(get_all_view, app)),
+                 ('/view/year/{:4d}'.format(today.year),
+                  functools.partial(get_year_view, app, today.year))]
+    year, month = today.year, today.month
+    for _ in range(NUM_PREBUILT_MONTHS):
+        factories.append(('/view/year/{:4d}/month/{:02d}'.format(year, month),
+                          functools.partial(get_month_view, app, year, month)))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return factories
+
+
 @app.route(r'/view/all/<path:re:.*>', name='all')
 @handle_view(2)
 def all(path=None):
@@ -978,19 +1454,12 @@ def all(path=None):
            name='month')
 @handle_view(5)
 def month(year=None, month=None, path=None):
-    year = int(year)
-    month = int(month)
-    date = datetime.date(year, month, 1)
-    text = date.strftime('%B %Y')
-    return views.MonthView(app.entries, app.options, text, year, month)
+    return get_month_view(app, int(year), int(month))
 
 @app.route(r'/view/year/<year:re:\d\d\d\d>/<path:re:.*>', name='year')
 @handle_view(3)
 def year(year=None, path=None):
-    year = int(year)
-    first_month = app.args.first_month
-    return views.YearView(app.entries, app.options, 'Year {:4d}'.format(year),
-                          year, first_month)
+    return get_year_view(app, int(year))
 
 @app.route(r'/view/tag/<tag:re:[^/]*>/<path:re:.*>', name='tag')
 @handle_view(3)
@@ -1014,58 +1483,146 @@ def component(component=None, path=None):
 # Bootstrapping and main program.
 
 
-def auto_reload_input_file(callback):
-    """A plugin that automatically reloads the input file if it changed since the
-    last page was loaded."""
-    def wrapper(*posargs, **kwargs):
-        filename = app.args.filename
+def reload_ledger():
+    """Load the input file and swap the new ledger in.
 
-        if loader.needs_refresh(app.options):
-            logging.info('Reloading...')
+    The views of the previous ledger are dropped, and those most likely to be
+    requested next are rebuilt in the background.
+    """
+    logging.info('Reloading...')
+    ledger = app.ledger = load_ledger(app.args.filename)
 
-            # Save the source for later, to render.
-            with open(filename, encoding='utf8') as f:
-                app.source = f.read()
+    # Reset the view cache and rebuild the most likely views in the
+    # background, along with the index of the entries for context pages.
+    app.views.clear()
+    memo.clear_ledger_caches()
+    if app.pages is not None:
+        app.pages.clear()
+    if app.args.prebuild_workers > 0:
+        app.views.prebuild(get_prebuilt_views(app))
+        threading.Thread(target=ledger.get_entries_by_hash,
+                         name='hash-index', daemon=True).start()
 
-            # Parse the beancount file.
-            entries, errors, options_map = loader.load_file(filename)
 
-            # Print out the list of errors.
-            if errors:
-                # pylint: disable=unsupported-assignment-operation
-                request.params['render_overlay'] = True
-                print(',----------------------------------------------------------------')
-                printer.print_errors(errors, file=sys.stdout)
-                print('`----------------------------------------------------------------')
+class LedgerWatcher(threading.Thread):
+    """A thread which reloads the ledger when its input files change.
 
-            # Save globals in the global app.
-            app.entries = entries
-            app.errors = errors
-            app.options = options_map
-            app.account_types = options.get_account_types(options_map)
+    The input files are polled for changes. While the new ledger is being
+    loaded, requests are served from the previous one and the application's
+    'reloading' event is set, so that pages can indicate they may be stale.
 
-            # Pre-compute the price database.
-            app.price_map = prices.build_price_map(entries)
+    Attributes:
+      interval: A float, the number of seconds between checks.
+      stopped: A threading.Event, set to stop the thread.
+    """
 
-            # Pre-compute the list of active years.
-            app.active_years = list(getters.get_active_years(entries))
+    def __init__(self, interval):
+        super().__init__(name='ledger-watcher', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
 
-            # Reset the view cache.
-            app.views.clear()
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            if app.ledger is None or not loader.needs_refresh(app.ledger.options):
+                continue
+            app.reloading.set()
+            try:
+                with app.reload_lock:
+                    reload_ledger()
+            except Exception:  # pylint: disable=broad-except
+                logging.exception("Error reloading the ledger")
+            finally:
+                app.reloading.clear()
 
-        else:
-            # For now, the overlay is a link to the errors page. Always render
-            # it on the right when there are errors.
-            if app.errors:
-                # pylint: disable=unsupported-assignment-operation
-                request.params['render_overlay'] = True
+    def stop(self):
+        "Stop the thread and wait for it to finish."
+        self.stopped.set()
+        self.join()
+
+
+def auto_reload_input_file(callback):
+    """A plugin that automatically reloads the input file if it changed since the
+    last page was loaded.
 
-        return callback(*posargs, **kwargs)
+    If a LedgerWatcher is running, the input file is only loaded inline for the
+    first request; later changes are loaded in the background. The request is
+    handled with the ledger that is current when it begins."""
+    def wrapper(*posargs, **kwargs):
+        if ((app.ledger is None or not app.args.reload_interval) and
+                loader.needs_refresh(app.options)):
+            with app.reload_lock:
+                if loader.needs_refresh(app.options):
+                    reload_ledger()
+
+        # For now, the overlay is a link to the errors page. Always render it on
+        # the right when there are errors.
+        ledger = app.ledger
+        if ledger.errors:
+            # pylint: disable=unsupported-assignment-operation
+            request.params['render_overlay'] = True
+
+        app.request_ledger.ledger = ledger
+        try:
+            return callback(*posargs, **kwargs)
+        finally:
+            app.request_ledger.ledger = None
     return wrapper
 
 app.install(auto_reload_input_file)
 
 
+def get_etag():
+    """Compute the entity tag of the page requested.
+
+    The page is identified by its path and query string, which include the
+    view it is rendered from, the hash of the input files it is rendered from,
+    and a hash of the configuration of the application.
+
+    Returns:
+      A quoted string.
+    """
+    md5 = hashlib.md5()
+    for value in (app.config_hash, app.options['input_hash'],
+                  request.path, request.query_string):
+        md5.update(value.encode('utf8'))
+        md5.update(b'\0')
+    return '"{}"'.format(md5.hexdigest())
+
+
+def http_cache(callback):
+    """A plugin that answers the requests for pages that have not changed cheaply.
+
+    Pages are served with an entity tag, which identifies the input files and
+    the page. Conditional requests for a page whose tag has not changed are
+    answered with 304 Not Modified, without rendering it, and the most
+    recently rendered pages are cached to be served again to other clients.
+    Large textual pages are compressed for the clients which accept it."""
+    def wrapper(*posargs, **kwargs):
+        # The pages rendered while a reload is pending are stale.
+        if request.method not in ('GET', 'HEAD') or app.reloading.is_set():
+            return callback(*posargs, **kwargs)
+
+        etag = get_etag()
+        if bottle_utils.etag_matches(etag):
+            return bottle.HTTPResponse(status=304,
+                                       headers=bottle_utils.get_cache_headers(etag))
+
+        cached = app.pages.get(etag) if app.pages is not None else None
+        if cached is None:
+            output = callback(*posargs, **kwargs)
+            cached = bottle_utils.cache_response(etag, output)
+            if cached is None:
+                return output
+            if app.pages is not None:
+                app.pages.put(etag, cached)
+        if cached.gzip_body is None and bottle_utils.accepts_gzip():
+            cached = bottle_utils.compress_response(cached)
+            if app.pages is not None and cached.gzip_body is not None:
+                app.pages.put(etag, cached)
+        return bottle_utils.serve_cached_response(cached)
+    return wrapper
+
+
 def incognito(callback):
     """A plugin that converts all numbers rendered into X's, in order
     to hide the actual values in the ledger. This is used for doing
@@ -1088,13 +1645,27 @@ def incognito(callback):
 # Global template.
 template = None
 
-def run_app(args, quiet=None):
-    logging.basicConfig(level=logging.INFO,
-                        format='%(levelname)-8s: %(message)s')
+def setup_app(args):
+    """Configure the application to serve a ledger, without running a server.
 
+    The ledger is loaded on the first request.
+
+    Args:
+      args: An argparse.Namespace container of the arguments provided in
+        add_web_arguments().
+    Returns:
+      A pair of the lists of the plugins installed on the application and on
+      the view application. See teardown_app().
+    """
     app_installs = []
     view_installs = []
 
+    # Cache the pages and validate them with entity tags. This is installed
+    # first, to apply to the pages as they are served, e.g., in incognito mode.
+    if args.http_cache:
+        app.install(http_cache)
+        app_installs.append(http_cache)
+
     # Hide the numbers in incognito mode. We do this on response text via a plug-in.
     if args.incognito:
         args.no_source = True
@@ -1110,7 +1681,7 @@ def run_app(args, quiet=None):
         app.install(url_restrictor)
         app_installs.append(url_restrictor)
 
-    app.options = None
+    app.ledger = None
 
     # Add an account transformer.
     app.account_xform = account.AccountTransformer('__' if args.no_colons else None)
@@ -1123,12 +1694,33 @@ def run_app(args, quiet=None):
     with open(path.join(path.dirname(__file__), 'web.css')) as f:
         global STYLE; STYLE = f.read()
 
-    # Run the server.
+    # Create the cache of views.
+    app.views = view_cache.ViewCache(args.view_cache_size,
+                                     args.view_cache_weight,
+                                     args.prebuild_workers)
+
+    # Create the cache of pages. The entity tags of the pages depend on
+    # everything they are rendered from but the ledger and the URL.
+    app.pages = memo.LRUCache(args.page_cache_size) if args.page_cache_size > 0 else None
+    md5 = hashlib.md5()
+    for value in (beancount.__version__, repr(sorted(vars(args).items())),
+                  template.source, STYLE):
+        md5.update(value.encode('utf8'))
+    app.config_hash = md5.hexdigest()
     app.args = args
-    bind_address = '0.0.0.0' if args.public else 'localhost'
-    app.run(host=bind_address, port=args.port,
-            debug=args.debug, reloader=False,
-            quiet=args.quiet if hasattr(args, 'quiet') else quiet)
+
+    return app_installs, view_installs
+
+
+def teardown_app(app_installs, view_installs):
+    """Undo the configuration of the application by setup_app().
+
+    Args:
+      app_installs: A list of the plugins installed on the application.
+      view_installs: A list of the plugins installed on the view application.
+    """
+    # Wait for the views being built in the background.
+    app.views.close()
 
     # Uninstall applications.
     for function in app_installs:
@@ -1137,6 +1729,35 @@ def run_app(args, quiet=None):
         viewapp.uninstall(function)
 
 
+def run_app(args, quiet=None):
+    logging.basicConfig(level=logging.INFO,
+                        format='%(levelname)-8s: %(message)s')
+
+    app_installs, view_installs = setup_app(args)
+
+    # Watch the input files, to reload them in the background.
+    watcher = LedgerWatcher(args.reload_interval) if args.reload_interval else None
+    if watcher is not None:
+        watcher.start()
+
+    # Run the server. Concurrent requests share the ledger and the views, which
+    # are not modified once created.
+    server_options = {}
+    if args.server_threads > 0:
+        server_options['server_class'] = bottle_utils.thread_pool_server_class(
+            args.server_threads)
+    bind_address = '0.0.0.0' if args.public else 'localhost'
+    app.run(host=bind_address, port=args.port,
+            debug=args.debug, reloader=False,
+            quiet=args.quiet if hasattr(args, 'quiet') else quiet,
+            **server_options)
+
+    # Wait for the reloads in the background.
+    if watcher is not None:
+        watcher.stop()
+    teardown_app(app_installs, view_installs)
+
+
 # The global server instance.
 server = None
 
@@ -1207,6 +1828,47 @@ def add_web_arguments(argparser):
     group.add_argument('--first-month', action='store', type=int, default=1,
                        help="The first month of the calendar year.")
 
+    group.add_argument('--server-threads', action='store', type=int, default=0,
+                       help=("The number of requests to serve concurrently, each "
+                             "in its own thread. Zero serves them one at a time."))
+
+    group.add_argument('--reload-interval', action='store', type=float, default=0,
+                       help=("If positive, the number of seconds between checks for "
+                             "changes to the input files, which are then reloaded "
+                             "in the background. By default they are reloaded when "
+                             "a page is requested, blocking the request."))
+
+    group.add_argument('--journal-page-size', action='store', type=int,
+                       default=DEFAULT_JOURNAL_PAGE_SIZE,
+                       help=("The number of rows of the pages of the journals, "
+                             "the newest first. Zero renders whole journals."))
+
+    group.add_argument('--no-http-cache', dest='http_cache', action='store_false',
+                       help=("Don't serve pages with entity tags, to answer "
+                             "conditional requests for pages that have not "
+                             "changed, nor compress them."))
+
+    group.add_argument('--page-cache-size', action='store', type=int,
+                       default=DEFAULT_PAGE_CACHE_SIZE,
+                       help=("The maximum number of rendered pages to keep in "
+                             "memory, to serve them again while the input "
+                             "files don't change."))
+
+    group.add_argument('--view-cache-size', action='store', type=int,
+                       default=view_cache.DEFAULT_MAX_VIEWS,
+                       help="The maximum number of views to keep in memory.")
+
+    group.add_argument('--view-cache-weight', action='store', type=int,
+                       default=view_cache.DEFAULT_MAX_WEIGHT,
+                       help=("The maximum total number of directives and postings "
+                             "referenced by the views kept in memory."))
+
+    group.add_argument('--prebuild-workers', action='store', type=int,
+                       default=view_cache.DEFAULT_NUM_WORKERS,
+                       help=("The number of threads used to rebuild the most "
+                             "used views in the background after a reload. "
+                             "Zero disables this."))
+
     return group
 
 
@@ -1288,3 +1950,7 @@ def thread_server_shutdown(thread):
     # Note that because we daemonize, we could forego this elegant detail.
     shutdown()
     thread.join()
+
+    # Forget the server, so that the next one can be waited for.
+    global server
+    server = None
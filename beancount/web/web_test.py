@@ -1,12 +1,31 @@
 __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import argparse
+import datetime
+import gzip
+import json
+import textwrap
+import threading
 import unittest
 import urllib.parse
 from os import path
+from unittest import mock
 
+from beancount import loader
+from beancount.core import account
+from beancount.core import compare
+from beancount.core import convert
+from beancount.core import inventory
+from beancount.core import realization
+from beancount.ops import holdings
+from beancount.reports import base
+from beancount.reports import misc_reports
+from beancount.reports import html_formatter
 from beancount.utils import test_utils
 from beancount.utils import version
+from beancount.web import bottle_utils
+from beancount.web import views
 from beancount.web import web
 
 
@@ -72,5 +91,348 @@ class TestWeb(unittest.TestCase):
         self.scrape('example.beancount')
 
 
+class TestPrebuiltViews(unittest.TestCase):
+
+    def test_get_prebuilt_views(self):
+        args = argparse.Namespace(view=None, first_month=1)
+        with mock.patch.object(web.app, 'args', args, create=True):
+            factories = web.get_prebuilt_views(web.app, datetime.date(2016, 2, 3))
+        self.assertEqual(['/view/all',
+                          '/view/year/2016',
+                          '/view/year/2016/month/02',
+                          '/view/year/2016/month/01',
+                          '/view/year/2015/month/12'],
+                         [viewid for viewid, _ in factories])
+
+        args = argparse.Namespace(view='year/2013', first_month=1)
+        with mock.patch.object(web.app, 'args', args, create=True):
+            self.assertEqual([], web.get_prebuilt_views(web.app))
+
+
+class TestHTMLFormatter(unittest.TestCase):
+
+    @loader.load_doc()
+    def test_memoization(self, entries, _, options_map):
+        """
+        2014-01-01 open Assets:Investing
+        2014-01-01 open Assets:Checking
+
+        2014-02-01 * "Buy"
+          Assets:Investing      10 HOOL {500 USD}
+          Assets:Checking
+
+        2014-02-02 * "Buy"
+          Assets:Investing      5 HOOL {510 USD}
+          Assets:Checking
+
+        2014-02-03 * "Sell"
+          Assets:Investing      -5 HOOL {510 USD}
+          Assets:Checking
+        """
+        build_url = mock.Mock(return_value='/journal')
+        formatter = web.HTMLFormatter(options_map['dcontext'], build_url, False,
+                                      account.AccountTransformer())
+        html = formatter.render_account('Assets:Checking')
+        self.assertRegex(html, 'Assets:Checking')
+        self.assertEqual(html, formatter.render_account('Assets:Checking'))
+        self.assertEqual(1, build_url.call_count)
+        formatter.render_account('Assets:Investing')
+        self.assertEqual(2, build_url.call_count)
+
+        base_formatter = html_formatter.HTMLFormatter(options_map['dcontext'])
+        real_root = realization.realize(entries)
+        for real_account in realization.iter_children(real_root):
+            for _, _, _, balance in realization.iterate_with_balance(
+                    real_account.txn_postings):
+                # The units are rendered as if reduced with convert.get_units().
+                self.assertEqual(
+                    base_formatter.render_inventory(balance.reduce(convert.get_units)),
+                    formatter.render_inventory(balance))
+        self.assertEqual('',
+                         formatter.render_inventory(inventory.from_string('')))
+        self.assertEqual(
+            formatter.render_inventory(inventory.from_string('10 HOOL {500 USD}')),
+            formatter.render_inventory(inventory.from_string('10 HOOL {500 USD}')))
+
+
+class TestWebApp(unittest.TestCase):
+
+    @test_utils.docfile
+    def test_request_ledger(self, filename):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+        """
+        app = web.WebApp()
+        self.assertIsNone(app.entries)
+        self.assertIsNone(app.options)
+
+        ledger = web.load_ledger(filename)
+        self.assertEqual(3, len(ledger.entries))
+        self.assertEqual([2014], ledger.active_years)
+        app.ledger = ledger
+        self.assertIs(ledger.entries, app.entries)
+
+        # A request keeps the ledger it started with, even after a reload.
+        app.request_ledger.ledger = ledger
+        app.ledger = web.load_ledger(filename)
+        self.assertIs(ledger.entries, app.entries)
+        app.request_ledger.ledger = None
+        self.assertIs(app.ledger.entries, app.entries)
+
+    @test_utils.docfile
+    def test_entries_by_hash(self, filename):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+        """
+        ledger = web.load_ledger(filename)
+        self.assertIsNone(ledger.entries_by_hash)
+        entries_by_hash = ledger.get_entries_by_hash()
+        self.assertIs(entries_by_hash, ledger.get_entries_by_hash())
+        self.assertEqual(3, len(entries_by_hash))
+        self.assertEqual([ledger.entries[0]],
+                         entries_by_hash[compare.hash_entry(ledger.entries[0])])
+        self.assertEqual(ledger.entries[2:],
+                         entries_by_hash[compare.hash_entry(ledger.entries[2])])
+
+
+class TestGetUrlView(unittest.TestCase):
+
+    @test_utils.docfile
+    def test_get_url_view(self, filename):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner"
+          Expenses:Restaurant   50.02 USD
+          Assets:Checking
+        """
+        argparser = version.ArgumentParser()
+        web.add_web_arguments(argparser)
+        app_installs, view_installs = web.setup_app(argparser.parse_args([filename]))
+        try:
+            web.app.ledger = web.load_ledger(filename)
+            viewid, view = web.get_url_view('/view/year/2014/journal/Assets:Checking')
+            self.assertEqual('/view/year/2014', viewid)
+            self.assertEqual(2014, view.year)
+            self.assertIs(view, web.get_url_view('/view/year/2014/balsheet')[1])
+            self.assertEqual((None, None), web.get_url_view('/errors'))
+        finally:
+            web.teardown_app(app_installs, view_installs)
+            web.app.ledger = None
+
+
+class TestJournalPages(unittest.TestCase):
+
+    @test_utils.docfile
+    def test_journal_pages(self, filename):
+        """
+        2014-01-01 open Assets:Checking
+        2014-01-01 open Expenses:Restaurant
+
+        2014-02-01 * "Dinner 1"
+          Expenses:Restaurant   10.00 USD
+          Assets:Checking
+
+        2014-02-02 * "Dinner 2"
+          Expenses:Restaurant   20.00 USD
+          Assets:Checking
+
+        2014-02-03 * "Dinner 3"
+          Expenses:Restaurant   30.00 USD
+          Assets:Checking
+        """
+        argparser = version.ArgumentParser()
+        web.add_web_arguments(argparser)
+        webargs = argparser.parse_args([filename, '--journal-page-size=2'])
+        app_installs, view_installs = web.setup_app(webargs)
+        try:
+            web.app.ledger = web.load_ledger(filename)
+            url = '/view/all/journal/Expenses:Restaurant'
+            status, _, contents = bottle_utils.call_app(web.app, url)
+            self.assertEqual(200, status)
+            contents = contents.decode('utf8')
+            self.assertIn('Page 1 of 2', contents)
+            self.assertIn('Dinner 3', contents)
+            self.assertNotIn('Dinner 1', contents)
+            self.assertIn('60.00 USD', contents)
+
+            # The balance of an older page starts from that of the previous rows.
+            status, _, contents = bottle_utils.call_app(web.app, url + '?page=2')
+            contents = contents.decode('utf8')
+            self.assertIn('Dinner 1', contents)
+            self.assertNotIn('Dinner 2', contents)
+            self.assertNotIn('60.00 USD', contents)
+
+            status, _, contents = bottle_utils.call_app(web.app, url + '?page_size=10')
+            self.assertNotIn('journal-pages', contents.decode('utf8'))
+
+            for query, expected_status in [('?page=3', 404),
+                                           ('?page=x', 400),
+                                           ('?page_size=-1', 400)]:
+                status, _, _ = bottle_utils.call_app(web.app, url + query)
+                self.assertEqual(expected_status, status)
+
+            status, _, contents = bottle_utils.call_app(
+                web.app, '/view/all/journal_rows/Expenses:Restaurant')
+            self.assertEqual(200, status)
+            rows = json.loads(contents.decode('utf8'))
+            self.assertEqual(1, rows['page'])
+            self.assertEqual(2, rows['num_pages'])
+            self.assertEqual(['2014-02-02', '2014-02-03'],
+                             [row['date'] for row in rows['rows']])
+            self.assertEqual(['30.00 USD', '60.00 USD'],
+                             [row['balance'] for row in rows['rows']])
+            self.assertEqual('/view/all/journal_rows/Expenses:Restaurant?page=2',
+                             rows['next'])
+
+            status, _, contents = bottle_utils.call_app(web.app, rows['next'])
+            rows = json.loads(contents.decode('utf8'))
+            self.assertEqual(['2014-01-01', '2014-02-01'],
+                             [row['date'] for row in rows['rows']])
+            self.assertIsNone(rows['next'])
+        finally:
+            web.teardown_app(app_installs, view_installs)
+            web.app.ledger = None
+
+
+class TestHTTPCache(unittest.TestCase):
+
+    def test_http_cache(self):
+        with test_utils.tempdir() as tmpdir:
+            filename = path.join(tmpdir, 'input.beancount')
+            with open(filename, 'w') as outfile:
+                outfile.write(textwrap.dedent("""
+                  2014-01-01 open Assets:Checking
+                  2014-01-01 open Expenses:Restaurant
+                """))
+            argparser = version.ArgumentParser()
+            web.add_web_arguments(argparser)
+            webargs = argparser.parse_args([filename, '--reload-interval=0'])
+            app_installs, view_installs = web.setup_app(webargs)
+            try:
+                url = '/view/all/balsheet'
+                status, headers, contents = bottle_utils.call_app(web.app, url)
+                self.assertEqual(200, status)
+                etag = dict(headers)['Etag']
+                self.assertEqual(1, len(web.app.pages))
+
+                # Cached pages are served without rendering them.
+                with mock.patch.object(web, 'render_view') as render_view:
+                    status, headers, cached_contents = bottle_utils.call_app(web.app, url)
+                    self.assertEqual((200, etag), (status, dict(headers)['Etag']))
+                    self.assertEqual(contents, cached_contents)
+
+                    status, headers, _ = bottle_utils.call_app(web.app, url,
+                                                               {'If-None-Match': etag})
+                    self.assertEqual(304, status)
+
+                    status, headers, gzip_contents = bottle_utils.call_app(
+                        web.app, url, {'Accept-Encoding': 'gzip'})
+                    self.assertEqual('gzip', dict(headers)['Content-Encoding'])
+                    self.assertEqual(contents, gzip.decompress(gzip_contents))
+                    self.assertFalse(render_view.called)
+
+                # The entity tags of the pages change with the input files.
+                with open(filename, 'a') as outfile:
+                    outfile.write(textwrap.dedent("""
+                      2014-02-01 * "Dinner"
+                        Expenses:Restaurant   50.02 USD
+                        Assets:Checking
+                    """))
+                status, headers, new_contents = bottle_utils.call_app(
+                    web.app, url, {'If-None-Match': etag})
+                self.assertEqual(200, status)
+                self.assertNotEqual(etag, dict(headers)['Etag'])
+                self.assertNotIn(b'Checking', contents)
+                self.assertIn(b'Checking', new_contents)
+                self.assertEqual(1, len(web.app.pages))
+            finally:
+                web.teardown_app(app_installs, view_installs)
+                web.app.ledger = None
+
+
+class TestLedgerWatcher(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        argparser = version.ArgumentParser()
+        web.add_web_arguments(argparser)
+        self.assertEqual(0, argparser.parse_args(['input.beancount']).reload_interval)
+        self.assertEqual(1.5, argparser.parse_args(['input.beancount',
+                                                    '--reload-interval=1.5']).reload_interval)
+
+    def test_reload(self):
+        old_ledger, new_ledger = mock.Mock(), mock.Mock()
+        reloaded = threading.Event()
+        def reload_ledger():
+            self.assertTrue(web.app.reloading.is_set())
+            web.app.ledger = new_ledger
+            reloaded.set()
+        with mock.patch.object(web.app, 'ledger', old_ledger), \
+             mock.patch.object(web.loader, 'needs_refresh',
+                               side_effect=lambda options: options is old_ledger.options), \
+             mock.patch.object(web, 'reload_ledger', side_effect=reload_ledger) as reload_mock:
+            watcher = web.LedgerWatcher(0.01)
+            watcher.start()
+            try:
+                self.assertTrue(reloaded.wait(5))
+            finally:
+                watcher.stop()
+            self.assertIs(new_ledger, web.app.ledger)
+        self.assertEqual(1, reload_mock.call_count)
+        self.assertFalse(web.app.reloading.is_set())
+
+    def test_reload_ledger_clears_caches(self):
+        with test_utils.tempdir() as tmpdir:
+            filename = path.join(tmpdir, 'input.beancount')
+            with open(filename, 'w') as outfile:
+                outfile.write(textwrap.dedent("""
+                  2014-01-01 open Assets:Checking
+                  2014-01-01 open Expenses:Restaurant
+
+                  2014-02-01 * "Dinner"
+                    Expenses:Restaurant   50.02 USD
+                    Assets:Checking
+                """))
+            argparser = version.ArgumentParser()
+            web.add_web_arguments(argparser)
+            webargs = argparser.parse_args([filename, '--reload-interval=0',
+                                            '--prebuild-workers=0'])
+            app_installs, view_installs = web.setup_app(webargs)
+            try:
+                for url in ['/view/year/2014/balsheet',
+                            '/view/year/2014/equity/holdings',
+                            '/view/year/2014/journal/Assets:Checking',
+                            '/view/year/2014/stats_types',
+                            '/view/year/2014/activity']:
+                    status, _, _ = bottle_utils.call_app(web.app, url)
+                    self.assertEqual(200, status)
+                caches = [realization._POSTING_INDEXES, holdings._SNAPSHOTS,
+                          base._PRICE_MAPS, views._SUMMARIES, web._JOURNAL_PAGES,
+                          misc_reports._STATISTICS, misc_reports._LAST_ACTIVE]
+                self.assertTrue(all(caches))
+
+                # The entries of the previous ledger are released on reload.
+                web.reload_ledger()
+                self.assertFalse(any(caches))
+            finally:
+                web.teardown_app(app_installs, view_installs)
+                web.app.ledger = None
+
+
 if __name__ == '__main__':
     unittest.main()